@@ -0,0 +1,50 @@
+"""Dedup blocking index and job watermarks
+
+Revision ID: 002_dedup_blocking_index
+Revises: 001_initial
+Create Date: 2024-02-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002_dedup_blocking_index'
+down_revision = '001_initial'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Claves de bloqueo persistidas (deduplicación incremental)
+    op.create_table(
+        'customer_blocking_keys',
+        sa.Column('customer_id', sa.String(), nullable=False),
+        sa.Column('key', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('customer_id', 'key')
+    )
+    op.create_index('ix_customer_blocking_keys_key', 'customer_blocking_keys', ['key'])
+    
+    # Marcas de agua de jobs incrementales
+    op.create_table(
+        'job_watermarks',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('value', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    
+    # Contactos nuevos o modificados desde la marca de agua
+    op.create_index(
+        'ix_customers_changed_at',
+        'customers',
+        [sa.text('COALESCE(updated_at, created_at)')]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_customers_changed_at', table_name='customers')
+    op.drop_table('job_watermarks')
+    op.drop_index('ix_customer_blocking_keys_key', table_name='customer_blocking_keys')
+    op.drop_table('customer_blocking_keys')
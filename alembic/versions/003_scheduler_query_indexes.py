@@ -0,0 +1,63 @@
+"""Indexes for scheduler hot queries
+
+Revision ID: 003_scheduler_query_indexes
+Revises: 002_dedup_blocking_index
+Create Date: 2024-02-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003_scheduler_query_indexes'
+down_revision = '002_dedup_blocking_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CartRecoveryService.detect_abandoned_carts (cada hora)
+    op.create_index(
+        'ix_carts_status_last_activity_attempts',
+        'carts',
+        ['status', 'last_activity', 'recovery_attempt_count']
+    )
+    
+    # PaymentReminderService.send_reminders (diario): rangos de due_date
+    op.create_index(
+        'ix_invoices_status_due_date',
+        'invoices',
+        ['status', 'due_date']
+    )
+    
+    # IntelligentAlerts._check_hot_leads: leads recientes con score alto
+    op.create_index(
+        'ix_leads_created_at_score',
+        'leads',
+        ['created_at', 'score']
+    )
+    
+    # IntelligentAlerts._check_customer_risks: conversaciones recientes muy
+    # negativas; customer_id incluido para el join sin visitar la tabla
+    op.create_index(
+        'ix_conversations_last_message_at_sentiment',
+        'conversations',
+        ['last_message_at', 'avg_sentiment_score'],
+        postgresql_include=['customer_id']
+    )
+    
+    # Backlog de mensajes sin procesar (índice parcial, solo pendientes)
+    op.create_index(
+        'ix_raw_messages_unprocessed',
+        'raw_messages',
+        ['received_at'],
+        postgresql_where=sa.text('processed = false')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_raw_messages_unprocessed', table_name='raw_messages')
+    op.drop_index('ix_conversations_last_message_at_sentiment', table_name='conversations')
+    op.drop_index('ix_leads_created_at_score', table_name='leads')
+    op.drop_index('ix_invoices_status_due_date', table_name='invoices')
+    op.drop_index('ix_carts_status_last_activity_attempts', table_name='carts')
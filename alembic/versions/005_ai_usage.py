@@ -0,0 +1,40 @@
+"""AI usage ledger
+
+Revision ID: 005_ai_usage
+Revises: 004_job_runs
+Create Date: 2024-02-25 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005_ai_usage'
+down_revision = '004_job_runs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'ai_usage',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('flow', sa.String(), nullable=False),
+        sa.Column('entity_id', sa.String(), nullable=True),
+        sa.Column('provider', sa.String(), nullable=False),
+        sa.Column('model', sa.String(), nullable=False),
+        sa.Column('method', sa.String(), nullable=False),
+        sa.Column('prompt_tokens', sa.Integer(), nullable=False),
+        sa.Column('completion_tokens', sa.Integer(), nullable=False),
+        sa.Column('cost_usd', sa.Numeric(12, 6), nullable=False),
+        sa.Column('degraded', sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    # Costo por flujo en un rango de fechas
+    op.create_index('ix_ai_usage_flow_created_at', 'ai_usage', ['flow', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ai_usage_flow_created_at', table_name='ai_usage')
+    op.drop_table('ai_usage')
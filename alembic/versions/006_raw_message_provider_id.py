@@ -0,0 +1,32 @@
+"""Provider message id on raw messages
+
+Revision ID: 006_raw_message_provider_id
+Revises: 005_ai_usage
+Create Date: 2024-03-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_raw_message_provider_id'
+down_revision = '005_ai_usage'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('raw_messages', sa.Column('provider_message_id', sa.String(), nullable=True))
+    
+    # Idempotencia de webhooks: un mensaje de Meta por canal (NULL no choca)
+    op.create_index(
+        'uq_raw_messages_provider_message_id',
+        'raw_messages',
+        ['channel', 'provider_message_id'],
+        unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_raw_messages_provider_message_id', table_name='raw_messages')
+    op.drop_column('raw_messages', 'provider_message_id')
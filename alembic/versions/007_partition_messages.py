@@ -0,0 +1,142 @@
+"""Monthly partitions for raw_messages and messages
+
+Revision ID: 007_partition_messages
+Revises: 006_raw_message_provider_id
+Create Date: 2024-03-10 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '007_partition_messages'
+down_revision = '006_raw_message_provider_id'
+branch_labels = None
+depends_on = None
+
+# Meses futuros creados de entrada (después los crea el job de mantenimiento)
+MONTHS_AHEAD = 3
+
+
+def _partition(table: str, column: str) -> None:
+    """Reemplaza `table` por una tabla particionada por mes sobre `column`"""
+    old = f'{table}_unpartitioned'
+    op.execute(f'ALTER TABLE {table} RENAME TO {old}')
+    op.execute(f'ALTER INDEX {table}_pkey RENAME TO {old}_pkey')
+    op.execute(
+        f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+        f'PARTITION BY RANGE ({column})'
+    )
+    # La clave primaria de una tabla particionada debe incluir la columna de partición
+    op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, {column})')
+    
+    # Un mes por partición, desde el dato más antiguo hasta MONTHS_AHEAD adelante
+    op.execute(f"""
+        DO $$
+        DECLARE
+            month date;
+            last_month date := (date_trunc('month', now()) + interval '{MONTHS_AHEAD} months')::date;
+        BEGIN
+            SELECT date_trunc('month', COALESCE(min({column}), now()))::date INTO month FROM {old};
+            WHILE month <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF {table} FOR VALUES FROM (%L) TO (%L)',
+                    '{table}_' || to_char(month, 'YYYY_MM'),
+                    month,
+                    (month + interval '1 month')::date
+                );
+                month := (month + interval '1 month')::date;
+            END LOOP;
+        END $$;
+    """)
+    
+    op.execute(f'INSERT INTO {table} SELECT * FROM {old}')
+    op.execute(f'DROP TABLE {old}')
+
+
+def _unpartition(table: str) -> None:
+    """Vuelve a una tabla normal con clave primaria (id)"""
+    old = f'{table}_partitioned'
+    op.execute(f'ALTER TABLE {table} RENAME TO {old}')
+    op.execute(f'ALTER INDEX {table}_pkey RENAME TO {old}_pkey')
+    op.execute(f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)')
+    op.execute(f'INSERT INTO {table} SELECT * FROM {old}')
+    # Borra la tabla particionada junto con todas sus particiones
+    op.execute(f'DROP TABLE {old}')
+
+
+def upgrade() -> None:
+    # Idempotencia de webhooks: la unicidad por id del proveedor no puede
+    # vivir en raw_messages particionada (tendría que incluir received_at)
+    op.create_table(
+        'raw_message_ids',
+        sa.Column('channel', postgresql.ENUM(name='messagechannel', create_type=False), nullable=False),
+        sa.Column('provider_message_id', sa.String(), nullable=False),
+        sa.Column('received_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('channel', 'provider_message_id')
+    )
+    op.create_index('ix_raw_message_ids_received_at', 'raw_message_ids', ['received_at'])
+    op.execute(
+        'INSERT INTO raw_message_ids (channel, provider_message_id, received_at) '
+        'SELECT channel, provider_message_id, min(received_at) FROM raw_messages '
+        'WHERE provider_message_id IS NOT NULL GROUP BY channel, provider_message_id'
+    )
+    op.drop_index('uq_raw_messages_provider_message_id', table_name='raw_messages')
+    op.drop_index('ix_raw_messages_unprocessed', table_name='raw_messages')
+    
+    # Ninguna FK puede apuntar solo a messages.id una vez particionada
+    op.drop_constraint('lead_intents_message_id_fkey', 'lead_intents', type_='foreignkey')
+    op.drop_constraint('sentiment_analyses_message_id_fkey', 'sentiment_analyses', type_='foreignkey')
+    
+    _partition('raw_messages', 'received_at')
+    _partition('messages', 'sent_at')
+    
+    op.create_foreign_key(
+        'messages_conversation_id_fkey', 'messages', 'conversations',
+        ['conversation_id'], ['id']
+    )
+    # Índices sobre la tabla padre: se crean en cada partición
+    op.create_index(
+        'ix_raw_messages_unprocessed',
+        'raw_messages',
+        ['received_at'],
+        postgresql_where=sa.text('processed = false')
+    )
+    op.create_index('ix_messages_conversation_id_sent_at', 'messages', ['conversation_id', 'sent_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_conversation_id_sent_at', table_name='messages')
+    op.drop_index('ix_raw_messages_unprocessed', table_name='raw_messages')
+    
+    _unpartition('messages')
+    _unpartition('raw_messages')
+    
+    op.create_foreign_key(
+        'messages_conversation_id_fkey', 'messages', 'conversations',
+        ['conversation_id'], ['id']
+    )
+    op.create_foreign_key(
+        'sentiment_analyses_message_id_fkey', 'sentiment_analyses', 'messages',
+        ['message_id'], ['id']
+    )
+    op.create_foreign_key(
+        'lead_intents_message_id_fkey', 'lead_intents', 'messages',
+        ['message_id'], ['id']
+    )
+    op.create_index(
+        'ix_raw_messages_unprocessed',
+        'raw_messages',
+        ['received_at'],
+        postgresql_where=sa.text('processed = false')
+    )
+    op.create_index(
+        'uq_raw_messages_provider_message_id',
+        'raw_messages',
+        ['channel', 'provider_message_id'],
+        unique=True
+    )
+    op.drop_index('ix_raw_message_ids_received_at', table_name='raw_message_ids')
+    op.drop_table('raw_message_ids')
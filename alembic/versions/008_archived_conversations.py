@@ -0,0 +1,45 @@
+"""Archived conversations index
+
+Revision ID: 008_archived_conversations
+Revises: 007_partition_messages
+Create Date: 2024-03-20 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008_archived_conversations'
+down_revision = '007_partition_messages'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'archived_conversations',
+        sa.Column('conversation_id', sa.String(), nullable=False),
+        sa.Column('customer_id', sa.String(), nullable=True),
+        sa.Column('lead_id', sa.String(), nullable=True),
+        sa.Column('channel', sa.String(), nullable=False),
+        sa.Column('closed_at', sa.DateTime(), nullable=True),
+        sa.Column('message_count', sa.Integer(), nullable=False),
+        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('conversation_id')
+    )
+    op.create_index('ix_archived_conversations_customer_id', 'archived_conversations', ['customer_id'])
+    
+    # Candidatas a archivar: cerradas, por fecha de cierre
+    op.create_index(
+        'ix_conversations_closed_at',
+        'conversations',
+        ['closed_at', 'id'],
+        postgresql_where=sa.text("status = 'CLOSED'")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_conversations_closed_at', table_name='conversations')
+    op.drop_index('ix_archived_conversations_customer_id', table_name='archived_conversations')
+    op.drop_table('archived_conversations')
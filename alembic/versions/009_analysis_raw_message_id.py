@@ -0,0 +1,30 @@
+"""Raw message id on analysis results
+
+Revision ID: 009_analysis_raw_message_id
+Revises: 008_archived_conversations
+Create Date: 2024-03-25 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009_analysis_raw_message_id'
+down_revision = '008_archived_conversations'
+branch_labels = None
+depends_on = None
+
+TABLES = ('lead_classifications', 'lead_intents', 'sentiment_analyses')
+
+
+def upgrade() -> None:
+    # El worker busca por raw_message_id antes de guardar (reentregas)
+    for table in TABLES:
+        op.add_column(table, sa.Column('raw_message_id', sa.String(), nullable=True))
+        op.create_index(f'ix_{table}_raw_message_id', table, ['raw_message_id'])
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_index(f'ix_{table}_raw_message_id', table_name=table)
+        op.drop_column(table, 'raw_message_id')
@@ -1,15 +1,18 @@
 """
 Adaptador para Anthropic Claude
 """
-from typing import Optional, Dict, Any, List
+from contextlib import aclosing
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
 import json
 import time
+import httpx
 from anthropic import AsyncAnthropic
 from app.ai.base import AIAdapter
 from app.core.config import settings
 from app.schemas.lead import LeadScore
 from app.schemas.intent import IntentDetectionResult
 from app.schemas.sentiment import SentimentResult
+from app.schemas.analysis import MessageAnalysis
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -18,16 +21,25 @@ logger = get_logger(__name__)
 class AnthropicAdapter(AIAdapter):
     """Adaptador para Anthropic Claude"""
     
-    def __init__(self):
+    provider_name = "anthropic"
+    
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
         if not settings.ANTHROPIC_API_KEY:
             raise ValueError("ANTHROPIC_API_KEY no configurada")
-        self.client = AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
+        # http_client compartido (ver app.ai.registry) para reutilizar conexiones
+        self.client = AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY, http_client=http_client)
         self._model_name = settings.ANTHROPIC_MODEL
     
     @property
     def model_name(self) -> str:
         return self._model_name
     
+    def _token_usage(self, response: Any) -> Tuple[int, int]:
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return 0, 0
+        return usage.input_tokens or 0, usage.output_tokens or 0
+    
     async def classify_lead(
         self,
         prompt: str,
@@ -39,7 +51,9 @@ class AnthropicAdapter(AIAdapter):
         try:
             system_prompt = "Eres un experto en clasificación de leads. Responde siempre en formato JSON válido con los campos: score (0-100), category (hot/warm/cold), reasoning, recommended_action."
             
-            response = await self.client.messages.create(
+            response = await self._observed(
+                "classify_lead",
+                self.client.messages.create,
                 model=self.model_name,
                 max_tokens=500,
                 system=system_prompt,
@@ -77,7 +91,9 @@ class AnthropicAdapter(AIAdapter):
             if valid_intents:
                 system_prompt += f"\nIntenciones válidas: {', '.join(valid_intents)}"
             
-            response = await self.client.messages.create(
+            response = await self._observed(
+                "detect_intent",
+                self.client.messages.create,
                 model=self.model_name,
                 max_tokens=500,
                 system=system_prompt,
@@ -109,7 +125,9 @@ class AnthropicAdapter(AIAdapter):
         try:
             system_prompt = "Eres un experto en análisis de sentimiento. Responde siempre en formato JSON válido."
             
-            response = await self.client.messages.create(
+            response = await self._observed(
+                "analyze_sentiment",
+                self.client.messages.create,
                 model=self.model_name,
                 max_tokens=500,
                 system=system_prompt,
@@ -135,6 +153,40 @@ class AnthropicAdapter(AIAdapter):
             logger.error("anthropic_sentiment_analysis_error", error=str(e))
             raise
     
+    async def analyze_message(
+        self,
+        prompt: str,
+        valid_intents: Optional[List[str]] = None
+    ) -> MessageAnalysis:
+        """Lead score, intención y sentimiento en una sola llamada a Claude"""
+        start_time = time.time()
+        
+        try:
+            system_prompt = "Eres un experto en análisis de mensajes de clientes. Responde siempre en formato JSON válido con los objetos: lead, intent, sentiment."
+            if valid_intents:
+                system_prompt += f"\nIntenciones válidas: {', '.join(valid_intents)}"
+            
+            response = await self._observed(
+                "analyze_message",
+                self.client.messages.create,
+                model=self.model_name,
+                max_tokens=800,
+                system=system_prompt,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ]
+            )
+            
+            content = response.content[0].text
+            result = json.loads(content)
+            
+            processing_time = int((time.time() - start_time) * 1000)
+            
+            return self._build_message_analysis(result, processing_time)
+        except Exception as e:
+            logger.error("anthropic_message_analysis_error", error=str(e))
+            raise
+    
     async def chat(
         self,
         messages: List[Dict[str, str]],
@@ -143,20 +195,11 @@ class AnthropicAdapter(AIAdapter):
     ) -> str:
         """Genera respuesta conversacional"""
         try:
-            # Convertir formato de mensajes
-            system_msg = None
-            claude_messages = []
-            
-            for msg in messages:
-                if msg["role"] == "system":
-                    system_msg = msg["content"]
-                else:
-                    claude_messages.append({
-                        "role": msg["role"],
-                        "content": msg["content"]
-                    })
-            
-            response = await self.client.messages.create(
+            system_msg, claude_messages = _to_claude_messages(messages)
+            
+            response = await self._observed(
+                "chat",
+                self.client.messages.create,
                 model=self.model_name,
                 max_tokens=max_tokens,
                 system=system_msg,
@@ -168,6 +211,35 @@ class AnthropicAdapter(AIAdapter):
             logger.error("anthropic_chat_error", error=str(e))
             raise
     
+    async def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 500
+    ) -> AsyncIterator[str]:
+        """Respuesta conversacional en fragmentos (stream=True)"""
+        try:
+            system_msg, claude_messages = _to_claude_messages(messages)
+            
+            # aclosing: si el consumidor corta, el stream del proveedor se cierra ya
+            async with aclosing(self._observed_stream(
+                "chat_stream",
+                self.client.messages.create,
+                _delta_text,
+                messages,
+                model=self.model_name,
+                max_tokens=max_tokens,
+                system=system_msg,
+                messages=claude_messages,
+                temperature=temperature,
+                stream=True
+            )) as stream:
+                async for text in stream:
+                    yield text
+        except Exception as e:
+            logger.error("anthropic_chat_stream_error", error=str(e))
+            raise
+    
     async def generate_response(
         self,
         prompt: str,
@@ -178,7 +250,9 @@ class AnthropicAdapter(AIAdapter):
         max_tokens = kwargs.get("max_tokens", 500)
         
         try:
-            response = await self.client.messages.create(
+            response = await self._observed(
+                "generate_response",
+                self.client.messages.create,
                 model=self.model_name,
                 max_tokens=max_tokens,
                 messages=[
@@ -191,3 +265,29 @@ class AnthropicAdapter(AIAdapter):
             logger.error("anthropic_generate_error", error=str(e))
             raise
 
+
+def _to_claude_messages(messages: List[Dict[str, str]]) -> Tuple[Optional[str], List[Dict[str, str]]]:
+    """
+    Separa los mensajes de sistema (Claude los recibe en `system`, unidos)
+    del resto de la conversación.
+    """
+    system_parts = []
+    claude_messages = []
+    
+    for msg in messages:
+        if msg["role"] == "system":
+            system_parts.append(msg["content"])
+        else:
+            claude_messages.append({
+                "role": msg["role"],
+                "content": msg["content"]
+            })
+    
+    return "\n\n".join(system_parts) or None, claude_messages
+
+
+def _delta_text(event: Any) -> Optional[str]:
+    """Texto de un evento content_block_delta del stream de Messages"""
+    if getattr(event, "type", None) != "content_block_delta":
+        return None
+    return getattr(event.delta, "text", None)
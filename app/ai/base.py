@@ -1,16 +1,29 @@
 """
 Adaptador base abstracto para servicios de IA
 """
+import asyncio
+import inspect
+import time
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple, Callable, Awaitable, AsyncIterator
 from app.schemas.lead import LeadScore
 from app.schemas.intent import IntentDetectionResult
 from app.schemas.sentiment import SentimentResult
+from app.schemas.analysis import MessageAnalysis, neutral_result
+from app.ai.usage import usage_ledger
+from app.ai.prompt_budget import count_tokens, message_tokens
+from app.core.metrics import observe_ai_call, observe_time_to_first_token
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
 
 
 class AIAdapter(ABC):
     """Interfaz base para adaptadores de IA"""
     
+    # Identificador del proveedor (límites de rate, métricas)
+    provider_name: str = "unknown"
+    
     @property
     @abstractmethod
     def model_name(self) -> str:
@@ -43,6 +56,15 @@ class AIAdapter(ABC):
         """Analiza el sentimiento de un mensaje"""
         pass
     
+    @abstractmethod
+    async def analyze_message(
+        self,
+        prompt: str,
+        valid_intents: Optional[List[str]] = None
+    ) -> MessageAnalysis:
+        """Score de lead, intención y sentimiento en una sola llamada"""
+        pass
+    
     @abstractmethod
     async def chat(
         self,
@@ -53,6 +75,20 @@ class AIAdapter(ABC):
         """Genera una respuesta conversacional"""
         pass
     
+    async def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 500
+    ) -> AsyncIterator[str]:
+        """
+        Respuesta conversacional en fragmentos, a medida que llegan.
+        
+        Por defecto entrega la respuesta de `chat` en un solo fragmento;
+        los proveedores con streaming lo sobrescriben.
+        """
+        yield await self.chat(messages, temperature=temperature, max_tokens=max_tokens)
+    
     @abstractmethod
     async def generate_response(
         self,
@@ -62,3 +98,198 @@ class AIAdapter(ABC):
         """Genera una respuesta genérica"""
         pass
 
+    
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embeddings de los textos (opcional según proveedor)"""
+        raise NotImplementedError(f"{type(self).__name__} no soporta embeddings")
+    
+    def _resolve_model(self, method: str, kwargs: Dict[str, Any]) -> Tuple[str, bool]:
+        """
+        Modelo de la llamada. Si el flujo actual agotó su presupuesto, se
+        cambia `kwargs["model"]` por el modelo barato del proveedor.
+        """
+        degraded = False
+        if "model" in kwargs and method != "embed":
+            fallback = usage_ledger.fallback_model(self.provider_name)
+            if fallback and fallback != kwargs["model"]:
+                kwargs["model"] = fallback
+                degraded = True
+        return kwargs.get("model", self.model_name), degraded
+    
+    async def _observed(self, method: str, call: Callable[..., Awaitable], **kwargs) -> Any:
+        """
+        Ejecuta `call(**kwargs)` contra el proveedor registrando latencia,
+        tokens, errores (app.core.metrics) y costo por flujo (app.ai.usage).
+        
+        Si el flujo actual agotó su presupuesto, la llamada usa el modelo
+        barato configurado para el proveedor.
+        """
+        model, degraded = self._resolve_model(method, kwargs)
+        
+        started = time.perf_counter()
+        try:
+            response = await call(**kwargs)
+        except Exception:
+            observe_ai_call(
+                self.provider_name, model, method, "error",
+                time.perf_counter() - started
+            )
+            raise
+        
+        prompt_tokens, completion_tokens = self._token_usage(response)
+        observe_ai_call(
+            self.provider_name, model, method, "success",
+            time.perf_counter() - started,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens
+        )
+        usage_ledger.record(
+            self.provider_name, model, method,
+            prompt_tokens, completion_tokens,
+            degraded=degraded
+        )
+        return response
+    
+    async def _observed_stream(
+        self,
+        method: str,
+        call: Callable[..., Awaitable],
+        extract_text: Callable[[Any], Optional[str]],
+        prompt_messages: List[Dict[str, str]],
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        Como `_observed` para respuestas en streaming: entrega el texto de
+        cada evento y mide el tiempo al primer token aparte de la latencia
+        total. Los streams no reportan uso, así que los tokens se cuentan
+        con tiktoken sobre el prompt y el texto recibido.
+        
+        El stream del proveedor se cierra siempre al terminar (también si el
+        cliente se desconecta o hay error) para liberar la conexión HTTP.
+        """
+        model, degraded = self._resolve_model(method, kwargs)
+        parts: List[str] = []
+        status = "success"
+        stream = None
+        
+        started = time.perf_counter()
+        try:
+            stream = await call(**kwargs)
+            async for event in stream:
+                text = extract_text(event)
+                if not text:
+                    continue
+                if not parts:
+                    observe_time_to_first_token(
+                        self.provider_name, model, method, time.perf_counter() - started
+                    )
+                parts.append(text)
+                yield text
+        except (GeneratorExit, asyncio.CancelledError):
+            # El cliente dejó de leer: se contabiliza lo generado hasta aquí
+            status = "cancelled"
+            raise
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            if stream is not None:
+                await self._close_stream(stream)
+            prompt_tokens = sum(message_tokens(m, model) for m in prompt_messages)
+            completion_tokens = count_tokens("".join(parts), model) if parts else 0
+            observe_ai_call(
+                self.provider_name, model, method, status,
+                time.perf_counter() - started,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens
+            )
+            if status != "error":
+                usage_ledger.record(
+                    self.provider_name, model, method,
+                    prompt_tokens, completion_tokens,
+                    degraded=degraded
+                )
+    
+    @staticmethod
+    async def _close_stream(stream: Any):
+        """Cierra el stream del proveedor (`aclose` o `close`) sin ocultar el error original"""
+        close = getattr(stream, "aclose", None) or getattr(stream, "close", None)
+        if close is None:
+            return
+        try:
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.warning("ai_stream_close_failed", error=str(e))
+    
+    def _token_usage(self, response: Any) -> Tuple[int, int]:
+        """Tokens (prompt, completion) reportados en la respuesta del proveedor"""
+        return 0, 0
+    
+    def _build_message_analysis(
+        self,
+        result: Dict[str, Any],
+        processing_time_ms: Optional[int] = None
+    ) -> MessageAnalysis:
+        """
+        Convierte el JSON combinado del modelo en MessageAnalysis.
+        
+        Cada sección se valida por separado: si una falta o es inválida
+        queda con su resultado neutro y `error`, y las demás se usan igual.
+        """
+        sections = {}
+        for section, key, build in (
+            ("classification", "lead", self._lead_section),
+            ("intent", "intent", self._intent_section),
+            ("sentiment", "sentiment", self._sentiment_section),
+        ):
+            data = result.get(key)
+            try:
+                if not isinstance(data, dict):
+                    raise ValueError(f"Sección '{key}' ausente o inválida")
+                sections[section] = build(data)
+            except Exception as e:
+                logger.warning("message_analysis_section_invalid", section=section, error=str(e))
+                sections[section] = neutral_result(section, str(e))
+        
+        sections["classification"].processing_time_ms = processing_time_ms
+        
+        return MessageAnalysis(
+            lead_score=sections["classification"],
+            intent=sections["intent"],
+            sentiment=sections["sentiment"],
+            ai_model_used=self.model_name,
+            processing_time_ms=processing_time_ms
+        )
+    
+    def _lead_section(self, lead: Dict[str, Any]) -> LeadScore:
+        return LeadScore(
+            score=lead["score"],
+            category=lead.get("category", "warm"),
+            reasoning=lead.get("reasoning", ""),
+            recommended_action=lead.get("recommended_action", ""),
+            ai_model_used=self.model_name
+        )
+    
+    def _intent_section(self, intent: Dict[str, Any]) -> IntentDetectionResult:
+        return IntentDetectionResult(
+            primary_intent=intent["primary_intent"],
+            secondary_intents=intent.get("secondary_intents", []),
+            confidence=intent.get("confidence", 0.5),
+            entities=intent.get("entities", {}),
+            reasoning=intent.get("reasoning"),
+            ai_model_used=self.model_name
+        )
+    
+    def _sentiment_section(self, sentiment: Dict[str, Any]) -> SentimentResult:
+        return SentimentResult(
+            sentiment=sentiment["sentiment"],
+            score=sentiment.get("score", 0.0),
+            confidence=sentiment.get("confidence", 0.5),
+            emotions=sentiment.get("emotions", {}),
+            urgency_level=sentiment.get("urgency_level"),
+            recommended_priority=sentiment.get("recommended_priority"),
+            churn_risk=sentiment.get("churn_risk"),
+            ai_model_used=self.model_name
+        )
@@ -0,0 +1,330 @@
+"""
+Caché de respuestas de IA
+
+`CachedAIAdapter` envuelve cualquier `AIAdapter`:
+
+- Nivel exacto: clave = hash(método, modelo, prompt normalizado, parámetros),
+  primero en un LRU en memoria y luego en Redis, ambos con TTL.
+- Nivel semántico (opcional): si el adaptador soporta embeddings, un prompt
+  casi idéntico a uno ya respondido (coseno >= umbral) reutiliza la respuesta.
+  Solo aplica a los métodos de clasificación, no a la generación de texto.
+
+El modelo de la clave es el que efectivamente respondería: si el flujo
+agotó su presupuesto, el modelo barato de `usage_ledger.fallback_model`.
+
+`chat` y `chat_stream` no se cachean: dependen de todo el historial de la
+conversación. `generate_response` solo se cachea con
+`AI_CACHE_GENERATE_RESPONSE` (texto libre que no siempre debe repetirse).
+"""
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+import numpy as np
+import redis.asyncio as redis
+from prometheus_client import Counter
+from pydantic import BaseModel
+from app.ai.base import AIAdapter
+from app.ai.usage import usage_ledger
+from app.schemas.lead import LeadScore
+from app.schemas.intent import IntentDetectionResult
+from app.schemas.sentiment import SentimentResult
+from app.schemas.analysis import MessageAnalysis
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+AI_CACHE_REQUESTS = Counter(
+    "ai_cache_requests_total",
+    "Consultas al caché de respuestas de IA",
+    ["method", "result"]
+)
+
+# Métodos donde un prompt casi idéntico debe dar la misma respuesta
+SEMANTIC_METHODS = {"classify_lead", "detect_intent", "analyze_sentiment", "analyze_message"}
+
+REDIS_KEY_PREFIX = "ai_cache:"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Prompt sin diferencias de espacios/indentación"""
+    return _WHITESPACE.sub(" ", prompt).strip()
+
+
+def cache_key(method: str, model: str, prompt: str, params: Dict[str, Any]) -> str:
+    """Clave estable para el nivel exacto"""
+    payload = json.dumps(
+        {"method": method, "model": model, "prompt": prompt, "params": params},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class LRUCache:
+    """LRU en memoria con expiración por entrada"""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class SemanticCache:
+    """Vecino más cercano por coseno sobre embeddings de prompts"""
+
+    def __init__(self, max_entries: int, ttl_seconds: int, threshold: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        # bucket (método + modelo + parámetros) -> [(expira, vector, valor)]
+        self._buckets: Dict[str, List[Tuple[float, np.ndarray, str]]] = {}
+
+    def get(self, bucket: str, vector: np.ndarray) -> Optional[str]:
+        now = time.monotonic()
+        entries = [e for e in self._buckets.get(bucket, []) if e[0] >= now]
+        self._buckets[bucket] = entries
+        if not entries:
+            return None
+
+        similarities = np.stack([e[1] for e in entries]) @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.threshold:
+            return entries[best][2]
+        return None
+
+    def set(self, bucket: str, vector: np.ndarray, value: str):
+        entries = self._buckets.setdefault(bucket, [])
+        entries.append((time.monotonic() + self.ttl_seconds, vector, value))
+        if len(entries) > self.max_entries:
+            del entries[:len(entries) - self.max_entries]
+
+
+class CachedAIAdapter(AIAdapter):
+    """Envuelve un adaptador y cachea sus respuestas"""
+
+    def __init__(
+        self,
+        adapter: AIAdapter,
+        ttl_seconds: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        redis_url: Optional[str] = None,
+        semantic: Optional[bool] = None,
+        cache_generate: Optional[bool] = None
+    ):
+        self.adapter = adapter
+        self.ttl_seconds = ttl_seconds or settings.REDIS_CACHE_TTL
+        self.memory = LRUCache(max_entries or settings.AI_CACHE_MAX_ENTRIES, self.ttl_seconds)
+        self.redis_url = redis_url if redis_url is not None else settings.REDIS_URL
+        self._redis: Optional[redis.Redis] = None
+
+        use_semantic = settings.AI_CACHE_SEMANTIC_ENABLED if semantic is None else semantic
+        self.semantic = SemanticCache(
+            max_entries or settings.AI_CACHE_MAX_ENTRIES,
+            self.ttl_seconds,
+            settings.AI_CACHE_SEMANTIC_THRESHOLD
+        ) if use_semantic else None
+        self.cache_generate = (
+            settings.AI_CACHE_GENERATE_RESPONSE if cache_generate is None else cache_generate
+        )
+
+    @property
+    def model_name(self) -> str:
+        return self.adapter.model_name
+
+    @property
+    def provider_name(self) -> str:
+        return self.adapter.provider_name
+
+    async def classify_lead(
+        self,
+        prompt: str,
+        response_format: Optional[type] = None
+    ) -> LeadScore:
+        return await self._cached(
+            "classify_lead", prompt, {},
+            lambda: self.adapter.classify_lead(prompt, response_format),
+            LeadScore.model_validate_json
+        )
+
+    async def detect_intent(
+        self,
+        prompt: str,
+        valid_intents: Optional[List[str]] = None
+    ) -> IntentDetectionResult:
+        return await self._cached(
+            "detect_intent", prompt, {"valid_intents": valid_intents},
+            lambda: self.adapter.detect_intent(prompt, valid_intents),
+            IntentDetectionResult.model_validate_json
+        )
+
+    async def analyze_sentiment(self, prompt: str) -> SentimentResult:
+        return await self._cached(
+            "analyze_sentiment", prompt, {},
+            lambda: self.adapter.analyze_sentiment(prompt),
+            SentimentResult.model_validate_json
+        )
+
+    async def analyze_message(
+        self,
+        prompt: str,
+        valid_intents: Optional[List[str]] = None
+    ) -> MessageAnalysis:
+        return await self._cached(
+            "analyze_message", prompt, {"valid_intents": valid_intents},
+            lambda: self.adapter.analyze_message(prompt, valid_intents),
+            MessageAnalysis.model_validate_json
+        )
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 500
+    ) -> str:
+        return await self.adapter.chat(messages, temperature=temperature, max_tokens=max_tokens)
+
+    async def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 500
+    ) -> AsyncIterator[str]:
+        async with aclosing(self.adapter.chat_stream(
+            messages, temperature=temperature, max_tokens=max_tokens
+        )) as stream:
+            async for text in stream:
+                yield text
+
+    async def generate_response(self, prompt: str, **kwargs) -> str:
+        if not self.cache_generate:
+            return await self.adapter.generate_response(prompt, **kwargs)
+        return await self._cached(
+            "generate_response", prompt, kwargs,
+            lambda: self.adapter.generate_response(prompt, **kwargs),
+            json.loads
+        )
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        return await self.adapter.embed(texts)
+
+    async def aclose(self):
+        """Cierra la conexión a Redis"""
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    async def _cached(
+        self,
+        method: str,
+        prompt: str,
+        params: Dict[str, Any],
+        call: Callable,
+        load: Callable[[str], Any]
+    ):
+        """Busca en memoria -> Redis -> semántico; si no, llama al proveedor"""
+        normalized = normalize_prompt(prompt)
+        model = self._effective_model()
+        key = cache_key(method, model, normalized, params)
+
+        value = self.memory.get(key)
+        if value is not None:
+            AI_CACHE_REQUESTS.labels(method=method, result="hit_memory").inc()
+            return load(value)
+
+        value = await self._redis_get(key)
+        if value is not None:
+            AI_CACHE_REQUESTS.labels(method=method, result="hit_redis").inc()
+            self.memory.set(key, value)
+            return load(value)
+
+        bucket = vector = None
+        if self.semantic is not None and method in SEMANTIC_METHODS:
+            bucket = cache_key(method, model, "", params)
+            vector = await self._embed(normalized)
+            if vector is not None:
+                value = self.semantic.get(bucket, vector)
+                if value is not None:
+                    AI_CACHE_REQUESTS.labels(method=method, result="hit_semantic").inc()
+                    self.memory.set(key, value)
+                    return load(value)
+
+        AI_CACHE_REQUESTS.labels(method=method, result="miss").inc()
+        result = await call()
+        if isinstance(result, MessageAnalysis) and result.failed_sections:
+            # Con una sección inválida no se cachea: se volvería a servir rota
+            return result
+
+        value = result.model_dump_json() if isinstance(result, BaseModel) else json.dumps(result)
+        self.memory.set(key, value)
+        await self._redis_set(key, value)
+        if vector is not None:
+            self.semantic.set(bucket, vector, value)
+
+        return result
+
+    def _effective_model(self) -> str:
+        """Modelo que atendería la llamada (el barato si se agotó el presupuesto)"""
+        return usage_ledger.fallback_model(self.provider_name) or self.model_name
+
+    @property
+    def redis(self) -> Optional[redis.Redis]:
+        if self._redis is None and self.redis_url:
+            self._redis = redis.from_url(self.redis_url, decode_responses=True)
+        return self._redis
+
+    async def _redis_get(self, key: str) -> Optional[str]:
+        if self.redis is None:
+            return None
+        try:
+            return await self.redis.get(REDIS_KEY_PREFIX + key)
+        except Exception as e:
+            logger.warning("ai_cache_redis_error", operation="get", error=str(e))
+            return None
+
+    async def _redis_set(self, key: str, value: str):
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(REDIS_KEY_PREFIX + key, value, ex=self.ttl_seconds)
+        except Exception as e:
+            logger.warning("ai_cache_redis_error", operation="set", error=str(e))
+
+    async def _embed(self, text: str) -> Optional[np.ndarray]:
+        """Embedding normalizado del prompt (None si el adaptador no lo soporta)"""
+        try:
+            vector = np.asarray((await self.adapter.embed([text]))[0], dtype=np.float32)
+        except NotImplementedError:
+            self.semantic = None
+            return None
+        except Exception as e:
+            logger.warning("ai_cache_embedding_error", error=str(e))
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
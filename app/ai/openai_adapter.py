@@ -1,15 +1,18 @@
 """
 Adaptador para OpenAI (GPT-4)
 """
-from typing import Optional, Dict, Any, List
+from contextlib import aclosing
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
 import json
 import time
+import httpx
 from openai import AsyncOpenAI
 from app.ai.base import AIAdapter
 from app.core.config import settings
 from app.schemas.lead import LeadScore
 from app.schemas.intent import IntentDetectionResult
 from app.schemas.sentiment import SentimentResult
+from app.schemas.analysis import MessageAnalysis
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -18,16 +21,25 @@ logger = get_logger(__name__)
 class OpenAIAdapter(AIAdapter):
     """Adaptador para OpenAI GPT"""
     
-    def __init__(self):
+    provider_name = "openai"
+    
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
         if not settings.OPENAI_API_KEY:
             raise ValueError("OPENAI_API_KEY no configurada")
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        # http_client compartido (ver app.ai.registry) para reutilizar conexiones
+        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, http_client=http_client)
         self._model_name = settings.OPENAI_MODEL
     
     @property
     def model_name(self) -> str:
         return self._model_name
     
+    def _token_usage(self, response: Any) -> Tuple[int, int]:
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return 0, 0
+        return usage.prompt_tokens or 0, getattr(usage, "completion_tokens", 0) or 0
+    
     async def classify_lead(
         self,
         prompt: str,
@@ -37,7 +49,9 @@ class OpenAIAdapter(AIAdapter):
         start_time = time.time()
         
         try:
-            response = await self.client.chat.completions.create(
+            response = await self._observed(
+                "classify_lead",
+                self.client.chat.completions.create,
                 model=self.model_name,
                 messages=[
                     {"role": "system", "content": "Eres un experto en clasificación de leads. Responde siempre en formato JSON válido."},
@@ -75,7 +89,9 @@ class OpenAIAdapter(AIAdapter):
             if valid_intents:
                 system_prompt += f"\nIntenciones válidas: {', '.join(valid_intents)}"
             
-            response = await self.client.chat.completions.create(
+            response = await self._observed(
+                "detect_intent",
+                self.client.chat.completions.create,
                 model=self.model_name,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -106,7 +122,9 @@ class OpenAIAdapter(AIAdapter):
     ) -> SentimentResult:
         """Analiza sentimiento usando GPT"""
         try:
-            response = await self.client.chat.completions.create(
+            response = await self._observed(
+                "analyze_sentiment",
+                self.client.chat.completions.create,
                 model=self.model_name,
                 messages=[
                     {"role": "system", "content": "Eres un experto en análisis de sentimiento. Responde siempre en formato JSON válido."},
@@ -133,6 +151,41 @@ class OpenAIAdapter(AIAdapter):
             logger.error("openai_sentiment_analysis_error", error=str(e))
             raise
     
+    async def analyze_message(
+        self,
+        prompt: str,
+        valid_intents: Optional[List[str]] = None
+    ) -> MessageAnalysis:
+        """Lead score, intención y sentimiento en una sola llamada a GPT"""
+        start_time = time.time()
+        
+        try:
+            system_prompt = "Eres un experto en análisis de mensajes de clientes. Responde siempre en formato JSON válido."
+            if valid_intents:
+                system_prompt += f"\nIntenciones válidas: {', '.join(valid_intents)}"
+            
+            response = await self._observed(
+                "analyze_message",
+                self.client.chat.completions.create,
+                model=self.model_name,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.3
+            )
+            
+            content = response.choices[0].message.content
+            result = json.loads(content)
+            
+            processing_time = int((time.time() - start_time) * 1000)
+            
+            return self._build_message_analysis(result, processing_time)
+        except Exception as e:
+            logger.error("openai_message_analysis_error", error=str(e))
+            raise
+    
     async def chat(
         self,
         messages: List[Dict[str, str]],
@@ -141,7 +194,9 @@ class OpenAIAdapter(AIAdapter):
     ) -> str:
         """Genera respuesta conversacional"""
         try:
-            response = await self.client.chat.completions.create(
+            response = await self._observed(
+                "chat",
+                self.client.chat.completions.create,
                 model=self.model_name,
                 messages=messages,
                 temperature=temperature,
@@ -152,6 +207,46 @@ class OpenAIAdapter(AIAdapter):
             logger.error("openai_chat_error", error=str(e))
             raise
     
+    async def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 500
+    ) -> AsyncIterator[str]:
+        """Respuesta conversacional en fragmentos (stream=True)"""
+        try:
+            # aclosing: si el consumidor corta, el stream del proveedor se cierra ya
+            async with aclosing(self._observed_stream(
+                "chat_stream",
+                self.client.chat.completions.create,
+                _delta_text,
+                messages,
+                model=self.model_name,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )) as stream:
+                async for text in stream:
+                    yield text
+        except Exception as e:
+            logger.error("openai_chat_stream_error", error=str(e))
+            raise
+    
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embeddings de los textos"""
+        try:
+            response = await self._observed(
+                "embed",
+                self.client.embeddings.create,
+                model=settings.OPENAI_EMBEDDING_MODEL,
+                input=texts
+            )
+            return [item.embedding for item in response.data]
+        except Exception as e:
+            logger.error("openai_embedding_error", error=str(e))
+            raise
+    
     async def generate_response(
         self,
         prompt: str,
@@ -162,7 +257,9 @@ class OpenAIAdapter(AIAdapter):
         max_tokens = kwargs.get("max_tokens", 500)
         
         try:
-            response = await self.client.chat.completions.create(
+            response = await self._observed(
+                "generate_response",
+                self.client.chat.completions.create,
                 model=self.model_name,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=temperature,
@@ -173,3 +270,9 @@ class OpenAIAdapter(AIAdapter):
             logger.error("openai_generate_error", error=str(e))
             raise
 
+
+def _delta_text(chunk: Any) -> Optional[str]:
+    """Texto de un chunk de chat.completions en streaming"""
+    if not chunk.choices:
+        return None
+    return chunk.choices[0].delta.content
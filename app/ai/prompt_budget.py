@@ -0,0 +1,162 @@
+"""
+Presupuesto de tokens para prompts conversacionales
+
+`PromptBudget.fit` recorta el historial antes de llamar a `ai.chat`:
+
+- Conserva los mensajes de sistema iniciales y el último turno del usuario.
+- Agrega turnos anteriores del más reciente al más antiguo mientras quepan
+  en `CHAT_PROMPT_MAX_TOKENS` (y en `MAX_CONVERSATION_HISTORY` turnos).
+- Los turnos que no caben se reemplazan por un resumen extractivo corto
+  (lo que dijo el cliente, recortado a `CHAT_HISTORY_SUMMARY_MAX_TOKENS`).
+
+Los tokens se cuentan con tiktoken (encoding del modelo; cl100k_base para
+modelos que tiktoken no conoce, ej: Claude, como aproximación). Los conteos
+se cachean por texto, así el prompt de sistema repetido no se re-codifica.
+Si tiktoken no puede cargar el encoding (sin red para descargarlo), se
+estima con ~4 caracteres por token.
+"""
+import math
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional
+import tiktoken
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_ENCODING = "cl100k_base"
+
+# Formato de chat de OpenAI: tokens fijos por mensaje y para iniciar la respuesta
+TOKENS_PER_MESSAGE = 3
+REPLY_PRIMING_TOKENS = 3
+
+CHARS_PER_TOKEN_ESTIMATE = 4
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str) -> Optional[tiktoken.Encoding]:
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        pass
+    except Exception as e:
+        logger.warning("tiktoken_encoding_unavailable", model=model, error=str(e))
+        return None
+    
+    try:
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception as e:
+        logger.warning("tiktoken_encoding_unavailable", model=model, error=str(e))
+        return None
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str, model: str) -> int:
+    """Tokens de `text` para `model` (cacheado por texto)"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN_ESTIMATE)
+    return len(encoding.encode(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str) -> str:
+    """Primeros `max_tokens` tokens de `text`"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN_ESTIMATE]
+    tokens = encoding.encode(text)
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+
+
+def message_tokens(message: Dict[str, str], model: str) -> int:
+    """Tokens de un mensaje de chat (contenido + formato)"""
+    tokens = TOKENS_PER_MESSAGE + count_tokens(message.get("content") or "", model)
+    if message.get("name"):
+        tokens += 1 + count_tokens(message["name"], model)
+    return tokens
+
+
+@dataclass
+class FittedPrompt:
+    """Mensajes recortados y lo que se descartó"""
+    messages: List[Dict[str, str]]
+    tokens: int
+    dropped: int = 0
+    summarized: bool = False
+    original_tokens: int = 0
+
+
+@dataclass
+class PromptBudget:
+    """Ajusta una conversación a una ventana de tokens"""
+    max_tokens: int = field(default_factory=lambda: settings.CHAT_PROMPT_MAX_TOKENS)
+    max_turns: int = field(default_factory=lambda: settings.MAX_CONVERSATION_HISTORY)
+    summary_max_tokens: int = field(default_factory=lambda: settings.CHAT_HISTORY_SUMMARY_MAX_TOKENS)
+    
+    def fit(self, messages: List[Dict[str, str]], model: str) -> FittedPrompt:
+        """
+        Recorta `messages` (sistema + historial + último mensaje) a la ventana.
+        
+        El sistema y el último mensaje se conservan siempre, aunque solos
+        excedan el presupuesto.
+        """
+        leading = 0
+        while leading < len(messages) and messages[leading].get("role") == "system":
+            leading += 1
+        system, turns = messages[:leading], messages[leading:]
+        latest, history = turns[-1:], turns[:-1]
+        
+        costs = [message_tokens(m, model) for m in history]
+        fixed = REPLY_PRIMING_TOKENS + sum(message_tokens(m, model) for m in system + latest)
+        original = fixed + sum(costs)
+        
+        # Del más reciente al más antiguo mientras quepa
+        used = fixed
+        kept = 0
+        for cost in reversed(costs):
+            if kept >= self.max_turns or used + cost > self.max_tokens:
+                break
+            used += cost
+            kept += 1
+        
+        kept_history = history[len(history) - kept:] if kept else []
+        dropped_history = history[:len(history) - kept]
+        
+        summary: List[Dict[str, str]] = []
+        if dropped_history:
+            note = self._summarize(dropped_history, model, self.max_tokens - used)
+            if note:
+                summary = [note]
+                used += message_tokens(note, model)
+        
+        return FittedPrompt(
+            messages=system + summary + kept_history + latest,
+            tokens=used,
+            dropped=len(dropped_history),
+            summarized=bool(summary),
+            original_tokens=original
+        )
+    
+    def _summarize(
+        self,
+        dropped: List[Dict[str, str]],
+        model: str,
+        available_tokens: int
+    ) -> Optional[Dict[str, str]]:
+        """Resumen extractivo de los turnos descartados (sin llamar a la IA)"""
+        budget = min(self.summary_max_tokens, available_tokens - TOKENS_PER_MESSAGE)
+        customer_turns = [m.get("content") or "" for m in dropped if m.get("role") == "user"]
+        if budget <= 0 or not customer_turns:
+            return None
+        
+        header = f"Resumen de {len(dropped)} mensajes anteriores. El cliente mencionó: "
+        body_budget = budget - count_tokens(header, model)
+        if body_budget <= 0:
+            return None
+        
+        body = truncate_to_tokens(" | ".join(customer_turns), body_budget, model)
+        return {"role": "system", "content": header + body}
+
+
+prompt_budget = PromptBudget()
@@ -0,0 +1,55 @@
+"""
+Límite de requests por minuto por proveedor de IA
+
+Limitador compartido por proceso: todas las llamadas a un mismo proveedor
+se espacian para respetar `<PROVEEDOR>_RATE_LIMIT_RPM`.
+"""
+import asyncio
+import time
+from typing import Dict, Optional
+from app.ai.base import AIAdapter
+from app.core.config import settings
+
+
+class RateLimiter:
+    """Espacia las adquisiciones para no superar `requests_per_minute`"""
+    
+    def __init__(self, requests_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self._interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """Espera hasta el próximo turno disponible"""
+        if not self._interval:
+            return
+        
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self._interval
+        
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+_PROVIDER_RPM = {
+    "openai": lambda: settings.OPENAI_RATE_LIMIT_RPM,
+    "anthropic": lambda: settings.ANTHROPIC_RATE_LIMIT_RPM,
+}
+
+_limiters: Dict[str, RateLimiter] = {}
+
+
+def rate_limiter_for(adapter: Optional[AIAdapter]) -> Optional[RateLimiter]:
+    """Limitador compartido del proveedor del adaptador (None si no aplica)"""
+    if adapter is None:
+        return None
+    
+    provider = adapter.provider_name
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        rpm = _PROVIDER_RPM.get(provider, lambda: 0)()
+        limiter = _limiters[provider] = RateLimiter(rpm)
+    return limiter
@@ -0,0 +1,115 @@
+"""
+Registro de clientes de IA por proceso
+
+Cada proveedor se crea una sola vez con un cliente HTTP compartido
+(conexiones keep-alive reutilizadas), en lugar de un cliente nuevo y un
+handshake TLS por request, envuelto en el caché de respuestas
+(`app.ai.cache`) si AI_CACHE_ENABLED. Se inicializa en el lifespan de FastAPI y se
+cierra al apagar la aplicación.
+"""
+import asyncio
+from typing import Dict, Optional
+import httpx
+from app.ai.base import AIAdapter
+from app.ai.openai_adapter import OpenAIAdapter
+from app.ai.anthropic_adapter import AnthropicAdapter
+from app.ai.cache import CachedAIAdapter
+from app.jobs.tracking import record_ai_call
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Prioridad del adaptador por defecto: OpenAI > Anthropic
+DEFAULT_PROVIDERS = ("openai", "anthropic")
+
+PROVIDER_ALIASES = {
+    "claude": "anthropic",
+}
+
+
+class AIClientRegistry:
+    """Adaptadores de IA compartidos, uno por proveedor"""
+    
+    def __init__(self):
+        self._adapters: Dict[str, AIAdapter] = {}
+        self._http_clients: Dict[str, httpx.AsyncClient] = {}
+    
+    def get(self, provider: str) -> AIAdapter:
+        """
+        Adaptador compartido del proveedor (se crea en el primer uso).
+        
+        Raises:
+            ValueError: si el proveedor no existe o no está configurado
+        """
+        provider = PROVIDER_ALIASES.get(provider.lower(), provider.lower())
+        adapter = self._adapters.get(provider)
+        if adapter is None:
+            adapter = self._create(provider)
+            if settings.AI_CACHE_ENABLED:
+                adapter = CachedAIAdapter(adapter)
+            self._adapters[provider] = adapter
+            logger.info("ai_adapter_registered", provider=provider, model=adapter.model_name)
+        return adapter
+    
+    def get_default(self) -> Optional[AIAdapter]:
+        """Primer proveedor configurado según prioridad"""
+        for provider in DEFAULT_PROVIDERS:
+            try:
+                return self.get(provider)
+            except Exception:
+                continue
+        return None
+    
+    def startup(self):
+        """Crea por adelantado los adaptadores configurados"""
+        for provider in DEFAULT_PROVIDERS:
+            try:
+                self.get(provider)
+            except Exception as e:
+                logger.info("ai_adapter_not_available", provider=provider, reason=str(e))
+    
+    async def aclose(self):
+        """Cierra los pools HTTP compartidos y las conexiones del caché"""
+        clients = list(self._http_clients.values())
+        for adapter in self._adapters.values():
+            if isinstance(adapter, CachedAIAdapter):
+                await adapter.aclose()
+        self._adapters.clear()
+        self._http_clients.clear()
+        await asyncio.gather(*(client.aclose() for client in clients), return_exceptions=True)
+        logger.info("ai_registry_closed", clients=len(clients))
+    
+    def _create(self, provider: str) -> AIAdapter:
+        if provider == "openai":
+            return OpenAIAdapter(http_client=self._http_client(provider))
+        if provider == "anthropic":
+            return AnthropicAdapter(http_client=self._http_client(provider))
+        if provider in ("gemini", "google"):
+            # TODO: Implementar cuando esté disponible
+            raise NotImplementedError("Gemini adapter no implementado aún")
+        raise ValueError(f"Proveedor de IA desconocido: {provider}")
+    
+    def _http_client(self, provider: str) -> httpx.AsyncClient:
+        """Cliente HTTP con pool de conexiones keep-alive para un proveedor"""
+        client = self._http_clients.get(provider)
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(settings.AI_HTTP_TIMEOUT, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=settings.AI_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.AI_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.AI_HTTP_KEEPALIVE_EXPIRY
+                ),
+                event_hooks={"request": [_count_request]},
+            )
+            self._http_clients[provider] = client
+        return client
+
+
+async def _count_request(request: httpx.Request):
+    """Cuenta la request en la ejecución de job en curso (si hay una)"""
+    record_ai_call()
+
+
+ai_registry = AIClientRegistry()
@@ -0,0 +1,254 @@
+"""
+Contabilidad de tokens y costo por llamada a IA
+
+Cada llamada a un proveedor (`AIAdapter._observed`) se anota en
+`usage_ledger` con sus tokens, costo estimado y el flujo que la originó
+(`ai_flow("chatbot", entity_id)` en un contextvar). Las anotaciones se
+escriben en la tabla `ai_usage` por lotes desde una tarea en segundo plano,
+sin bloquear la llamada.
+
+Presupuestos: `AI_FLOW_BUDGETS_USD` define un gasto diario por flujo. El
+gasto del día se acumula en Redis (compartido entre procesos); con el
+presupuesto agotado, las llamadas del flujo pasan al modelo más barato del
+proveedor (`AI_BUDGET_FALLBACK_MODELS`) y los servicios con atajo local
+(ej: detección de intención) lo prefieren a la IA.
+"""
+import asyncio
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+import redis.asyncio as redis
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# USD por millón de tokens (prompt, completion). Se busca el prefijo más largo.
+MODEL_PRICES_PER_MTOK: Dict[str, Tuple[float, float]] = {
+    "gpt-4-turbo": (10.0, 30.0),
+    "gpt-4o-mini": (0.15, 0.6),
+    "gpt-4o": (5.0, 15.0),
+    "gpt-4": (30.0, 60.0),
+    "gpt-3.5-turbo": (0.5, 1.5),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+    "claude-opus-4": (15.0, 75.0),
+    "claude-sonnet-4": (3.0, 15.0),
+    "claude-3-7-sonnet": (3.0, 15.0),
+    "claude-3-5-sonnet": (3.0, 15.0),
+    "claude-3-5-haiku": (0.8, 4.0),
+    "claude-3-opus": (15.0, 75.0),
+    "claude-3-sonnet": (3.0, 15.0),
+    "claude-3-haiku": (0.25, 1.25),
+}
+
+# Modelos sin precio ya advertidos (se loguea una vez por proceso)
+_unpriced_models: Set[str] = set()
+
+UNTAGGED_FLOW = "untagged"
+BUDGET_KEY_PREFIX = "ai_budget:"
+
+
+def model_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """
+    Costo estimado en USD.
+    
+    Un modelo sin precio conocido cuesta 0 (y no consume presupuesto): se
+    advierte una vez para agregarlo a MODEL_PRICES_PER_MTOK.
+    """
+    for prefix in sorted(MODEL_PRICES_PER_MTOK, key=len, reverse=True):
+        if model.startswith(prefix):
+            prompt_price, completion_price = MODEL_PRICES_PER_MTOK[prefix]
+            return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+    
+    if model not in _unpriced_models:
+        _unpriced_models.add(model)
+        logger.warning("ai_model_price_unknown", model=model)
+    return 0.0
+
+
+@dataclass
+class AIFlow:
+    """Flujo (y entidad) al que se imputa una llamada a IA"""
+    name: str
+    entity_id: Optional[str] = None
+
+
+current_ai_flow: ContextVar[Optional[AIFlow]] = ContextVar("current_ai_flow", default=None)
+
+
+@contextmanager
+def ai_flow(name: str, entity_id: Optional[str] = None) -> Iterator[AIFlow]:
+    """Imputa las llamadas a IA dentro del bloque al flujo `name`"""
+    flow = AIFlow(name, entity_id)
+    token = current_ai_flow.set(flow)
+    try:
+        yield flow
+    finally:
+        current_ai_flow.reset(token)
+
+
+class AIUsageLedger:
+    """Acumula el uso de IA y lo escribe en `ai_usage` por lotes"""
+    
+    def __init__(
+        self,
+        flush_interval_seconds: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        redis_url: Optional[str] = None
+    ):
+        self.flush_interval_seconds = flush_interval_seconds or settings.AI_USAGE_FLUSH_INTERVAL_SECONDS
+        self.batch_size = batch_size or settings.AI_USAGE_BATCH_SIZE
+        self.redis_url = redis_url if redis_url is not None else settings.REDIS_URL
+        self._pending: List[Dict[str, Any]] = []
+        self._spend_day = self._today()
+        self._spend: Dict[str, float] = {}
+        self._redis: Optional[redis.Redis] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+    
+    def record(
+        self,
+        provider: str,
+        model: str,
+        method: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        degraded: bool = False
+    ):
+        """Anota una llamada (no bloquea: la escritura es en segundo plano)"""
+        if not settings.AI_USAGE_ENABLED:
+            return
+        
+        flow = current_ai_flow.get() or AIFlow(UNTAGGED_FLOW)
+        cost = model_cost(model, prompt_tokens, completion_tokens)
+        
+        self._roll_day()
+        self._spend[flow.name] = self._spend.get(flow.name, 0.0) + cost
+        self._pending.append({
+            "id": str(uuid.uuid4()),
+            "flow": flow.name,
+            "entity_id": flow.entity_id,
+            "provider": provider,
+            "model": model,
+            "method": method,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cost_usd": cost,
+            "degraded": degraded,
+            "created_at": datetime.utcnow(),
+        })
+        
+        self._ensure_writer()
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+    
+    def budget_exhausted(self, flow: Optional[str] = None) -> bool:
+        """True si el flujo (default: el actual) agotó su presupuesto diario"""
+        if flow is None:
+            current = current_ai_flow.get()
+            flow = current.name if current else UNTAGGED_FLOW
+        budget = settings.AI_FLOW_BUDGETS_USD.get(flow)
+        if budget is None:
+            return False
+        self._roll_day()
+        return self._spend.get(flow, 0.0) >= budget
+    
+    def fallback_model(self, provider: str) -> Optional[str]:
+        """Modelo barato del proveedor si el flujo actual agotó su presupuesto"""
+        if not self.budget_exhausted():
+            return None
+        return settings.AI_BUDGET_FALLBACK_MODELS.get(provider)
+    
+    async def flush(self):
+        """Escribe lo pendiente en `ai_usage` y suma el gasto del día en Redis"""
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, []
+        
+        try:
+            # Import diferido: app.ai.base -> usage no debe cargar los modelos
+            from sqlalchemy import insert
+            from app.db.session import AsyncSessionLocal
+            from app.models.ai_usage import AIUsage
+            
+            async with AsyncSessionLocal() as db:
+                await db.execute(insert(AIUsage), rows)
+                await db.commit()
+        except Exception as e:
+            logger.error("ai_usage_write_failed", rows=len(rows), error=str(e))
+        
+        await self._sync_spend(rows)
+    
+    async def aclose(self):
+        """Detiene la escritura en segundo plano y escribe lo pendiente"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, RuntimeError):
+                pass
+            self._task = None
+        await self.flush()
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+    
+    def _ensure_writer(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._writer())
+    
+    async def _writer(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+    
+    async def _sync_spend(self, rows: List[Dict[str, Any]]):
+        """Suma el costo del lote al gasto diario compartido y lo trae de vuelta"""
+        if not self.redis_url:
+            return
+        if self._redis is None:
+            self._redis = redis.from_url(self.redis_url, decode_responses=True)
+        
+        by_flow: Dict[str, float] = {}
+        for row in rows:
+            by_flow[row["flow"]] = by_flow.get(row["flow"], 0.0) + row["cost_usd"]
+        
+        try:
+            pipe = self._redis.pipeline()
+            for flow, cost in by_flow.items():
+                key = f"{BUDGET_KEY_PREFIX}{self._spend_day}:{flow}"
+                pipe.incrbyfloat(key, cost)
+                pipe.expire(key, 2 * 86400)
+            results = await pipe.execute()
+        except Exception as e:
+            # Sin Redis el presupuesto se controla solo con el gasto local
+            logger.warning("ai_budget_sync_failed", error=str(e))
+            return
+        
+        # El total compartido ya incluye este lote y el de otros procesos
+        for flow, total in zip(by_flow, results[::2]):
+            pending = sum(r["cost_usd"] for r in self._pending if r["flow"] == flow)
+            self._spend[flow] = float(total) + pending
+    
+    def _roll_day(self):
+        today = self._today()
+        if today != self._spend_day:
+            self._spend_day = today
+            self._spend = {}
+    
+    @staticmethod
+    def _today() -> str:
+        return datetime.utcnow().strftime("%Y-%m-%d")
+
+
+usage_ledger = AIUsageLedger()
@@ -1,11 +1,16 @@
 """
 FLUJO 6: Agente Conversacional Autónomo
 """
-from fastapi import APIRouter, Depends, HTTPException
+from contextlib import aclosing
+from typing import AsyncIterator
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.schemas.conversation import ChatMessage, ChatContext
+from app.schemas.conversation import ChatMessage, ChatContext, ChatStreamEvent, ChatStreamRequest
 from app.services.chatbot import AutonomousChatbot
 from app.api.deps import get_database
+from app.db.session import AsyncSessionLocal
 from app.core.logging import get_logger
 
 router = APIRouter()
@@ -29,3 +34,86 @@ async def chat_respond(
         logger.error("chatbot_error", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@router.post("/stream")
+async def chat_stream(
+    message: str,
+    context: ChatContext,
+    db: AsyncSession = Depends(get_database)
+):
+    """
+    Igual que /respond, pero entrega la respuesta token a token como
+    Server-Sent Events (`event: token|escalate|done|error`).
+    """
+    try:
+        chatbot = AutonomousChatbot()
+    except Exception as e:
+        logger.error("chatbot_error", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return StreamingResponse(
+        _sse_events(chatbot, message, context, db),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/ws")
+async def chat_websocket(websocket: WebSocket):
+    """
+    Conversación por WebSocket: cada turno es un JSON `{"message", "context"}`
+    y la respuesta llega como eventos JSON (mismo formato que /stream).
+    """
+    await websocket.accept()
+    try:
+        chatbot = AutonomousChatbot()
+        while True:
+            try:
+                turn = ChatStreamRequest.model_validate(await websocket.receive_json())
+            except (ValidationError, ValueError) as e:
+                await websocket.send_text(
+                    ChatStreamEvent(event="error", content=str(e)).model_dump_json()
+                )
+                continue
+
+            async with AsyncSessionLocal() as db, aclosing(
+                _safe_events(chatbot, turn.message, turn.context, db)
+            ) as events:
+                async for event in events:
+                    await websocket.send_text(event.model_dump_json(exclude_none=True))
+    except WebSocketDisconnect:
+        logger.info("chatbot_websocket_closed")
+    except Exception as e:
+        logger.error("chatbot_error", error=str(e))
+        await websocket.close(code=1011)
+
+
+async def _safe_events(
+    chatbot: AutonomousChatbot,
+    message: str,
+    context: ChatContext,
+    db: AsyncSession
+) -> AsyncIterator[ChatStreamEvent]:
+    """
+    Eventos del chatbot; un error a mitad de respuesta se entrega como
+    evento. Si el cliente se desconecta, cerrar este generador cierra en
+    cadena el stream del proveedor.
+    """
+    try:
+        async with aclosing(chatbot.respond_stream(message, context, db)) as events:
+            async for event in events:
+                yield event
+    except Exception as e:
+        logger.error("chatbot_error", error=str(e))
+        yield ChatStreamEvent(event="error", content=str(e))
+
+
+async def _sse_events(
+    chatbot: AutonomousChatbot,
+    message: str,
+    context: ChatContext,
+    db: AsyncSession
+) -> AsyncIterator[str]:
+    async with aclosing(_safe_events(chatbot, message, context, db)) as events:
+        async for event in events:
+            yield f"event: {event.event}\ndata: {event.model_dump_json(exclude_none=True)}\n\n"
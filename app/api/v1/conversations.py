@@ -0,0 +1,25 @@
+"""
+Lectura de conversaciones (Postgres o archivo frío)
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.schemas.conversation import ConversationDetail
+from app.services.conversation_archive import ConversationArchive
+from app.api.deps import get_database
+
+router = APIRouter()
+
+
+@router.get("/{conversation_id}", response_model=ConversationDetail)
+async def get_conversation(
+    conversation_id: str,
+    db: AsyncSession = Depends(get_database)
+):
+    """
+    Conversación con sus mensajes y análisis de sentimiento.
+    Si ya fue archivada se lee del Parquet (`archived=true`).
+    """
+    conversation = await ConversationArchive().get_conversation(conversation_id, db)
+    if conversation is None:
+        raise HTTPException(status_code=404, detail="Conversación no encontrada")
+    return conversation
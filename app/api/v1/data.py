@@ -3,7 +3,7 @@ FLUJOS 18-20: Deduplicación, Limpieza y Enriquecimiento de Datos
 """
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.services.deduplicator import Deduplicator
+from app.services.deduplicator import Deduplicator, DeduplicationMode
 from app.services.data_cleaner import DataCleaner
 from app.services.enrichment import DataEnrichmentService
 from app.api.deps import get_database
@@ -15,15 +15,24 @@ logger = get_logger(__name__)
 
 @router.post("/deduplicate")
 async def deduplicate_data(
+    mode: DeduplicationMode = DeduplicationMode.FULL,
     db: AsyncSession = Depends(get_database)
 ):
     """
     FLUJO 18: Detecta y fusiona registros duplicados.
+    
+    - mode=full: recorre toda la tabla y reconstruye el índice de bloqueo
+    - mode=incremental: solo contactos nuevos/modificados desde la última corrida
     """
     try:
         deduplicator = Deduplicator()
-        duplicates = await deduplicator.find_duplicates(db)
-        return {"status": "completed", "duplicates_found": len(duplicates)}
+        result = await deduplicator.deduplicate(db, mode)
+        return {
+            "status": "completed",
+            "mode": result["mode"],
+            "rows_scanned": result["rows_scanned"],
+            "duplicates_found": len(result["duplicates"])
+        }
     except Exception as e:
         logger.error("deduplication_error", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,30 @@
+"""
+Historial de jobs programados
+"""
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.job import JobRun
+from app.schemas.job import JobRunResponse
+from app.api.deps import get_database
+
+router = APIRouter()
+
+
+@router.get("/runs", response_model=List[JobRunResponse])
+async def list_job_runs(
+    job_name: Optional[str] = Query(None, description="Filtrar por job (ej: cart_recovery)"),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_database)
+):
+    """
+    Últimas ejecuciones de jobs, más recientes primero.
+    Sirve para ver qué job se vuelve más lento a medida que crecen los datos.
+    """
+    query = select(JobRun).order_by(JobRun.started_at.desc()).limit(limit)
+    if job_name:
+        query = query.where(JobRun.job_name == job_name)
+    
+    result = await db.execute(query)
+    return result.scalars().all()
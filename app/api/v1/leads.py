@@ -4,7 +4,9 @@ FLUJO 2: Clasificación Automática de Lead
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.lead import LeadClassificationRequest, LeadScore
+from app.schemas.analysis import MessageAnalysisRequest, MessageAnalysis
 from app.services.lead_classifier import LeadClassifier
+from app.services.message_analyzer import MessageAnalyzer
 from app.api.deps import get_database
 from app.core.logging import get_logger
 
@@ -35,3 +37,21 @@ async def classify_lead(
         logger.error("lead_classification_endpoint_error", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
+
+
+@router.post("/analyze", response_model=MessageAnalysis)
+async def analyze_message(
+    request: MessageAnalysisRequest,
+    db: AsyncSession = Depends(get_database)
+):
+    """
+    Análisis combinado de un mensaje en una sola llamada a IA.
+    
+    Retorna score del lead, intención y sentimiento (FLUJOS 2, 3 y 4).
+    """
+    try:
+        analyzer = MessageAnalyzer()
+        return await analyzer.analyze(request, db)
+    except Exception as e:
+        logger.error("message_analysis_endpoint_error", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,15 +1,19 @@
 """
 FLUJO 1: Webhook de Entrada General
 """
-from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Depends, Request
 from fastapi.responses import PlainTextResponse
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Dict, Any
-from app.schemas.webhook import InboundWebhook, WebhookResponse
-from app.models.message import RawMessage, MessageChannel
+from typing import List, Optional
+from app.schemas.webhook import InboundWebhook, InboundMessage, WebhookResponse
+from app.models.message import RawMessage, RawMessageId, MessageChannel
 from app.services.message_processor import MessageProcessor
+from app.jobs.message_queue import message_queue
+from app.services.webhook_idempotency import webhook_idempotency, WEBHOOK_DUPLICATES
 from app.api.deps import get_database
 from app.core.config import settings
+from app.core.json import RawJSON
 from app.core.logging import get_logger
 from app.db.session import AsyncSessionLocal
 from datetime import datetime
@@ -20,7 +24,11 @@ logger = get_logger(__name__)
 
 
 async def process_message_background(message_id: str, channel: str):
-    """Wrapper para procesar mensaje en background con nueva sesión"""
+    """
+    Wrapper para procesar mensaje en background con nueva sesión.
+    
+    Solo se usa como respaldo cuando no se puede encolar en Redis.
+    """
     try:
         async with AsyncSessionLocal() as db:
             await MessageProcessor.process(message_id, channel, db)
@@ -28,71 +36,163 @@ async def process_message_background(message_id: str, channel: str):
         logger.error("background_processing_error", message_id=message_id, error=str(e))
 
 
+async def _insert_raw_messages(
+    channel: str,
+    messages: List[InboundMessage],
+    payload: Optional[RawJSON],
+    db: AsyncSession
+) -> List[str]:
+    """
+    Inserta los mensajes (un INSERT multi-fila) y retorna los ids creados.
+    
+    `payload` (bytes originales de la entrega) solo se pasa si la entrega
+    trae un único mensaje; si no, cada fila guarda el payload de su mensaje.
+    Se decide con los mensajes extraídos, no con los que quedan después de
+    descartar reintentos.
+    
+    Los ids del proveedor se registran antes en `raw_message_ids` con
+    ON CONFLICT DO NOTHING: los que ya existían son reintentos y se omiten
+    en lugar de abortar el lote.
+    """
+    received_at = datetime.utcnow()
+    message_channel = MessageChannel[channel.upper()]
+    
+    provider_ids = list(dict.fromkeys(
+        m.provider_message_id for m in messages if m.provider_message_id
+    ))
+    if provider_ids:
+        result = await db.execute(
+            insert(RawMessageId)
+            .values([
+                {"channel": message_channel, "provider_message_id": i, "received_at": received_at}
+                for i in provider_ids
+            ])
+            .on_conflict_do_nothing()
+            .returning(RawMessageId.provider_message_id)
+        )
+        new_ids = set(result.scalars())
+        fresh = []
+        for message in messages:
+            if message.provider_message_id:
+                if message.provider_message_id not in new_ids:
+                    continue
+                new_ids.discard(message.provider_message_id)
+            fresh.append(message)
+        messages = fresh
+    if not messages:
+        return []
+    
+    rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "channel": message_channel,
+            "provider_message_id": message.provider_message_id,
+            "sender_id": message.sender,
+            "content": message.content,
+            # Payload completo (bytes originales) solo si trae un único mensaje
+            "metadata": payload if payload is not None else message.payload,
+            "received_at": received_at,
+            "processed": False,
+        }
+        for message in messages
+    ]
+    result = await db.execute(insert(RawMessage).values(rows).returning(RawMessage.id))
+    return list(result.scalars())
+
+
 @router.post("/inbound", response_model=WebhookResponse)
 async def receive_inbound_message(
-    payload: Dict[str, Any],
+    request: Request,
     background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_database)
 ):
     """
     Recibe mensajes de WhatsApp, Instagram o Messenger.
     
-    - Valida el payload
-    - Almacena mensaje raw
-    - Dispara procesamiento asíncrono
+    - Parsea el body una sola vez (orjson) y conserva los bytes originales
+    - Extrae todos los mensajes del payload (Meta agrupa varios por entrega)
+    - Descarta reintentos de Meta (mismo id de mensaje) sin tocar la DB
+    - Almacena los mensajes raw en un solo INSERT
+    - Encola el procesamiento (worker separado)
     - Retorna 200 OK inmediatamente (requisito de Meta)
     """
     try:
         # 1. Validar origen del canal
-        webhook = InboundWebhook(**payload)
+        body = await request.body()
+        webhook = InboundWebhook.from_json(body)
         channel = webhook.get_channel()
         
         if channel == "unknown":
-            logger.warning("unknown_webhook_source", payload=payload)
+            logger.warning("unknown_webhook_source", payload=body.decode(errors="replace"))
             # Retornar 200 de todas formas para Meta
             return WebhookResponse(status="received", message_id=None)
         
-        # 2. Extraer datos normalizados
-        message_data = webhook.extract_message()
+        # 2. Extraer todos los mensajes del payload
+        messages = webhook.extract_messages()
+        if not messages:
+            return WebhookResponse(status="received", message_id=None)
+        
+        # Reintentos de entregas ya recibidas: se confirman sin procesar
+        provider_ids = [m.provider_message_id for m in messages if m.provider_message_id]
+        claimed = set(await webhook_idempotency.claim(channel, provider_ids))
+        fresh = [
+            m for m in messages
+            if not m.provider_message_id or m.provider_message_id in claimed
+        ]
+        if not fresh:
+            logger.debug("webhook_duplicate", channel=channel, count=len(messages))
+            return WebhookResponse(status="duplicate", message_id=None)
         
-        # 3. Guardar mensaje raw en DB
-        raw_message = RawMessage(
-            channel=MessageChannel[channel.upper()],
-            sender_id=message_data.get("sender", "unknown"),
-            content=message_data.get("content", ""),
-            metadata=payload,
-            received_at=datetime.utcnow()
-        )
-        db.add(raw_message)
-        await db.commit()
-        await db.refresh(raw_message)
+        # 3. Guardar mensajes raw en DB (un INSERT multi-fila)
+        whole_payload = RawJSON(body.decode()) if len(messages) == 1 else None
+        try:
+            message_ids = await _insert_raw_messages(channel, fresh, whole_payload, db)
+            await db.commit()
+        except Exception:
+            await webhook_idempotency.release(channel, list(claimed))
+            raise
         
-        # 4. Disparar procesamiento en background
-        # Nota: No podemos pasar db directamente, se creará nueva sesión en el procesador
-        background_tasks.add_task(
-            process_message_background,
-            message_id=raw_message.id,
-            channel=channel
-        )
+        # La clave de Redis expiró o Redis no estaba: raw_message_ids decide
+        if len(message_ids) < len(fresh):
+            WEBHOOK_DUPLICATES.labels(channel=channel, layer="database").inc(len(fresh) - len(message_ids))
+        if not message_ids:
+            return WebhookResponse(status="duplicate", message_id=None)
         
-        # 5. Notificar a n8n (webhook interno)
-        from app.integrations.n8n import N8NClient
-        n8n_client = N8NClient()
-        background_tasks.add_task(
-            n8n_client.notify_message_received,
-            message_id=raw_message.id
-        )
+        # 4. Encolar procesamiento en la cola durable (Redis Streams), un
+        # solo round-trip para todo el lote. El worker procesa y notifica a
+        # n8n; si Redis no está disponible se procesa en background en este
+        # mismo proceso.
+        try:
+            await message_queue.enqueue_many([(message_id, channel) for message_id in message_ids])
+        except Exception as e:
+            logger.error("message_enqueue_error", message_ids=message_ids, error=str(e))
+            
+            # 5. Notificar a n8n (webhook interno)
+            from app.integrations.n8n import N8NClient
+            n8n_client = N8NClient()
+            for message_id in message_ids:
+                background_tasks.add_task(
+                    process_message_background,
+                    message_id=message_id,
+                    channel=channel
+                )
+                background_tasks.add_task(
+                    n8n_client.notify_message_received,
+                    message_id=message_id
+                )
         
         logger.info(
             "message_received",
-            message_id=raw_message.id,
+            message_ids=message_ids,
             channel=channel,
-            sender=message_data.get("sender")
+            count=len(message_ids),
+            duplicates=len(messages) - len(message_ids)
         )
         
         return WebhookResponse(
             status="received",
-            message_id=raw_message.id,
+            message_id=message_ids[0],
+            message_ids=message_ids,
             processing_id=str(uuid.uuid4())
         )
         
@@ -2,7 +2,7 @@
 Configuración de la aplicación usando Pydantic Settings
 """
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 
 
 class Settings(BaseSettings):
@@ -24,10 +24,36 @@ class Settings(BaseSettings):
     # OpenAI
     OPENAI_API_KEY: Optional[str] = None
     OPENAI_MODEL: str = "gpt-4-turbo-preview"
+    OPENAI_EMBEDDING_MODEL: str = "text-embedding-3-small"
+    OPENAI_RATE_LIMIT_RPM: int = 500
     
     # Anthropic Claude
     ANTHROPIC_API_KEY: Optional[str] = None
     ANTHROPIC_MODEL: str = "claude-3-sonnet-20240229"
+    ANTHROPIC_RATE_LIMIT_RPM: int = 500
+    
+    # Pool HTTP compartido para proveedores de IA
+    AI_HTTP_TIMEOUT: float = 30.0
+    AI_HTTP_MAX_CONNECTIONS: int = 100
+    AI_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    AI_HTTP_KEEPALIVE_EXPIRY: float = 60.0
+    
+    # Caché de respuestas de IA (memoria + Redis, TTL = REDIS_CACHE_TTL)
+    AI_CACHE_ENABLED: bool = True
+    AI_CACHE_MAX_ENTRIES: int = 10000
+    AI_CACHE_SEMANTIC_ENABLED: bool = False
+    AI_CACHE_SEMANTIC_THRESHOLD: float = 0.97
+    AI_CACHE_GENERATE_RESPONSE: bool = False
+    
+    # Uso de IA: tokens/costo por flujo (tabla ai_usage) y presupuestos diarios
+    AI_USAGE_ENABLED: bool = True
+    AI_USAGE_FLUSH_INTERVAL_SECONDS: float = 5.0
+    AI_USAGE_BATCH_SIZE: int = 200
+    AI_FLOW_BUDGETS_USD: Dict[str, float] = {}
+    AI_BUDGET_FALLBACK_MODELS: Dict[str, str] = {
+        "openai": "gpt-3.5-turbo",
+        "anthropic": "claude-3-haiku-20240307",
+    }
     
     # Google Gemini
     GOOGLE_API_KEY: Optional[str] = None
@@ -46,6 +72,26 @@ class Settings(BaseSettings):
     
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
+    REDIS_CACHE_TTL: int = 3600
+    
+    # Cola de mensajes entrantes (Redis Streams)
+    MESSAGE_QUEUE_STREAM: str = "crm:inbound_messages"
+    MESSAGE_QUEUE_GROUP: str = "message_processors"
+    MESSAGE_QUEUE_MAXLEN: int = 100000
+    MESSAGE_QUEUE_CLAIM_IDLE_MS: int = 60000
+    MESSAGE_QUEUE_MAX_DELIVERIES: int = 5
+    MESSAGE_WORKER_BATCH_SIZE: int = 10
+    MESSAGE_WORKER_BLOCK_MS: int = 5000
+    WORKER_METRICS_PORT: int = 9101
+    
+    # Idempotencia de webhooks (ids de mensaje de Meta ya recibidos)
+    WEBHOOK_IDEMPOTENCY_TTL_SECONDS: int = 86400
+    RAW_MESSAGE_IDS_RETENTION_DAYS: int = 30
+    
+    # Particiones mensuales de raw_messages / messages (0 = sin retención)
+    PARTITION_MONTHS_AHEAD: int = 3
+    RAW_MESSAGES_RETENTION_MONTHS: int = 6
+    MESSAGES_RETENTION_MONTHS: int = 24
     
     # Logging
     LOG_LEVEL: str = "INFO"
@@ -59,15 +105,48 @@ class Settings(BaseSettings):
     STORAGE_TYPE: str = "local"
     STORAGE_PATH: str = "./storage"
     
+    # Archivo frío de conversaciones cerradas (Parquet + zstd en STORAGE_PATH)
+    ARCHIVE_CONVERSATIONS_AFTER_DAYS: int = 180
+    ARCHIVE_BATCH_SIZE: int = 500
+    ARCHIVE_ZSTD_LEVEL: int = 9
+    
     # Jobs intervals
     FOLLOW_UP_CHECK_INTERVAL_HOURS: int = 1
     CART_RECOVERY_CHECK_INTERVAL_HOURS: int = 1
     PAYMENT_REMINDER_CHECK_INTERVAL_HOURS: int = 24
     ALERTS_CHECK_INTERVAL_HOURS: int = 1
+    # Expresiones cron (reemplazan al intervalo si están definidas)
+    FOLLOW_UP_CRON: Optional[str] = None
+    CART_RECOVERY_CRON: Optional[str] = None
+    ALERTS_CRON: Optional[str] = None
+    PAYMENT_REMINDER_CRON: Optional[str] = None
+    DEDUP_CRON: Optional[str] = "0 3 * * *"
+    PARTITION_MAINTENANCE_CRON: Optional[str] = "0 2 * * *"
+    ARCHIVE_CRON: Optional[str] = "0 4 * * *"
+    SCHEDULER_TIMEZONE: str = "UTC"
+    SCHEDULER_LOCK_TTL_SECONDS: int = 300
+    SCHEDULER_MISFIRE_GRACE_SECONDS: int = 900
+    SCHEDULER_CATCH_UP: bool = True
+    SCHEDULER_METRICS_PORT: int = 9100
+    JOB_BATCH_SIZE: int = 500
+    JOB_AI_CONCURRENCY: int = 20
+    JOB_COMMIT_EVERY: int = 100
+    
+    # Detección de intención: confianza mínima para resolver sin IA
+    # (la segunda aplica cuando el flujo agotó su presupuesto del día)
+    INTENT_FAST_PATH_MIN_CONFIDENCE: float = 0.85
+    INTENT_FAST_PATH_BUDGET_MIN_CONFIDENCE: float = 0.75
+    
+    # Deduplicación
+    DEDUP_AI_BATCH_SIZE: int = 25
+    DEDUP_AI_MAX_CONCURRENCY: int = 4
     
     # Limits
     MAX_MESSAGE_LENGTH: int = 4096
     MAX_CONVERSATION_HISTORY: int = 50
+    # Ventana de tokens del prompt del chatbot (sin contar la respuesta)
+    CHAT_PROMPT_MAX_TOKENS: int = 3000
+    CHAT_HISTORY_SUMMARY_MAX_TOKENS: int = 200
     LEAD_SCORE_THRESHOLD_HOT: int = 80
     LEAD_SCORE_THRESHOLD_WARM: int = 50
     
@@ -0,0 +1,31 @@
+"""
+Serialización JSON rápida (orjson)
+
+- `loads` / `dumps`: usados por los motores de SQLAlchemy para las columnas
+  JSON, por la respuesta por defecto de la API (ORJSONResponse) y por las
+  integraciones salientes.
+- `RawJSON`: JSON ya serializado (ej: el body original de un webhook) que
+  se guarda tal cual, sin parsear ni volver a serializar.
+"""
+from typing import Any
+import orjson
+
+loads = orjson.loads
+
+
+class RawJSON(str):
+    """Texto JSON que `dumps` entrega sin modificar"""
+
+
+def dumps(obj: Any) -> str:
+    """Serializa a texto JSON (las claves no string se convierten)"""
+    if isinstance(obj, RawJSON):
+        return str(obj)
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Como `dumps`, pero en bytes (cuerpos HTTP)"""
+    if isinstance(obj, RawJSON):
+        return obj.encode()
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
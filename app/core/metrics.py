@@ -0,0 +1,144 @@
+"""
+Métricas de Prometheus de la API y de los proveedores de IA
+
+- `PrometheusMiddleware`: latencia, requests en curso y códigos de estado
+  por ruta (plantilla de la ruta, ej: /api/v1/leads/{lead_id}, no la URL).
+- `observe_ai_call`: latencia, tokens y errores por llamada a un proveedor,
+  registrado por `AIAdapter._observed`; en streaming además el tiempo al
+  primer token (`observe_time_to_first_token`).
+- `metrics_response`: contenido de `/metrics` (modo multiproceso si
+  PROMETHEUS_MULTIPROC_DIR está definido, ej: varios workers de uvicorn).
+"""
+import os
+import time
+from typing import Optional
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+)
+from prometheus_client import multiprocess
+from starlette.responses import Response
+from starlette.routing import Match, Router
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+UNMATCHED_ROUTE = "unmatched"
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "Requests HTTP por ruta y código de estado",
+    ["method", "route", "status"]
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Latencia de requests HTTP por ruta",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests HTTP en curso por ruta",
+    ["method", "route"],
+    multiprocess_mode="livesum"
+)
+
+AI_REQUESTS = Counter(
+    "ai_requests_total",
+    "Llamadas a proveedores de IA por resultado",
+    ["provider", "model", "method", "status"]
+)
+AI_REQUEST_DURATION = Histogram(
+    "ai_request_duration_seconds",
+    "Latencia de llamadas a proveedores de IA",
+    ["provider", "model", "method"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+)
+AI_TIME_TO_FIRST_TOKEN = Histogram(
+    "ai_time_to_first_token_seconds",
+    "Tiempo hasta el primer token en respuestas en streaming",
+    ["provider", "model", "method"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10)
+)
+AI_TOKENS = Counter(
+    "ai_tokens_total",
+    "Tokens consumidos en proveedores de IA",
+    ["provider", "model", "method", "kind"]
+)
+
+
+def observe_ai_call(
+    provider: str,
+    model: str,
+    method: str,
+    status: str,
+    duration_seconds: float,
+    prompt_tokens: int = 0,
+    completion_tokens: int = 0
+):
+    """Registra una llamada a un proveedor de IA"""
+    AI_REQUESTS.labels(provider=provider, model=model, method=method, status=status).inc()
+    AI_REQUEST_DURATION.labels(provider=provider, model=model, method=method).observe(duration_seconds)
+    if prompt_tokens:
+        AI_TOKENS.labels(provider=provider, model=model, method=method, kind="prompt").inc(prompt_tokens)
+    if completion_tokens:
+        AI_TOKENS.labels(provider=provider, model=model, method=method, kind="completion").inc(completion_tokens)
+
+
+def observe_time_to_first_token(provider: str, model: str, method: str, seconds: float):
+    """Registra el tiempo al primer token de una respuesta en streaming"""
+    AI_TIME_TO_FIRST_TOKEN.labels(provider=provider, model=model, method=method).observe(seconds)
+
+
+class PrometheusMiddleware:
+    """Middleware ASGI que instrumenta cada request HTTP"""
+    
+    def __init__(self, app: ASGIApp, router: Router):
+        self.app = app
+        self.router = router
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        method = scope["method"]
+        route = self._route_template(scope)
+        status = 500
+        
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method=method, route=route)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_DURATION.labels(method=method, route=route).observe(
+                time.perf_counter() - started
+            )
+            HTTP_REQUESTS.labels(method=method, route=route, status=str(status)).inc()
+            in_progress.dec()
+    
+    def _route_template(self, scope: Scope) -> str:
+        """
+        Plantilla de la ruta que atenderá el request. Las URLs sin ruta se
+        agrupan en una sola etiqueta para no crear series por cada URL.
+        """
+        for route in self.router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", UNMATCHED_ROUTE)
+        return UNMATCHED_ROUTE
+
+
+def metrics_response() -> Response:
+    """Métricas en formato de texto de Prometheus"""
+    registry: Optional[CollectorRegistry] = None
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    
+    data = generate_latest(registry) if registry else generate_latest()
+    return Response(data, media_type=CONTENT_TYPE_LATEST)
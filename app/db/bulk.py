@@ -0,0 +1,90 @@
+"""
+Actualizaciones agrupadas para jobs (unit of work)
+
+Los jobs marcan filas una por una (ej: `recovery_attempt_count += 1`). En
+lugar de un UPDATE + commit por fila, `BulkUpdate` acumula ids por
+operación y cada `flush_every` filas emite un UPDATE por operación:
+
+    UPDATE carts SET recovery_attempt_count = recovery_attempt_count + 1
+    WHERE id = ANY(:ids)
+
+seguido de un solo commit. Solo se registra una fila cuando su acción ya
+ocurrió (mensaje enviado); si el flush falla se hace rollback y ninguna
+fila del grupo queda marcada.
+"""
+from typing import Any, Dict, List, Mapping, Optional
+from sqlalchemy import any_, bindparam, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class BulkUpdate:
+    """Acumula ids por operación y los aplica con UPDATE ... WHERE id = ANY"""
+    
+    def __init__(
+        self,
+        db: AsyncSession,
+        model: Any,
+        operations: Mapping[str, Mapping[str, Any]],
+        flush_every: Optional[int] = None
+    ):
+        """
+        Args:
+            model: Modelo con columna `id`
+            operations: nombre -> valores del SET (columna -> valor o expresión)
+            flush_every: Filas acumuladas antes de escribir (JOB_COMMIT_EVERY)
+        """
+        self.db = db
+        self.model = model
+        self.operations = operations
+        self.flush_every = flush_every or settings.JOB_COMMIT_EVERY
+        self._pending: Dict[str, List[Any]] = {name: [] for name in operations}
+        self.flushed = 0
+    
+    @property
+    def pending(self) -> int:
+        return sum(len(ids) for ids in self._pending.values())
+    
+    async def add(self, operation: str, row_id: Any):
+        """Registra una fila para la operación; escribe al completar el grupo"""
+        self._pending[operation].append(row_id)
+        if self.pending >= self.flush_every:
+            await self.flush()
+    
+    def statement(self, operation: str, ids: List[Any]):
+        """UPDATE de una operación para los ids dados"""
+        ids_param = bindparam("ids", ids, type_=ARRAY(self.model.id.type))
+        return (
+            update(self.model)
+            .where(self.model.id == any_(ids_param))
+            .values(**self.operations[operation])
+            .execution_options(synchronize_session=False)
+        )
+    
+    async def flush(self):
+        """Escribe todas las operaciones pendientes en una transacción"""
+        batches = {name: ids for name, ids in self._pending.items() if ids}
+        if not batches:
+            return
+        
+        try:
+            for name, ids in batches.items():
+                await self.db.execute(self.statement(name, ids))
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(
+                "bulk_update_failed",
+                table=self.model.__tablename__,
+                rows=self.pending,
+                error=str(e)
+            )
+            raise
+        finally:
+            self._pending = {name: [] for name in self.operations}
+        
+        self.flushed += sum(len(ids) for ids in batches.values())
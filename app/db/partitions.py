@@ -0,0 +1,132 @@
+"""
+Particiones mensuales por rango de fecha
+
+`raw_messages` (received_at) y `messages` (sent_at) están particionadas
+por mes (migración 007). Cada partición se llama `<tabla>_<AAAA>_<MM>` y
+cubre [primer día del mes, primer día del mes siguiente).
+
+- `ensure_partitions`: crea las particiones de los próximos meses antes de
+  que lleguen filas (no hay partición DEFAULT: un INSERT sin partición
+  falla, así que se crean con margen).
+- `drop_expired_partitions`: DETACH + DROP de las particiones cuyo rango
+  terminó antes del corte de retención. Es O(1) por partición, a
+  diferencia de un DELETE masivo que deja la tabla llena de filas muertas.
+"""
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import List, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class PartitionedTable:
+    """Tabla particionada por mes sobre `column`"""
+    name: str
+    column: str
+
+
+RAW_MESSAGES = PartitionedTable("raw_messages", "received_at")
+MESSAGES = PartitionedTable("messages", "sent_at")
+
+
+def month_start(value: date) -> date:
+    """Primer día del mes de `value`"""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    """Primer día del mes `months` meses después (o antes si es negativo)"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: PartitionedTable, month: date) -> str:
+    return f"{table.name}_{month.year:04d}_{month.month:02d}"
+
+
+def partition_month(table: PartitionedTable, name: str) -> Optional[date]:
+    """Mes de una partición a partir de su nombre (None si no sigue el formato)"""
+    match = re.fullmatch(rf"{re.escape(table.name)}_(\d{{4}})_(\d{{2}})", name)
+    if not match:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def expired_partitions(
+    table: PartitionedTable,
+    names: List[str],
+    retention_months: int,
+    today: date
+) -> List[str]:
+    """Particiones cuyo mes completo quedó fuera de la retención"""
+    cutoff = add_months(month_start(today), -retention_months)
+    expired = []
+    for name in names:
+        month = partition_month(table, name)
+        if month is not None and add_months(month, 1) <= cutoff:
+            expired.append(name)
+    return sorted(expired)
+
+
+async def list_partitions(db: AsyncSession, table: PartitionedTable) -> List[str]:
+    """Nombres de las particiones adjuntas a la tabla"""
+    result = await db.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :table"
+        ),
+        {"table": table.name}
+    )
+    return list(result.scalars())
+
+
+async def ensure_partitions(
+    db: AsyncSession,
+    table: PartitionedTable,
+    months_ahead: int,
+    today: Optional[date] = None
+) -> List[str]:
+    """Crea (si faltan) las particiones del mes actual y los `months_ahead` siguientes"""
+    current = month_start(today or datetime.utcnow().date())
+    existing = set(await list_partitions(db, table))
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        name = partition_name(table, month)
+        if name in existing:
+            continue
+        await db.execute(text(
+            f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table.name}" '
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        ))
+        created.append(name)
+    await db.commit()
+    
+    if created:
+        logger.info("partitions_created", table=table.name, partitions=created)
+    return created
+
+
+async def drop_expired_partitions(
+    db: AsyncSession,
+    table: PartitionedTable,
+    retention_months: int,
+    today: Optional[date] = None
+) -> List[str]:
+    """Separa y elimina las particiones fuera de la retención"""
+    names = await list_partitions(db, table)
+    expired = expired_partitions(table, names, retention_months, today or datetime.utcnow().date())
+    for name in expired:
+        # Una partición por transacción: el lock sobre la tabla padre es breve
+        await db.execute(text(f'ALTER TABLE "{table.name}" DETACH PARTITION "{name}"'))
+        await db.execute(text(f'DROP TABLE "{name}"'))
+        await db.commit()
+        logger.info("partition_dropped", table=table.name, partition=name)
+    return expired
@@ -6,18 +6,23 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
 from typing import AsyncGenerator
 from app.core.config import settings
+from app.core import json
 
 # Motor asíncrono
 async_engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,
     future=True,
+    json_serializer=json.dumps,
+    json_deserializer=json.loads,
 )
 
 # Motor síncrono (para Alembic)
 sync_engine = create_engine(
     settings.DATABASE_SYNC_URL,
     echo=settings.DEBUG,
+    json_serializer=json.dumps,
+    json_deserializer=json.loads,
 )
 
 # Session makers
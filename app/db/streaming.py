@@ -0,0 +1,68 @@
+"""
+Iteración por keyset para jobs que recorren muchas filas
+
+En lugar de `result.scalars().all()` (todas las filas en memoria), pide
+páginas de `batch_size` ordenadas por columnas únicas en conjunto (ej:
+timestamp + id) y continúa desde la última clave vista:
+
+    WHERE (last_activity, id) > (:last_activity, :id)
+    ORDER BY last_activity, id
+    LIMIT :batch_size
+
+La memoria queda acotada al tamaño del lote sin importar cuántas filas
+coincidan, y no hay OFFSET que se degrade con páginas profundas.
+"""
+from typing import Any, AsyncIterator, List, Optional, Sequence
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+from app.core.config import settings
+from app.jobs.tracking import record_rows
+
+
+async def keyset_batches(
+    db: AsyncSession,
+    stmt: Select,
+    keys: Sequence[InstrumentedAttribute],
+    batch_size: Optional[int] = None
+) -> AsyncIterator[List[Any]]:
+    """
+    Recorre `stmt` (select de una entidad ORM) en lotes por keyset.
+
+    Args:
+        stmt: consulta sin ORDER BY ni LIMIT
+        keys: columnas de la entidad que la ordenan de forma única; la
+            última debe ser la clave primaria (desempate)
+        batch_size: filas por lote (default: JOB_BATCH_SIZE)
+    """
+    batch_size = batch_size or settings.JOB_BATCH_SIZE
+    last_key: Optional[List[Any]] = None
+
+    while True:
+        page = stmt.order_by(*keys).limit(batch_size)
+        if last_key is not None:
+            page = page.where(tuple_(*keys) > tuple_(*last_key))
+
+        result = await db.execute(page)
+        rows = result.scalars().all()
+        if not rows:
+            return
+
+        record_rows(len(rows))
+        last_key = [getattr(rows[-1], key.key) for key in keys]
+        yield rows
+
+        if len(rows) < batch_size:
+            return
+
+
+async def keyset_iter(
+    db: AsyncSession,
+    stmt: Select,
+    keys: Sequence[InstrumentedAttribute],
+    batch_size: Optional[int] = None
+) -> AsyncIterator[Any]:
+    """Igual que `keyset_batches` pero fila por fila"""
+    async for rows in keyset_batches(db, stmt, keys, batch_size):
+        for row in rows:
+            yield row
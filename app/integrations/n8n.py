@@ -4,6 +4,7 @@ Integración con n8n
 import httpx
 from typing import Dict, Any, Optional
 from app.core.config import settings
+from app.core import json
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -34,7 +35,11 @@ class N8NClient:
             url = f"{self.base_url}/{workflow_name}"
             
             async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.post(url, json=data)
+                response = await client.post(
+                    url,
+                    content=json.dumps_bytes(data),
+                    headers={"Content-Type": "application/json"}
+                )
                 response.raise_for_status()
                 
                 logger.info(
@@ -43,7 +48,7 @@ class N8NClient:
                     status_code=response.status_code
                 )
                 
-                return response.json()
+                return json.loads(response.content) if response.content else None
         except Exception as e:
             logger.error(
                 "n8n_webhook_error",
@@ -0,0 +1,76 @@
+"""
+Locks distribuidos en Redis para jobs programados
+
+Cada ejecución toma `scheduler:lock:<job>` con SET NX y un token propio. El
+TTL se renueva mientras el job corre, así que un job largo no pierde el
+lock, y si la réplica muere el lock expira solo. Liberar y renovar
+comparan el token (script Lua) para no tocar el lock de otra réplica.
+"""
+import asyncio
+import uuid
+from typing import Optional
+import redis.asyncio as redis
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+LOCK_KEY_PREFIX = "scheduler:lock:"
+
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+_EXTEND_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class JobLock:
+    """Lock exclusivo de un job entre réplicas"""
+    
+    def __init__(self, client: redis.Redis, name: str, ttl_seconds: Optional[int] = None):
+        self.client = client
+        self.key = LOCK_KEY_PREFIX + name
+        self.ttl_ms = (ttl_seconds or settings.SCHEDULER_LOCK_TTL_SECONDS) * 1000
+        self.token = uuid.uuid4().hex
+        self._refresher: Optional[asyncio.Task] = None
+    
+    async def acquire(self) -> bool:
+        """Toma el lock; False si otra réplica lo tiene"""
+        acquired = await self.client.set(self.key, self.token, nx=True, px=self.ttl_ms)
+        if acquired:
+            self._refresher = asyncio.create_task(self._refresh())
+        return bool(acquired)
+    
+    async def release(self):
+        """Libera el lock si sigue siendo nuestro"""
+        if self._refresher:
+            self._refresher.cancel()
+            self._refresher = None
+        try:
+            await self.client.eval(_RELEASE_SCRIPT, 1, self.key, self.token)
+        except Exception as e:
+            # Expira solo con el TTL
+            logger.warning("job_lock_release_failed", key=self.key, error=str(e))
+    
+    async def _refresh(self):
+        """Renueva el TTL cada tercio de su duración mientras el job corre"""
+        while True:
+            await asyncio.sleep(self.ttl_ms / 3000)
+            try:
+                extended = await self.client.eval(
+                    _EXTEND_SCRIPT, 1, self.key, self.token, self.ttl_ms
+                )
+            except Exception as e:
+                logger.warning("job_lock_refresh_failed", key=self.key, error=str(e))
+                continue
+            if not extended:
+                logger.warning("job_lock_lost", key=self.key)
+                return
@@ -0,0 +1,172 @@
+"""
+Cola durable de mensajes entrantes (FLUJO 1)
+
+Redis Streams con consumer groups: el webhook solo hace XADD y los workers
+(`python -m app.jobs.message_worker`) leen, procesan y confirman (XACK).
+Los mensajes que quedan pendientes por la caída de un worker se reclaman
+con XAUTOCLAIM después de `MESSAGE_QUEUE_CLAIM_IDLE_MS`.
+"""
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import redis.asyncio as redis
+from redis.exceptions import ResponseError
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class QueuedMessage:
+    """Entrada leída del stream"""
+    entry_id: str
+    message_id: str
+    channel: str
+
+
+class MessageQueue:
+    """Productor/consumidor sobre un stream de Redis"""
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        stream: Optional[str] = None,
+        group: Optional[str] = None
+    ):
+        self.redis_url = redis_url or settings.REDIS_URL
+        self.stream = stream or settings.MESSAGE_QUEUE_STREAM
+        self.group = group or settings.MESSAGE_QUEUE_GROUP
+        self.dead_letter_stream = f"{self.stream}:dead"
+        self._client: Optional[redis.Redis] = None
+
+    @property
+    def client(self) -> redis.Redis:
+        """Cliente Redis (se crea al primer uso)"""
+        if self._client is None:
+            self._client = redis.from_url(self.redis_url, decode_responses=True)
+        return self._client
+
+    async def close(self):
+        """Cierra la conexión a Redis"""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    async def enqueue(self, message_id: str, channel: str) -> str:
+        """Agrega un mensaje al stream y devuelve el id de la entrada"""
+        entry_id = await self.client.xadd(
+            self.stream,
+            {"message_id": message_id, "channel": channel},
+            maxlen=settings.MESSAGE_QUEUE_MAXLEN,
+            approximate=True
+        )
+        logger.debug("message_enqueued", message_id=message_id, entry_id=entry_id)
+        return entry_id
+
+    async def enqueue_many(self, messages: List[Tuple[str, str]]) -> List[str]:
+        """Agrega varios (message_id, channel) en un solo round-trip"""
+        async with self.client.pipeline(transaction=False) as pipe:
+            for message_id, channel in messages:
+                pipe.xadd(
+                    self.stream,
+                    {"message_id": message_id, "channel": channel},
+                    maxlen=settings.MESSAGE_QUEUE_MAXLEN,
+                    approximate=True
+                )
+            entry_ids = await pipe.execute()
+        logger.debug("messages_enqueued", count=len(entry_ids))
+        return entry_ids
+
+    async def ensure_group(self):
+        """Crea el consumer group (y el stream) si no existen"""
+        try:
+            await self.client.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+            logger.info("message_queue_group_created", stream=self.stream, group=self.group)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def read(
+        self,
+        consumer: str,
+        count: int,
+        block_ms: int
+    ) -> List[QueuedMessage]:
+        """Lee mensajes nuevos para este consumidor (bloquea hasta block_ms)"""
+        response = await self.client.xreadgroup(
+            self.group,
+            consumer,
+            {self.stream: ">"},
+            count=count,
+            block=block_ms
+        )
+        if not response:
+            return []
+
+        _, entries = response[0]
+        return [self._to_message(entry_id, fields) for entry_id, fields in entries]
+
+    async def claim_stale(self, consumer: str, count: int) -> List[QueuedMessage]:
+        """
+        Reclama mensajes pendientes de otros consumidores inactivos.
+
+        Los que ya superaron `MESSAGE_QUEUE_MAX_DELIVERIES` entregas se
+        mueven al stream de dead letters en lugar de reintentarse.
+        """
+        _, entries, _ = await self.client.xautoclaim(
+            self.stream,
+            self.group,
+            consumer,
+            min_idle_time=settings.MESSAGE_QUEUE_CLAIM_IDLE_MS,
+            start_id="0-0",
+            count=count
+        )
+        entries = [(entry_id, fields) for entry_id, fields in entries if fields]
+        if not entries:
+            return []
+
+        pending = await self.client.xpending_range(
+            self.stream,
+            self.group,
+            min=entries[0][0],
+            max=entries[-1][0],
+            count=len(entries),
+            consumername=consumer
+        )
+        deliveries = {p["message_id"]: p["times_delivered"] for p in pending}
+
+        claimed = []
+        for entry_id, fields in entries:
+            if deliveries.get(entry_id, 0) > settings.MESSAGE_QUEUE_MAX_DELIVERIES:
+                await self._dead_letter(entry_id, fields)
+                continue
+            claimed.append(self._to_message(entry_id, fields))
+
+        if claimed:
+            logger.warning("message_queue_reclaimed", count=len(claimed), consumer=consumer)
+        return claimed
+
+    async def ack(self, entry_id: str):
+        """Confirma el procesamiento de una entrada"""
+        await self.client.xack(self.stream, self.group, entry_id)
+
+    async def _dead_letter(self, entry_id: str, fields: dict):
+        """Mueve una entrada que falla repetidamente al stream de dead letters"""
+        await self.client.xadd(self.dead_letter_stream, {**fields, "entry_id": entry_id})
+        await self.ack(entry_id)
+        logger.error(
+            "message_queue_dead_letter",
+            entry_id=entry_id,
+            message_id=fields.get("message_id")
+        )
+
+    @staticmethod
+    def _to_message(entry_id: str, fields: dict) -> QueuedMessage:
+        return QueuedMessage(
+            entry_id=entry_id,
+            message_id=fields.get("message_id", ""),
+            channel=fields.get("channel", "")
+        )
+
+
+message_queue = MessageQueue()
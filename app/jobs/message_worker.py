@@ -0,0 +1,121 @@
+"""
+Worker de mensajes entrantes (FLUJO 1)
+
+Consume la cola de Redis Streams y ejecuta `MessageProcessor.process` fuera
+del proceso web. Expone métricas de Prometheus (IA, caché y mensajes
+procesados) en `WORKER_METRICS_PORT`. Uso:
+
+    python -m app.jobs.message_worker
+"""
+import asyncio
+import os
+import signal
+import socket
+from prometheus_client import Counter, start_http_server
+from app.db.session import AsyncSessionLocal
+from app.services.message_processor import MessageProcessor
+from app.integrations.n8n import N8NClient
+from app.jobs.message_queue import MessageQueue, QueuedMessage
+from app.ai.registry import ai_registry
+from app.ai.usage import usage_ledger
+from app.core.config import settings
+from app.core.logging import get_logger, configure_logging
+
+logger = get_logger(__name__)
+
+WORKER_MESSAGES = Counter(
+    "message_worker_messages_total",
+    "Mensajes de la cola procesados por el worker (processed/skipped = confirmado)",
+    ["status"]
+)
+
+
+class MessageWorker:
+    """Lee lotes del stream, los procesa y confirma cada entrada"""
+
+    def __init__(self, queue: MessageQueue = None, consumer: str = None):
+        self.queue = queue or MessageQueue()
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.n8n_client = N8NClient()
+        self.running = False
+
+    async def start(self):
+        """Bucle principal del worker"""
+        self.running = True
+        await self.queue.ensure_group()
+        logger.info("message_worker_started", consumer=self.consumer)
+
+        while self.running:
+            try:
+                # Primero los mensajes abandonados por workers caídos
+                messages = await self.queue.claim_stale(
+                    self.consumer,
+                    count=settings.MESSAGE_WORKER_BATCH_SIZE
+                )
+                if not messages:
+                    messages = await self.queue.read(
+                        self.consumer,
+                        count=settings.MESSAGE_WORKER_BATCH_SIZE,
+                        block_ms=settings.MESSAGE_WORKER_BLOCK_MS
+                    )
+
+                if messages:
+                    await asyncio.gather(*(self._handle(m) for m in messages))
+            except Exception as e:
+                logger.error("message_worker_error", error=str(e))
+                await asyncio.sleep(1)
+
+        await self.queue.close()
+        logger.info("message_worker_stopped", consumer=self.consumer)
+
+    async def _handle(self, message: QueuedMessage):
+        """
+        Procesa una entrada. Solo se confirma si el procesamiento terminó
+        sin error; si falla o el worker muere antes, queda pendiente y otro
+        consumidor la reclama. Una entrada repetida (mensaje ya procesado)
+        se confirma sin volver a notificar a n8n.
+        """
+        try:
+            async with AsyncSessionLocal() as db:
+                processed = await MessageProcessor.process(message.message_id, message.channel, db)
+        except Exception as e:
+            logger.error(
+                "message_worker_processing_failed",
+                message_id=message.message_id,
+                entry_id=message.entry_id,
+                error=str(e)
+            )
+            WORKER_MESSAGES.labels(status="failed").inc()
+            return
+
+        await self.queue.ack(message.entry_id)
+        if not processed:
+            WORKER_MESSAGES.labels(status="skipped").inc()
+            return
+
+        WORKER_MESSAGES.labels(status="processed").inc()
+        await self.n8n_client.notify_message_received(message_id=message.message_id)
+
+    def stop(self):
+        """Termina después del lote en curso"""
+        self.running = False
+
+
+async def main():
+    configure_logging()
+    start_http_server(settings.WORKER_METRICS_PORT)
+    worker = MessageWorker()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    try:
+        await worker.start()
+    finally:
+        await usage_ledger.aclose()
+        await ai_registry.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,82 +1,384 @@
 """
 Scheduler para jobs periódicos
+
+Cada job tiene su propio trigger (cron o intervalo, según settings) y corre
+como tarea independiente del AsyncIOScheduler de APScheduler, así un job
+lento (ej: deduplicación) no retrasa a los demás.
+
+Con varias réplicas, cada ejecución toma un lock por job en Redis
+(`app.jobs.locks.JobLock`) y, con el lock tomado, revisa la última
+ejecución: los triggers de intervalo cuentan desde el arranque de cada
+réplica, así que sus disparos no coinciden y el lock solo no basta. Si
+otra réplica ya corrió el job con éxito en el periodo actual, el disparo
+se omite.
+
+Ejecuciones perdidas: la última ejecución exitosa de cada job se guarda en
+Redis. Al arrancar, si el trigger ya debió dispararse desde entonces, el
+job corre de inmediato (una sola vez). En marcha, los disparos atrasados se
+agrupan en uno (coalesce) y se descartan pasada la tolerancia
+`SCHEDULER_MISFIRE_GRACE_SECONDS`.
+
+Cada ejecución se guarda en `job_runs` (duración, filas leídas, llamadas a
+IA, errores) y se exporta como métricas de Prometheus en
+`SCHEDULER_METRICS_PORT`.
+
+Uso:
+
+    python -m app.jobs.scheduler
 """
 import asyncio
-from datetime import datetime
+import signal
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional, Set
+import redis.asyncio as redis
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.base import BaseTrigger
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from prometheus_client import Counter, Histogram, start_http_server
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import AsyncSessionLocal
 from app.services.follow_up import FollowUpService
 from app.services.cart_recovery import CartRecoveryService
 from app.services.payment_reminder import PaymentReminderService
-from app.services.deduplicator import Deduplicator
+from app.services.deduplicator import Deduplicator, DeduplicationMode
 from app.services.alerts import IntelligentAlerts
-from app.core.logging import get_logger
+from app.services.partition_maintenance import PartitionMaintenance
+from app.services.conversation_archive import ConversationArchive
+from app.models.job import JobRun
+from app.jobs.locks import JobLock
+from app.jobs.tracking import JobRunStats, current_job_run, record_rows
+from app.ai.registry import ai_registry
+from app.ai.usage import ai_flow, usage_ledger
+from app.core.config import settings
+from app.core.logging import get_logger, configure_logging
 
 logger = get_logger(__name__)
 
+LAST_RUN_KEY_PREFIX = "scheduler:last_run:"
+
+# Holgura al comparar con el disparo esperado (latencia hasta tomar el lock)
+FIRE_TIME_TOLERANCE = timedelta(seconds=60)
+
+JOB_RUN_DURATION = Histogram(
+    "job_run_duration_seconds",
+    "Duración de cada ejecución de job",
+    ["job", "status"],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+)
+JOB_RUN_ROWS = Histogram(
+    "job_run_rows_scanned",
+    "Filas leídas por ejecución de job",
+    ["job"],
+    buckets=(0, 10, 100, 1000, 10000, 100000, 1000000)
+)
+JOB_RUN_AI_CALLS = Histogram(
+    "job_run_ai_calls",
+    "Requests a proveedores de IA por ejecución de job",
+    ["job"],
+    buckets=(0, 1, 10, 100, 1000, 10000)
+)
+JOB_RUN_ERRORS = Counter(
+    "job_run_errors_total",
+    "Errores en ejecuciones de jobs (filas fallidas y ejecuciones fallidas)",
+    ["job"]
+)
+
+
+def build_trigger(cron: Optional[str], interval_hours: int) -> BaseTrigger:
+    """Trigger cron si hay expresión configurada; si no, intervalo en horas"""
+    if cron:
+        return CronTrigger.from_crontab(cron, timezone=settings.SCHEDULER_TIMEZONE)
+    return IntervalTrigger(hours=interval_hours, timezone=settings.SCHEDULER_TIMEZONE)
+
+
+@dataclass
+class ScheduledJob:
+    """Job periódico: función a ejecutar con su sesión y trigger"""
+    name: str
+    run: Callable[[AsyncSession], Awaitable]
+    trigger: BaseTrigger
+
+
+async def _follow_ups(db: AsyncSession):
+    await FollowUpService().check_and_send_followups(db)
+
+
+async def _cart_recovery(db: AsyncSession):
+    await CartRecoveryService().detect_abandoned_carts(db)
+
+
+async def _alerts(db: AsyncSession):
+    await IntelligentAlerts().check_all_alerts(db)
+
+
+async def _payment_reminders(db: AsyncSession):
+    await PaymentReminderService().send_reminders(db)
+
+
+async def _deduplication(db: AsyncSession):
+    # Solo contactos nuevos/modificados
+    result = await Deduplicator().deduplicate(db, DeduplicationMode.INCREMENTAL)
+    record_rows(result["rows_scanned"])
+
+
+async def _partition_maintenance(db: AsyncSession):
+    await PartitionMaintenance().run(db)
+
+
+async def _conversation_archive(db: AsyncSession):
+    await ConversationArchive().archive(db)
+
+
+def default_jobs() -> Dict[str, ScheduledJob]:
+    """Jobs del sistema con triggers tomados de settings"""
+    jobs = [
+        ScheduledJob(
+            "follow_ups", _follow_ups,
+            build_trigger(settings.FOLLOW_UP_CRON, settings.FOLLOW_UP_CHECK_INTERVAL_HOURS)
+        ),
+        ScheduledJob(
+            "cart_recovery", _cart_recovery,
+            build_trigger(settings.CART_RECOVERY_CRON, settings.CART_RECOVERY_CHECK_INTERVAL_HOURS)
+        ),
+        ScheduledJob(
+            "alerts", _alerts,
+            build_trigger(settings.ALERTS_CRON, settings.ALERTS_CHECK_INTERVAL_HOURS)
+        ),
+        ScheduledJob(
+            "payment_reminders", _payment_reminders,
+            build_trigger(
+                settings.PAYMENT_REMINDER_CRON,
+                settings.PAYMENT_REMINDER_CHECK_INTERVAL_HOURS
+            )
+        ),
+        ScheduledJob(
+            "deduplication", _deduplication,
+            build_trigger(settings.DEDUP_CRON, 24)
+        ),
+        ScheduledJob(
+            "partition_maintenance", _partition_maintenance,
+            build_trigger(settings.PARTITION_MAINTENANCE_CRON, 24)
+        ),
+        ScheduledJob(
+            "conversation_archive", _conversation_archive,
+            build_trigger(settings.ARCHIVE_CRON, 24)
+        ),
+    ]
+    return {job.name: job for job in jobs}
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def is_overdue(trigger: BaseTrigger, last_run: Optional[datetime], now: datetime) -> bool:
+    """True si el trigger debió dispararse entre last_run y now"""
+    if last_run is None:
+        return False
+    next_fire = trigger.get_next_fire_time(last_run, now)
+    return next_fire is not None and next_fire <= now
+
+
+def is_due(trigger: BaseTrigger, last_run: Optional[datetime], now: datetime) -> bool:
+    """
+    True si el periodo actual del trigger todavía no tiene ejecución: la
+    siguiente a last_run ya llegó (con FIRE_TIME_TOLERANCE de margen).
+    """
+    return last_run is None or is_overdue(trigger, last_run, now + FIRE_TIME_TOLERANCE)
+
 
 class JobScheduler:
-    """Ejecuta jobs periódicos"""
+    """Ejecuta jobs periódicos con locks por job entre réplicas"""
+    
+    def __init__(
+        self,
+        jobs: Optional[Dict[str, ScheduledJob]] = None,
+        redis_url: Optional[str] = None
+    ):
+        self.jobs = jobs or default_jobs()
+        self.redis_url = redis_url or settings.REDIS_URL
+        self.scheduler = AsyncIOScheduler(
+            timezone=settings.SCHEDULER_TIMEZONE,
+            job_defaults={
+                "coalesce": True,
+                "max_instances": 1,
+                "misfire_grace_time": settings.SCHEDULER_MISFIRE_GRACE_SECONDS,
+            }
+        )
+        self._redis: Optional[redis.Redis] = None
+        self._stopped = asyncio.Event()
+        self._running: Set[asyncio.Task] = set()
     
-    def __init__(self):
-        self.running = False
+    @property
+    def redis(self) -> redis.Redis:
+        if self._redis is None:
+            self._redis = redis.from_url(self.redis_url, decode_responses=True)
+        return self._redis
     
     async def start(self):
-        """Inicia el scheduler"""
-        self.running = True
-        logger.info("job_scheduler_started")
+        """Programa los jobs y espera hasta `stop()`"""
+        now = _now()
         
-        # Ejecutar jobs en paralelo
-        await asyncio.gather(
-            self._run_hourly_jobs(),
-            self._run_daily_jobs()
-        )
-    
-    async def _run_hourly_jobs(self):
-        """Jobs que corren cada hora"""
-        while self.running:
-            try:
-                async with AsyncSessionLocal() as db:
-                    # Follow-ups
-                    followup_service = FollowUpService()
-                    await followup_service.check_and_send_followups(db)
-                    
-                    # Cart recovery
-                    cart_service = CartRecoveryService()
-                    await cart_service.detect_abandoned_carts(db)
-                    
-                    # Alertas
-                    alerts_service = IntelligentAlerts()
-                    await alerts_service.check_all_alerts(db)
-                
-                logger.info("hourly_jobs_completed")
-            except Exception as e:
-                logger.error("hourly_jobs_error", error=str(e))
+        for job in self.jobs.values():
+            next_run_time = None
+            if settings.SCHEDULER_CATCH_UP and is_overdue(
+                job.trigger, await self._get_last_run(job.name), now
+            ):
+                next_run_time = now
+                logger.info("scheduled_job_catch_up", job=job.name)
             
-            # Esperar 1 hora
-            await asyncio.sleep(3600)
+            kwargs = {"next_run_time": next_run_time} if next_run_time else {}
+            self.scheduler.add_job(
+                self.run_job,
+                trigger=job.trigger,
+                args=[job.name],
+                id=job.name,
+                name=job.name,
+                **kwargs
+            )
+        
+        self.scheduler.start()
+        logger.info("job_scheduler_started", jobs=list(self.jobs))
+        
+        await self._stopped.wait()
+        
+        self.scheduler.shutdown(wait=False)
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+        logger.info("job_scheduler_stopped")
     
-    async def _run_daily_jobs(self):
-        """Jobs que corren diariamente"""
-        while self.running:
-            try:
+    async def run_job(self, name: str) -> bool:
+        """
+        Ejecuta un job si esta réplica obtiene su lock y ninguna otra lo
+        corrió ya en el periodo actual de su trigger.
+        
+        Retorna True si el job corrió y terminó sin errores.
+        """
+        job = self.jobs[name]
+        lock = JobLock(self.redis, name)
+        
+        try:
+            if not await lock.acquire():
+                logger.info("scheduled_job_skipped_locked", job=name)
+                return False
+        except Exception as e:
+            # Sin Redis no se puede garantizar ejecución única: no corre
+            logger.error("scheduled_job_lock_error", job=name, error=str(e))
+            return False
+        
+        started = _now()
+        if not is_due(job.trigger, await self._get_last_run(name), started):
+            logger.info("scheduled_job_skipped_already_ran", job=name)
+            await lock.release()
+            return False
+        
+        stats = JobRunStats()
+        context_token = current_job_run.set(stats)
+        task = asyncio.current_task()
+        self._running.add(task)
+        error: Optional[str] = None
+        try:
+            # Llamadas a IA sin flujo propio se imputan al job
+            with ai_flow(name):
                 async with AsyncSessionLocal() as db:
-                    # Payment reminders
-                    payment_service = PaymentReminderService()
-                    await payment_service.send_reminders(db)
-                    
-                    # Deduplicación
-                    deduplicator = Deduplicator()
-                    await deduplicator.find_duplicates(db)
-                
-                logger.info("daily_jobs_completed")
-            except Exception as e:
-                logger.error("daily_jobs_error", error=str(e))
-            
-            # Esperar 24 horas
-            await asyncio.sleep(86400)
+                    await job.run(db)
+            await self._set_last_run(name, started)
+        except Exception as e:
+            error = str(e)
+            stats.errors += 1
+            logger.error("scheduled_job_error", job=name, error=error)
+        finally:
+            current_job_run.reset(context_token)
+            await lock.release()
+        
+        await self._record_run(name, started, stats, error)
+        self._running.discard(task)
+        return error is None
+    
+    async def _record_run(
+        self,
+        name: str,
+        started: datetime,
+        stats: JobRunStats,
+        error: Optional[str]
+    ):
+        """Exporta métricas y guarda la ejecución en job_runs"""
+        finished = _now()
+        duration = (finished - started).total_seconds()
+        status = "error" if error else "success"
+        
+        JOB_RUN_DURATION.labels(job=name, status=status).observe(duration)
+        JOB_RUN_ROWS.labels(job=name).observe(stats.rows_scanned)
+        JOB_RUN_AI_CALLS.labels(job=name).observe(stats.ai_calls)
+        if stats.errors:
+            JOB_RUN_ERRORS.labels(job=name).inc(stats.errors)
+        
+        logger.info(
+            "scheduled_job_completed",
+            job=name,
+            status=status,
+            duration_seconds=round(duration, 2),
+            rows_scanned=stats.rows_scanned,
+            ai_calls=stats.ai_calls,
+            errors=stats.errors
+        )
+        
+        try:
+            async with AsyncSessionLocal() as db:
+                db.add(JobRun(
+                    job_name=name,
+                    status=status,
+                    started_at=started.replace(tzinfo=None),
+                    finished_at=finished.replace(tzinfo=None),
+                    duration_seconds=duration,
+                    rows_scanned=stats.rows_scanned,
+                    ai_calls=stats.ai_calls,
+                    errors=stats.errors,
+                    error_message=error
+                ))
+                await db.commit()
+        except Exception as e:
+            logger.error("job_run_save_failed", job=name, error=str(e))
+    
+    async def _get_last_run(self, name: str) -> Optional[datetime]:
+        try:
+            value = await self.redis.get(LAST_RUN_KEY_PREFIX + name)
+        except Exception as e:
+            logger.warning("scheduler_last_run_error", job=name, error=str(e))
+            return None
+        return datetime.fromisoformat(value) if value else None
+    
+    async def _set_last_run(self, name: str, when: datetime):
+        try:
+            await self.redis.set(LAST_RUN_KEY_PREFIX + name, when.isoformat())
+        except Exception as e:
+            logger.warning("scheduler_last_run_error", job=name, error=str(e))
     
     def stop(self):
-        """Detiene el scheduler"""
-        self.running = False
-        logger.info("job_scheduler_stopped")
+        """Detiene el scheduler (los jobs en curso terminan su ejecución)"""
+        self._stopped.set()
+
+
+async def main():
+    configure_logging()
+    start_http_server(settings.SCHEDULER_METRICS_PORT)
+    scheduler = JobScheduler()
+    
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, scheduler.stop)
+    
+    try:
+        await scheduler.start()
+    finally:
+        await usage_ledger.aclose()
+        await ai_registry.aclose()
+
 
+if __name__ == "__main__":
+    asyncio.run(main())
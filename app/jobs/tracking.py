@@ -0,0 +1,43 @@
+"""
+Estadísticas de la ejecución de job en curso
+
+El scheduler abre un `JobRunStats` por ejecución y lo deja en un contextvar;
+el código de los jobs reporta filas, llamadas a IA y errores sin recibirlo
+como parámetro (las tareas creadas dentro del job heredan el contexto).
+Fuera de un job los `record_*` no hacen nada.
+"""
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class JobRunStats:
+    """Contadores de una ejecución"""
+    rows_scanned: int = 0
+    ai_calls: int = 0
+    errors: int = 0
+
+
+current_job_run: ContextVar[Optional[JobRunStats]] = ContextVar("current_job_run", default=None)
+
+
+def record_rows(count: int):
+    """Filas leídas por el job"""
+    stats = current_job_run.get()
+    if stats is not None:
+        stats.rows_scanned += count
+
+
+def record_ai_call(count: int = 1):
+    """Requests enviadas a un proveedor de IA"""
+    stats = current_job_run.get()
+    if stats is not None:
+        stats.ai_calls += count
+
+
+def record_error(count: int = 1):
+    """Errores manejados dentro del job (filas que no se pudieron procesar)"""
+    stats = current_job_run.get()
+    if stats is not None:
+        stats.errors += count
@@ -0,0 +1,92 @@
+"""
+Pool de workers asíncronos para jobs con una llamada a IA por fila
+
+Los jobs recorren filas (ver `app.db.streaming`) y generan un mensaje con IA
+por cada una. En lugar de esperar cada llamada en serie, `AsyncWorkerPool`
+mantiene hasta `concurrency` llamadas en vuelo, respetando el límite por
+minuto del proveedor, y entrega los resultados a medida que terminan.
+
+Solo los workers corren en paralelo: toda la I/O de base de datos (leer
+lotes, actualizaciones agrupadas con `app.db.bulk.BulkUpdate`) sigue en la
+corrutina que consume el pool, así la sesión nunca se usa concurrentemente.
+"""
+import asyncio
+from typing import (
+    Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, Optional,
+    Tuple, TypeVar, Union
+)
+from app.ai.rate_limit import RateLimiter
+from app.jobs.tracking import record_error
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+async def _aiter(items: Union[Iterable[T], AsyncIterable[T]]) -> AsyncIterator[T]:
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+class AsyncWorkerPool:
+    """Ejecuta `worker(item)` con concurrencia acotada"""
+    
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        rate_limiter: Optional[RateLimiter] = None
+    ):
+        self.concurrency = concurrency or settings.JOB_AI_CONCURRENCY
+        self.rate_limiter = rate_limiter
+    
+    async def map(
+        self,
+        items: Union[Iterable[T], AsyncIterable[T]],
+        worker: Callable[[T], Awaitable[R]]
+    ) -> AsyncIterator[Tuple[T, Union[R, Exception]]]:
+        """
+        Genera (item, resultado) en orden de finalización.
+        
+        Si el worker falla, el resultado es la excepción (no se propaga)
+        para que un item no detenga el resto del job.
+        """
+        source = _aiter(items)
+        pending = set()
+        exhausted = False
+        
+        try:
+            while True:
+                while not exhausted and len(pending) < self.concurrency:
+                    try:
+                        item = await source.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    pending.add(asyncio.create_task(self._run(worker, item)))
+                
+                if not pending:
+                    return
+                
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def _run(self, worker: Callable, item: Any) -> Tuple[Any, Any]:
+        if self.rate_limiter:
+            await self.rate_limiter.acquire()
+        try:
+            return item, await worker(item)
+        except Exception as e:
+            record_error()
+            return item, e
+
@@ -1,26 +1,44 @@
 """
 FastAPI Main Application
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from app.core.config import settings
 from app.core.logging import configure_logging
+from app.core.metrics import PrometheusMiddleware, metrics_response
+from app.ai.registry import ai_registry
+from app.ai.usage import usage_ledger
+from app.services.webhook_idempotency import webhook_idempotency
 from app.api.v1 import (
     webhooks, leads, intents, sentiment, router, chatbot, cases,
     escalation, followups, nurturing, sales, carts, payments,
-    content, comments, data, predictions, alerts
+    content, comments, data, predictions, alerts, jobs, conversations
 )
 
 # Configurar logging
 configure_logging()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Inicializa recursos compartidos y los libera al apagar"""
+    ai_registry.startup()
+    yield
+    await usage_ledger.aclose()
+    await ai_registry.aclose()
+    await webhook_idempotency.close()
+
 # Crear aplicación FastAPI
 app = FastAPI(
     title=settings.APP_NAME,
     version="1.0.0",
     description="Sistema CRM Autónomo con IA Multi-Agente",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS
@@ -32,6 +50,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Métricas por ruta (latencia, en curso, códigos de estado)
+app.add_middleware(PrometheusMiddleware, router=app.router)
+
 # Incluir routers
 app.include_router(
     webhooks.router,
@@ -141,6 +162,18 @@ app.include_router(
     tags=["alerts"]
 )
 
+app.include_router(
+    jobs.router,
+    prefix=f"{settings.API_V1_PREFIX}/jobs",
+    tags=["jobs"]
+)
+
+app.include_router(
+    conversations.router,
+    prefix=f"{settings.API_V1_PREFIX}/conversations",
+    tags=["conversations"]
+)
+
 
 @app.get("/")
 async def root():
@@ -152,6 +185,12 @@ async def root():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas para Prometheus"""
+    return metrics_response()
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -2,18 +2,21 @@
 Modelos de base de datos
 """
 from app.models.lead import Lead, LeadStatus
-from app.models.message import Message, MessageChannel, RawMessage
+from app.models.message import Message, MessageChannel, RawMessage, RawMessageId
 from app.models.conversation import Conversation, ConversationStatus
 from app.models.classification import LeadClassification
 from app.models.intent import LeadIntent, IntentType
 from app.models.sentiment import SentimentAnalysis
-from app.models.customer import Customer
+from app.models.customer import Customer, CustomerBlockingKey
 from app.models.case import Case, CaseStatus
 from app.models.cart import Cart
 from app.models.purchase import Purchase
 from app.models.invoice import Invoice
 from app.models.content import GeneratedContent
 from app.models.alert import Alert
+from app.models.job import JobWatermark, JobRun
+from app.models.ai_usage import AIUsage
+from app.models.archive import ArchivedConversation
 
 __all__ = [
     "Lead",
@@ -21,6 +24,7 @@ __all__ = [
     "Message",
     "MessageChannel",
     "RawMessage",
+    "RawMessageId",
     "Conversation",
     "ConversationStatus",
     "LeadClassification",
@@ -28,6 +32,7 @@ __all__ = [
     "IntentType",
     "SentimentAnalysis",
     "Customer",
+    "CustomerBlockingKey",
     "Case",
     "CaseStatus",
     "Cart",
@@ -35,5 +40,9 @@ __all__ = [
     "Invoice",
     "GeneratedContent",
     "Alert",
+    "JobWatermark",
+    "JobRun",
+    "AIUsage",
+    "ArchivedConversation",
 ]
 
@@ -0,0 +1,30 @@
+"""
+Modelo de uso de IA (tokens y costo por llamada)
+"""
+from sqlalchemy import Column, String, Integer, Numeric, Boolean, DateTime, Index
+from app.db.base import Base
+from datetime import datetime
+import uuid
+
+
+class AIUsage(Base):
+    """Una llamada a un proveedor de IA, imputada a un flujo"""
+    __tablename__ = "ai_usage"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    flow = Column(String, nullable=False)  # lead_classifier, chatbot, cart_recovery, ...
+    entity_id = Column(String, nullable=True)  # lead, conversación, carrito, factura...
+    
+    provider = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    method = Column(String, nullable=False)
+    prompt_tokens = Column(Integer, default=0, nullable=False)
+    completion_tokens = Column(Integer, default=0, nullable=False)
+    cost_usd = Column(Numeric(12, 6), default=0, nullable=False)
+    degraded = Column(Boolean, default=False, nullable=False)  # modelo barato por presupuesto
+    
+    __table_args__ = (
+        Index("ix_ai_usage_flow_created_at", "flow", "created_at"),
+    )
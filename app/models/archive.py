@@ -0,0 +1,22 @@
+"""
+Índice de conversaciones archivadas (Parquet en STORAGE_PATH)
+"""
+from sqlalchemy import Column, String, DateTime, Integer
+from app.db.base import Base
+from datetime import datetime
+
+
+class ArchivedConversation(Base):
+    """Dónde quedó cada conversación movida al archivo frío"""
+    __tablename__ = "archived_conversations"
+    
+    conversation_id = Column(String, primary_key=True)
+    customer_id = Column(String, nullable=True, index=True)
+    lead_id = Column(String, nullable=True)
+    channel = Column(String, nullable=False)
+    closed_at = Column(DateTime, nullable=True)
+    message_count = Column(Integer, default=0, nullable=False)
+    
+    # Prefijo relativo a STORAGE_PATH/archive: <prefijo>.<tabla>.parquet
+    path = Column(String, nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -13,6 +13,7 @@ class LeadClassification(Base):
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     lead_id = Column(String, ForeignKey("leads.id"), nullable=False)
+    raw_message_id = Column(String, nullable=True, index=True)  # raw_messages.id: una fila por mensaje raw
     
     score = Column(Integer, nullable=False)  # 0-100
     category = Column(String, nullable=True)  # hot, warm, cold
@@ -45,3 +45,11 @@ class Customer(Base):
     carts = relationship("Cart", back_populates="customer")
     purchases = relationship("Purchase", back_populates="customer")
 
+
+
+class CustomerBlockingKey(Base):
+    """Clave de bloqueo persistida para deduplicación incremental"""
+    __tablename__ = "customer_blocking_keys"
+    
+    customer_id = Column(String, ForeignKey("customers.id", ondelete="CASCADE"), primary_key=True)
+    key = Column(String, primary_key=True, index=True)  # email:..., phone:..., ph:..., mh0:...
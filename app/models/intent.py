@@ -28,7 +28,8 @@ class LeadIntent(Base):
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     lead_id = Column(String, ForeignKey("leads.id"), nullable=False)
-    message_id = Column(String, ForeignKey("messages.id"), nullable=True)
+    message_id = Column(String, nullable=True)  # messages está particionada: sin FK
+    raw_message_id = Column(String, nullable=True, index=True)  # raw_messages.id: una fila por mensaje raw
     
     primary_intent = Column(String, nullable=False)
     secondary_intents = Column(JSON, nullable=True)
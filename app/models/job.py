@@ -0,0 +1,37 @@
+"""
+Modelos de estado de jobs
+"""
+import uuid
+from sqlalchemy import Column, String, DateTime, Integer, Float, Text, Index
+from app.db.base import Base
+from datetime import datetime
+
+
+class JobWatermark(Base):
+    """Marca de agua de jobs incrementales (hasta dónde se procesó)"""
+    __tablename__ = "job_watermarks"
+    
+    name = Column(String, primary_key=True)  # deduplicator, ...
+    value = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class JobRun(Base):
+    """Historial de ejecuciones de jobs programados"""
+    __tablename__ = "job_runs"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    job_name = Column(String, nullable=False)
+    status = Column(String, nullable=False)  # success, error
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=False)
+    duration_seconds = Column(Float, nullable=False)
+    
+    rows_scanned = Column(Integer, default=0, nullable=False)
+    ai_calls = Column(Integer, default=0, nullable=False)
+    errors = Column(Integer, default=0, nullable=False)
+    error_message = Column(Text, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_job_runs_job_name_started_at", "job_name", "started_at"),
+    )
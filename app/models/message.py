@@ -16,22 +16,49 @@ class MessageChannel(enum.Enum):
 
 
 class RawMessage(Base):
-    """Mensaje raw recibido del webhook"""
+    """
+    Mensaje raw recibido del webhook.
+    
+    Particionada por mes sobre received_at (app.db.partitions): la clave
+    primaria incluye received_at y los ids del proveedor únicos viven en
+    `raw_message_ids`.
+    """
     __tablename__ = "raw_messages"
+    __table_args__ = {"postgresql_partition_by": "RANGE (received_at)"}
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     channel = Column(Enum(MessageChannel), nullable=False)
+    provider_message_id = Column(String, nullable=True)  # wamid / mid de Meta
     sender_id = Column(String, nullable=False)  # Phone/IGID/PSID
     content = Column(Text, nullable=False)
     metadata = Column(JSON, nullable=True)  # Payload completo
-    received_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    received_at = Column(DateTime, primary_key=True, default=datetime.utcnow, nullable=False)
     processed = Column(Boolean, default=False)
     processing_error = Column(String, nullable=True)
 
 
+class RawMessageId(Base):
+    """
+    Ids de mensajes de Meta ya recibidos (idempotencia de webhooks).
+    
+    Tabla sin particionar: la unicidad por (channel, provider_message_id)
+    no puede declararse sobre raw_messages sin incluir received_at.
+    """
+    __tablename__ = "raw_message_ids"
+    
+    channel = Column(Enum(MessageChannel), primary_key=True)
+    provider_message_id = Column(String, primary_key=True)
+    received_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
 class Message(Base):
-    """Mensaje procesado y normalizado"""
+    """
+    Mensaje procesado y normalizado.
+    
+    Particionada por mes sobre sent_at (app.db.partitions).
+    """
     __tablename__ = "messages"
+    __table_args__ = {"postgresql_partition_by": "RANGE (sent_at)"}
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     conversation_id = Column(String, ForeignKey("conversations.id"), nullable=False)
@@ -46,7 +73,7 @@ class Message(Base):
     sentiment_score = Column(Float, nullable=True)
     
     # Timestamps
-    sent_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = Column(DateTime, primary_key=True, default=datetime.utcnow, nullable=False)
     delivered_at = Column(DateTime, nullable=True)
     read_at = Column(DateTime, nullable=True)
     
@@ -19,7 +19,8 @@ class SentimentAnalysis(Base):
     __tablename__ = "sentiment_analyses"
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    message_id = Column(String, ForeignKey("messages.id"), nullable=True)
+    message_id = Column(String, nullable=True)  # messages está particionada: sin FK
+    raw_message_id = Column(String, nullable=True, index=True)  # raw_messages.id: una fila por mensaje raw
     conversation_id = Column(String, ForeignKey("conversations.id"), nullable=True)
     
     sentiment = Column(String, nullable=False)  # positive, neutral, negative
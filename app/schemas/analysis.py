@@ -0,0 +1,76 @@
+"""
+Schemas para Análisis Combinado de Mensajes
+"""
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any
+from app.schemas.lead import LeadScore
+from app.schemas.intent import IntentDetectionResult
+from app.schemas.sentiment import SentimentResult
+
+
+class MessageAnalysisRequest(BaseModel):
+    """Request para analizar un mensaje (lead + intención + sentimiento)"""
+    message: str = Field(..., description="Mensaje a analizar")
+    sender_metadata: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="Metadata del remitente"
+    )
+    context: Optional[Dict[str, Any]] = Field(None, description="Contexto adicional")
+    lead_id: Optional[str] = None
+    conversation_id: Optional[str] = None
+    message_id: Optional[str] = None
+    raw_message_id: Optional[str] = None  # con él los resultados se guardan una sola vez
+
+
+class MessageAnalysis(BaseModel):
+    """
+    Resultado combinado de una sola llamada a IA.
+
+    Cada sección se valida por separado: una sección inválida trae su
+    resultado neutro con `error` y las demás se usan igual. `error` del
+    análisis completo indica que falló la llamada.
+    """
+    lead_score: LeadScore
+    intent: IntentDetectionResult
+    sentiment: SentimentResult
+    ai_model_used: Optional[str] = None
+    processing_time_ms: Optional[int] = None
+    error: Optional[str] = None
+
+    @property
+    def failed_sections(self) -> Dict[str, str]:
+        """Sección (classification, intent, sentiment) -> error"""
+        sections = {
+            "classification": self.lead_score,
+            "intent": self.intent,
+            "sentiment": self.sentiment,
+        }
+        return {name: result.error for name, result in sections.items() if result.error}
+
+
+def neutral_result(section: str, error: str):
+    """Resultado neutro de una sección (classification, intent o sentiment)"""
+    if section == "classification":
+        return LeadScore(
+            score=50,
+            category="warm",
+            reasoning="Error en clasificación, asignado score neutro",
+            recommended_action="reclassify",
+            error=error
+        )
+    if section == "intent":
+        return IntentDetectionResult(
+            primary_intent="general_inquiry",
+            secondary_intents=[],
+            confidence=0.5,
+            entities={},
+            reasoning="Error en detección de intención",
+            error=error
+        )
+    return SentimentResult(
+        sentiment="neutral",
+        score=0.0,
+        confidence=0.5,
+        urgency_level="low",
+        error=error
+    )
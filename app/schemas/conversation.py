@@ -1,6 +1,7 @@
 """
 Schemas para Conversaciones
 """
+from datetime import datetime
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 
@@ -19,3 +20,59 @@ class ChatContext(BaseModel):
     conversation_id: Optional[str] = None
     conversation_history: List[Dict[str, str]] = Field(default_factory=list)
 
+
+
+class ChatStreamEvent(BaseModel):
+    """Evento de una respuesta del chatbot en streaming"""
+    event: str = Field(..., description="token | escalate | done | error")
+    content: Optional[str] = Field(None, description="Fragmento de texto (event=token)")
+    message: Optional[ChatMessage] = Field(None, description="Respuesta final (escalate/done)")
+    time_to_first_token_ms: Optional[int] = None
+    total_ms: Optional[int] = None
+
+
+class ChatStreamRequest(BaseModel):
+    """Turno enviado por WebSocket"""
+    message: str
+    context: ChatContext = Field(default_factory=ChatContext)
+
+
+class MessageResponse(BaseModel):
+    """Mensaje de una conversación"""
+    id: str
+    content: str
+    sender: str
+    direction: str
+    intent: Optional[str] = None
+    sentiment: Optional[str] = None
+    sentiment_score: Optional[float] = None
+    sent_at: datetime
+    delivered_at: Optional[datetime] = None
+    read_at: Optional[datetime] = None
+
+
+class SentimentSnapshot(BaseModel):
+    """Análisis de sentimiento registrado en la conversación"""
+    sentiment: str
+    score: float
+    urgency_level: Optional[str] = None
+    churn_risk: Optional[float] = None
+    analyzed_at: datetime
+
+
+class ConversationDetail(BaseModel):
+    """Conversación completa (de Postgres o del archivo frío)"""
+    id: str
+    channel: str
+    status: Optional[str] = None
+    lead_id: Optional[str] = None
+    customer_id: Optional[str] = None
+    message_count: Optional[int] = None
+    avg_sentiment_score: Optional[float] = None
+    escalated: Optional[bool] = None
+    started_at: datetime
+    last_message_at: Optional[datetime] = None
+    closed_at: Optional[datetime] = None
+    archived: bool = Field(False, description="True si se leyó del archivo frío")
+    messages: List[MessageResponse] = Field(default_factory=list)
+    sentiment_analyses: List[SentimentSnapshot] = Field(default_factory=list)
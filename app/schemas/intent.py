@@ -10,6 +10,8 @@ class IntentDetectionRequest(BaseModel):
     message: str = Field(..., description="Mensaje a analizar")
     context: Optional[Dict[str, Any]] = Field(None, description="Contexto adicional")
     lead_id: Optional[str] = None
+    message_id: Optional[str] = None
+    raw_message_id: Optional[str] = None
 
 
 class IntentDetectionResult(BaseModel):
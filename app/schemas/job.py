@@ -0,0 +1,23 @@
+"""
+Schemas para ejecuciones de jobs
+"""
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+
+
+class JobRunResponse(BaseModel):
+    """Ejecución registrada de un job programado"""
+    id: str
+    job_name: str
+    status: str
+    started_at: datetime
+    finished_at: datetime
+    duration_seconds: float
+    rows_scanned: int
+    ai_calls: int
+    errors: int
+    error_message: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
@@ -14,6 +14,7 @@ class LeadClassificationRequest(BaseModel):
         description="Metadata del remitente"
     )
     lead_id: Optional[str] = Field(None, description="ID del lead si ya existe")
+    raw_message_id: Optional[str] = None
 
 
 class LeadScore(BaseModel):
@@ -10,6 +10,7 @@ class SentimentAnalysisRequest(BaseModel):
     message: str = Field(..., description="Mensaje a analizar")
     conversation_id: Optional[str] = None
     message_id: Optional[str] = None
+    raw_message_id: Optional[str] = None
 
 
 class SentimentResult(BaseModel):
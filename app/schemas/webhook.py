@@ -4,6 +4,7 @@ Schemas para webhooks
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
 from datetime import datetime
+from app.core import json
 
 
 class InboundWebhook(BaseModel):
@@ -11,6 +12,29 @@ class InboundWebhook(BaseModel):
     object: Optional[str] = None
     entry: Optional[List[Dict[str, Any]]] = None
     
+    @classmethod
+    def from_json(cls, body: bytes) -> "InboundWebhook":
+        """
+        Parsea el body una sola vez con orjson.
+        
+        Solo se revisa la forma del primer nivel; cada entry se recorre
+        directamente en los parsers sin copiarlo con pydantic.
+        """
+        payload = json.loads(body)
+        if not isinstance(payload, dict):
+            raise ValueError("El payload debe ser un objeto JSON")
+        
+        source = payload.get("object")
+        entry = payload.get("entry")
+        if source is not None and not isinstance(source, str):
+            raise ValueError("`object` debe ser texto")
+        if entry is not None and not (
+            isinstance(entry, list) and all(isinstance(e, dict) for e in entry)
+        ):
+            raise ValueError("`entry` debe ser una lista de objetos")
+        
+        return cls.model_construct(object=source, entry=entry)
+    
     def get_channel(self) -> str:
         """Extrae el canal del payload"""
         if self.object == "whatsapp_business_account":
@@ -21,23 +45,79 @@ class InboundWebhook(BaseModel):
             return "messenger"
         return "unknown"
     
-    def extract_message(self) -> Dict[str, Any]:
-        """Extrae datos normalizados del mensaje"""
-        # Implementación básica - se puede mejorar según estructura real
-        if not self.entry:
-            return {}
+    def extract_messages(self) -> List["InboundMessage"]:
+        """
+        Todos los mensajes del payload, en una sola pasada.
         
-        # Simplificado - en producción necesitarías parsear según cada plataforma
-        return {
-            "sender": "unknown",
-            "content": "",
-            "metadata": self.dict()
-        }
+        Meta agrupa varios mensajes (y varias cuentas) en una misma entrega,
+        así que cada canal tiene su propio parser.
+        """
+        channel = self.get_channel()
+        if channel == "whatsapp":
+            return self._parse_whatsapp()
+        if channel in ("instagram", "messenger"):
+            return self._parse_messaging()
+        return []
+    
+    def _parse_whatsapp(self) -> List["InboundMessage"]:
+        """entry[].changes[].value.messages[] (los `statuses` se ignoran)"""
+        messages = []
+        for entry in self.entry or []:
+            for change in entry.get("changes") or []:
+                for message in (change.get("value") or {}).get("messages") or []:
+                    messages.append(InboundMessage(
+                        provider_message_id=message.get("id"),
+                        sender=message.get("from") or "unknown",
+                        content=_whatsapp_content(message),
+                        payload=message
+                    ))
+        return messages
+    
+    def _parse_messaging(self) -> List["InboundMessage"]:
+        """entry[].messaging[] de Instagram/Messenger (solo eventos con `message`)"""
+        messages = []
+        for entry in self.entry or []:
+            for event in entry.get("messaging") or []:
+                message = event.get("message")
+                if not message or message.get("is_echo"):
+                    continue
+                messages.append(InboundMessage(
+                    provider_message_id=message.get("mid"),
+                    sender=(event.get("sender") or {}).get("id") or "unknown",
+                    content=message.get("text") or "",
+                    payload=event
+                ))
+        return messages
+
+
+class InboundMessage(BaseModel):
+    """Mensaje normalizado extraído de un webhook"""
+    provider_message_id: Optional[str] = Field(None, description="wamid / mid de Meta")
+    sender: str = Field(..., description="Teléfono / IGID / PSID")
+    content: str = ""
+    payload: Dict[str, Any] = Field(default_factory=dict, description="Mensaje tal como llegó")
+
+
+def _whatsapp_content(message: Dict[str, Any]) -> str:
+    """Texto del mensaje de WhatsApp según su tipo"""
+    kind = message.get("type")
+    if kind == "text":
+        return (message.get("text") or {}).get("body", "")
+    if kind == "button":
+        return (message.get("button") or {}).get("text", "")
+    if kind == "interactive":
+        interactive = message.get("interactive") or {}
+        reply = interactive.get("button_reply") or interactive.get("list_reply") or {}
+        return reply.get("title", "")
+    if kind in ("image", "video", "document"):
+        return (message.get(kind) or {}).get("caption", "")
+    return ""
 
 
 class WebhookResponse(BaseModel):
     """Respuesta del webhook"""
     status: str = Field(..., description="Estado del procesamiento")
     message_id: Optional[str] = Field(None, description="ID del mensaje creado")
+    message_ids: List[str] = Field(default_factory=list, description="IDs de todos los mensajes creados")
     processing_id: Optional[str] = Field(None, description="ID de procesamiento")
 
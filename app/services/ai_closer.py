@@ -5,6 +5,8 @@ from typing import List, Dict, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.ai.base import AIAdapter
 from app.ai.factory import AIAdapterFactory
+from app.ai.usage import ai_flow
+from app.services.keywords import OBJECTION_KEYWORDS
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -63,16 +65,8 @@ class AICloser:
         """Detecta objeciones en el mensaje"""
         objections = []
         
-        objection_patterns = {
-            "price": ["muy caro", "precio", "costoso", "barato"],
-            "timing": ["no es el momento", "después", "más tarde", "no ahora"],
-            "authority": ["tengo que consultarlo", "mi jefe", "necesito aprobación"],
-            "need": ["no estoy seguro", "no lo necesito", "no sé si"],
-            "trust": ["no los conozco", "confianza", "garantía"]
-        }
-        
         message_lower = message.lower()
-        for objection_type, patterns in objection_patterns.items():
+        for objection_type, patterns in OBJECTION_KEYWORDS.items():
             if any(pattern in message_lower for pattern in patterns):
                 objections.append(objection_type)
         
@@ -110,7 +104,8 @@ class AICloser:
         LONGITUD: 3-4 oraciones máximo
         """
         
-        return await self.ai.generate_response(prompt)
+        with ai_flow("ai_closer"):
+            return await self.ai.generate_response(prompt)
     
     async def _detect_buying_signals(self, message: str) -> List[str]:
         """Detecta señales de alta intención de compra"""
@@ -156,7 +151,8 @@ class AICloser:
         TONO: Confiado pero servicial
         """
         
-        return await self.ai.generate_response(prompt)
+        with ai_flow("ai_closer"):
+            return await self.ai.generate_response(prompt)
     
     async def _nudge_towards_decision(
         self,
@@ -176,5 +172,6 @@ class AICloser:
         TONO: Amigable, servicial
         """
         
-        return await self.ai.generate_response(prompt)
+        with ai_flow("ai_closer"):
+            return await self.ai.generate_response(prompt)
 
@@ -4,16 +4,20 @@ FLUJO 22: Alertas Inteligentes
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, Select
 from app.models.alert import Alert
 from app.models.customer import Customer
 from app.models.lead import Lead
 from app.models.conversation import Conversation
+from app.db.streaming import keyset_iter
 from app.core.logging import get_logger
 import enum
 
 logger = get_logger(__name__)
 
+# Máximo de leads detallados en una alerta de leads calientes
+HOT_LEADS_ALERT_MAX_LISTED = 100
+
 
 class AlertType(enum.Enum):
     SALES_DROP = "sales_drop"
@@ -58,20 +62,33 @@ class IntelligentAlerts:
         # Por ahora, solo log
         logger.info("sales_anomaly_check_completed")
     
+    @staticmethod
+    def churn_risk_customers_query(cutoff_date: datetime) -> Select:
+        """Clientes (sin repetir) con conversaciones muy negativas desde cutoff_date"""
+        negative_conversations = select(Conversation.customer_id).where(
+            Conversation.avg_sentiment_score < -0.7,
+            Conversation.last_message_at > cutoff_date
+        )
+        return select(Customer).where(Customer.id.in_(negative_conversations))
+    
+    @staticmethod
+    def hot_leads_query(cutoff_time: datetime) -> Select:
+        """Leads con score > 90 creados desde cutoff_time"""
+        return select(Lead).where(
+            Lead.score > 90,
+            Lead.created_at > cutoff_time
+        )
+    
     async def _check_customer_risks(self, db: AsyncSession):
         """Identifica clientes en riesgo de churn"""
         # Clientes con sentimiento muy negativo reciente
         cutoff_date = datetime.utcnow() - timedelta(days=7)
         
-        stmt = select(Customer).join(Conversation).where(
-            Conversation.avg_sentiment_score < -0.7,
-            Conversation.last_message_at > cutoff_date
-        )
-        
-        result = await db.execute(stmt)
-        at_risk = result.scalars().all()
-        
-        for customer in at_risk:
+        async for customer in keyset_iter(
+            db,
+            self.churn_risk_customers_query(cutoff_date),
+            (Customer.id,)
+        ):
             await self._send_alert(
                 alert_type=AlertType.CHURN_RISK,
                 severity="critical",
@@ -88,21 +105,26 @@ class IntelligentAlerts:
         """Notifica sobre leads muy calientes"""
         cutoff_time = datetime.utcnow() - timedelta(hours=1)
         
-        stmt = select(Lead).where(
-            Lead.score > 90,
-            Lead.created_at > cutoff_time
-        )
-        
-        result = await db.execute(stmt)
-        hot_leads = result.scalars().all()
+        # Se cuentan todos pero solo se listan los primeros en la alerta
+        total = 0
+        listed = []
+        async for lead in keyset_iter(
+            db,
+            self.hot_leads_query(cutoff_time),
+            (Lead.created_at, Lead.id)
+        ):
+            total += 1
+            if len(listed) < HOT_LEADS_ALERT_MAX_LISTED:
+                listed.append({"id": lead.id, "score": lead.score, "name": lead.name})
         
-        if hot_leads:
+        if total:
             await self._send_alert(
                 alert_type=AlertType.HOT_LEAD,
                 severity="high",
-                message=f"🔥 {len(hot_leads)} leads calientes sin asignar",
+                message=f"🔥 {total} leads calientes sin asignar",
                 data={
-                    "leads": [{"id": l.id, "score": l.score, "name": l.name} for l in hot_leads]
+                    "total": total,
+                    "leads": listed
                 },
                 recipients=["sales_team@company.com"],
                 db=db
@@ -0,0 +1,258 @@
+"""
+Pipeline de análisis de mensajes entrantes (FLUJOS 2-5)
+
+Score de lead, intención y sentimiento se obtienen con una sola llamada a
+IA (`MessageAnalyzer`) y sus resultados alimentan al enrutador. Esa llamada
+reemplaza al fan-out por etapas como camino principal; las secciones que
+fallan (todas si falla la llamada) se vuelven a pedir con el servicio de
+cada flujo, en paralelo y cada una con su propia sesión de DB, así que la
+latencia es la de la etapa más lenta.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import AsyncSessionLocal
+from app.models.lead import Lead
+from app.models.message import RawMessage, MessageChannel
+from app.schemas.analysis import MessageAnalysisRequest, neutral_result
+from app.schemas.lead import LeadClassificationRequest, LeadScore
+from app.schemas.intent import IntentDetectionRequest, IntentDetectionResult
+from app.schemas.sentiment import SentimentAnalysisRequest, SentimentResult
+from app.schemas.router import RoutingDecision
+from app.services.message_analyzer import MessageAnalyzer
+from app.services.lead_classifier import LeadClassifier
+from app.services.intent_detector import IntentDetector
+from app.services.sentiment_analyzer import SentimentAnalyzer
+from app.services.router import IntelligentRouter
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+STAGES = ("classification", "intent", "sentiment")
+
+
+@dataclass
+class PipelineResult:
+    """Resultado del análisis de un mensaje"""
+    lead_id: str
+    lead_score: LeadScore
+    intent: IntentDetectionResult
+    sentiment: SentimentResult
+    routing: RoutingDecision
+    latencies_ms: Dict[str, int] = field(default_factory=dict)
+    failed_stages: Dict[str, str] = field(default_factory=dict)
+
+
+class InboundAnalysisPipeline:
+    """Analiza (lead + intención + sentimiento) y enruta un mensaje"""
+
+    def __init__(
+        self,
+        analyzer: Optional[MessageAnalyzer] = None,
+        router: Optional[IntelligentRouter] = None
+    ):
+        self.analyzer = analyzer
+        self.router = router or IntelligentRouter()
+
+    async def run(self, raw_message: RawMessage, db: AsyncSession) -> PipelineResult:
+        """
+        Analiza un mensaje raw.
+
+        Cada sección que falló en la llamada combinada se ejecuta como etapa
+        separada (en paralelo); una etapa que también falla usa su resultado
+        neutro y el mensaje se enruta de todas formas.
+        """
+        started = time.perf_counter()
+        channel = raw_message.channel.value
+        latencies: Dict[str, int] = {}
+
+        lead = await self._resolve_lead(raw_message, db)
+
+        analysis_started = time.perf_counter()
+        analyzer = self.analyzer or MessageAnalyzer()
+        analysis = await analyzer.analyze(
+            MessageAnalysisRequest(
+                message=raw_message.content or "",
+                lead_id=lead.id,
+                raw_message_id=raw_message.id,
+                sender_metadata={
+                    "name": lead.name,
+                    "phone": lead.phone,
+                    "source": channel,
+                },
+                context={"channel": channel}
+            ),
+            db
+        )
+        latencies["analysis"] = _elapsed_ms(analysis_started)
+
+        results: Dict[str, Any] = {
+            "classification": analysis.lead_score,
+            "intent": analysis.intent,
+            "sentiment": analysis.sentiment,
+        }
+        retry = [stage for stage in STAGES if stage in analysis.failed_sections]
+        if retry:
+            logger.warning(
+                "combined_analysis_failed_running_stages",
+                message_id=raw_message.id,
+                stages=retry,
+                error=analysis.error
+            )
+            stage_results, stage_latencies = await self._run_stages(
+                retry, raw_message, lead, analyzer
+            )
+            results.update(stage_results)
+            latencies.update(stage_latencies)
+
+        failed = {
+            stage: results[stage].error
+            for stage in STAGES
+            if getattr(results[stage], "error", None)
+        }
+
+        routing_started = time.perf_counter()
+        routing = await self.router.route_message(
+            intent=results["intent"],
+            sentiment=results["sentiment"],
+            lead_score=results["classification"],
+            db=db
+        )
+        latencies["routing"] = _elapsed_ms(routing_started)
+        latencies["total"] = _elapsed_ms(started)
+
+        logger.info(
+            "message_pipeline_completed",
+            message_id=raw_message.id,
+            lead_id=lead.id,
+            destination=routing.destination,
+            priority=routing.priority,
+            latencies_ms=latencies,
+            failed_stages=list(failed)
+        )
+
+        return PipelineResult(
+            lead_id=lead.id,
+            lead_score=results["classification"],
+            intent=results["intent"],
+            sentiment=results["sentiment"],
+            routing=routing,
+            latencies_ms=latencies,
+            failed_stages=failed
+        )
+
+    async def _run_stages(
+        self,
+        stages: Sequence[str],
+        raw_message: RawMessage,
+        lead: Lead,
+        analyzer: MessageAnalyzer
+    ) -> Tuple[Dict[str, Any], Dict[str, int]]:
+        """
+        Ejecuta las etapas indicadas en paralelo con los servicios de cada
+        flujo (una llamada a IA y una sesión de DB por etapa).
+
+        Retorna (resultado, latencia en ms) por etapa; una etapa que lanza
+        una excepción queda con su resultado neutro.
+        """
+        channel = raw_message.channel.value
+        message = raw_message.content or ""
+        ai = analyzer.ai
+
+        runners: Dict[str, Callable[[AsyncSession], Awaitable[Any]]] = {
+            "classification": lambda session: LeadClassifier(ai).classify(
+                LeadClassificationRequest(
+                    message=message,
+                    lead_id=lead.id,
+                    raw_message_id=raw_message.id,
+                    sender_metadata={
+                        "name": lead.name,
+                        "phone": lead.phone,
+                        "source": channel,
+                    }
+                ),
+                session
+            ),
+            "intent": lambda session: IntentDetector(ai).detect(
+                IntentDetectionRequest(
+                    message=message,
+                    lead_id=lead.id,
+                    raw_message_id=raw_message.id,
+                    context={"channel": channel}
+                ),
+                session
+            ),
+            "sentiment": lambda session: SentimentAnalyzer(ai).analyze(
+                SentimentAnalysisRequest(message=message, raw_message_id=raw_message.id),
+                session
+            ),
+        }
+
+        outcomes = await asyncio.gather(
+            *(self._timed(runners[stage]) for stage in stages),
+            return_exceptions=True
+        )
+
+        results: Dict[str, Any] = {}
+        latencies: Dict[str, int] = {}
+        for stage, outcome in zip(stages, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.error(
+                    "pipeline_stage_failed",
+                    message_id=raw_message.id,
+                    stage=stage,
+                    error=str(outcome)
+                )
+                results[stage] = neutral_result(stage, str(outcome))
+                continue
+            results[stage], latencies[stage] = outcome
+
+        if "classification" in results:
+            results["classification"].lead_id = lead.id
+        return results, latencies
+
+    async def _timed(
+        self,
+        run_stage: Callable[[AsyncSession], Awaitable[Any]]
+    ) -> Tuple[Any, int]:
+        """Ejecuta una etapa con su propia sesión y mide su latencia"""
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as session:
+            result = await run_stage(session)
+        return result, _elapsed_ms(started)
+
+    async def _resolve_lead(self, raw_message: RawMessage, db: AsyncSession) -> Lead:
+        """
+        Busca el lead del remitente o lo crea.
+
+        WhatsApp identifica por teléfono; Instagram/Messenger solo entregan
+        IGID/PSID, que se guarda como nombre provisional del lead.
+        """
+        sender = raw_message.sender_id
+        is_whatsapp = raw_message.channel == MessageChannel.WHATSAPP
+        query = select(Lead).where(Lead.source == raw_message.channel.value)
+        if is_whatsapp:
+            query = query.where(Lead.phone == sender)
+        else:
+            query = query.where(Lead.name == sender)
+
+        result = await db.execute(query.limit(1))
+        lead = result.scalar_one_or_none()
+        if lead:
+            return lead
+
+        lead = Lead(
+            name=sender,
+            phone=sender if is_whatsapp else None,
+            source=raw_message.channel.value
+        )
+        db.add(lead)
+        await db.commit()
+        return lead
+
+
+def _elapsed_ms(started: float) -> int:
+    return int((time.perf_counter() - started) * 1000)
@@ -2,11 +2,17 @@
 FLUJO 12: Recuperación de Carrito Abandonado
 """
 from datetime import datetime, timedelta
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, Select
 from app.models.cart import Cart
+from app.db.streaming import keyset_iter
+from app.db.bulk import BulkUpdate
+from app.jobs.worker_pool import AsyncWorkerPool
 from app.ai.base import AIAdapter
 from app.ai.factory import AIAdapterFactory
+from app.ai.rate_limit import rate_limiter_for
+from app.ai.usage import ai_flow
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -25,6 +31,15 @@ class CartRecoveryService:
     def __init__(self, ai_adapter: Optional[AIAdapter] = None):
         self.ai = ai_adapter or AIAdapterFactory.get_default_adapter()
     
+    @staticmethod
+    def abandoned_carts_query(cutoff_time: datetime) -> Select:
+        """Carritos pendientes inactivos desde cutoff_time (usa ix_carts_status_last_activity_attempts)"""
+        return select(Cart).where(
+            Cart.status == "pending",
+            Cart.last_activity < cutoff_time,
+            Cart.recovery_attempt_count < 3
+        )
+    
     async def detect_abandoned_carts(self, db: AsyncSession):
         """
         Job que corre cada hora para detectar carritos abandonados.
@@ -32,35 +47,64 @@ class CartRecoveryService:
         # Carritos con productos pero sin compra en X tiempo
         cutoff_time = datetime.utcnow() - timedelta(hours=1)
         
-        stmt = select(Cart).where(
-            Cart.status == "pending",
-            Cart.last_activity < cutoff_time,
-            Cart.recovery_attempt_count < 3
+        # Lotes por keyset: memoria acotada aunque coincidan millones de carritos.
+        # Las llamadas a IA corren en paralelo (acotado) y los intentos se
+        # marcan con UPDATEs agrupados.
+        carts = keyset_iter(
+            db,
+            self.abandoned_carts_query(cutoff_time),
+            (Cart.last_activity, Cart.id)
         )
+        pool = AsyncWorkerPool(rate_limiter=rate_limiter_for(self.ai))
+        attempts = BulkUpdate(db, Cart, {
+            "attempt": {"recovery_attempt_count": Cart.recovery_attempt_count + 1},
+            "final": {
+                "recovery_attempt_count": Cart.recovery_attempt_count + 1,
+                "final_attempt": True
+            },
+        })
+        
+        async for cart, stage in pool.map(carts, self._trigger_recovery_sequence):
+            # Sin mensaje enviado no se marca intento
+            if isinstance(stage, Exception):
+                logger.error("cart_recovery_error", cart_id=cart.id, error=str(stage))
+                continue
+            if stage is None:
+                continue
+            
+            # TODO: Enviar mensaje real
+            await attempts.add("final" if stage == "final" else "attempt", cart.id)
+            
+            logger.info(f"cart_recovery_{stage}_sent", cart_id=cart.id)
         
-        result = await db.execute(stmt)
-        abandoned = result.scalars().all()
-        
-        for cart in abandoned:
-            await self._trigger_recovery_sequence(cart, db)
+        await attempts.flush()
     
-    async def _trigger_recovery_sequence(self, cart: Cart, db: AsyncSession):
-        """Inicia secuencia de recuperación personalizada"""
-        hours_abandoned = (datetime.utcnow() - cart.last_activity).total_seconds() / 3600
+    async def _trigger_recovery_sequence(self, cart: Cart) -> Optional[str]:
+        """
+        Genera el mensaje de la etapa que corresponde.
         
-        if hours_abandoned >= 72:
-            await self._send_final_offer(cart, db)
-        elif hours_abandoned >= 48:
-            await self._send_urgency_message(cart, db)
-        elif hours_abandoned >= 24:
-            await self._send_incentive_message(cart, db)
-        elif hours_abandoned >= 1:
-            await self._send_gentle_reminder(cart, db)
+        Retorna la etapa enviada (None si no se envió nada: sin IA o sin
+        mensaje generado). Si la generación lanza una excepción, el job la
+        registra y tampoco marca intento. No toca la base de datos: el job
+        marca el intento en lote.
+        """
+        with ai_flow("cart_recovery", cart.id):
+            hours_abandoned = (datetime.utcnow() - cart.last_activity).total_seconds() / 3600
+            
+            if hours_abandoned >= 72:
+                return await self._send_final_offer(cart)
+            elif hours_abandoned >= 48:
+                return await self._send_urgency_message(cart)
+            elif hours_abandoned >= 24:
+                return await self._send_incentive_message(cart)
+            elif hours_abandoned >= 1:
+                return await self._send_gentle_reminder(cart)
+            return None
     
-    async def _send_gentle_reminder(self, cart: Cart, db: AsyncSession):
+    async def _send_gentle_reminder(self, cart: Cart) -> Optional[str]:
         """Recordatorio 1 hora después"""
         if not self.ai:
-            return
+            return None
         
         products_text = self._format_cart_items(cart)
         
@@ -76,76 +120,76 @@ class CartRecoveryService:
             OBJETIVO: Recordar sin presionar
             """
         )
+        if not message:
+            return None
         
-        # TODO: Enviar mensaje real
-        cart.recovery_attempt_count += 1
-        await db.commit()
-        
-        logger.info("cart_recovery_gentle_sent", cart_id=cart.id)
+        return "gentle"
     
-    async def _send_incentive_message(self, cart: Cart, db: AsyncSession):
+    async def _send_incentive_message(self, cart: Cart) -> Optional[str]:
         """Incentivo después de 24h"""
-        discount_code = await self._generate_discount_code(cart, percentage=10)
+        if not self.ai:
+            return None
         
-        if self.ai:
-            message = await self.ai.generate_response(
-                f"""
-                Genera mensaje con incentivo para recuperar carrito.
-                
-                INCLUIR:
-                - Recordatorio amigable
-                - Código de descuento 10%: {discount_code}
-                - Urgencia suave (válido 24h)
-                
-                TONO: Generoso, creando valor
-                """
-            )
+        discount_code = await self._generate_discount_code(cart, percentage=10)
         
-        cart.recovery_attempt_count += 1
-        await db.commit()
+        message = await self.ai.generate_response(
+            f"""
+            Genera mensaje con incentivo para recuperar carrito.
+            
+            INCLUIR:
+            - Recordatorio amigable
+            - Código de descuento 10%: {discount_code}
+            - Urgencia suave (válido 24h)
+            
+            TONO: Generoso, creando valor
+            """
+        )
+        if not message:
+            return None
         
-        logger.info("cart_recovery_incentive_sent", cart_id=cart.id)
+        return "incentive"
     
-    async def _send_urgency_message(self, cart: Cart, db: AsyncSession):
+    async def _send_urgency_message(self, cart: Cart) -> Optional[str]:
         """Urgencia después de 48h"""
-        if self.ai:
-            message = await self.ai.generate_response(
-                f"""
-                Genera mensaje con urgencia sobre stock limitado.
-                Valor del carrito: ${cart.total_amount}
-                
-                TONO: Urgente pero respetuoso
-                """
-            )
+        if not self.ai:
+            return None
         
-        cart.recovery_attempt_count += 1
-        await db.commit()
+        message = await self.ai.generate_response(
+            f"""
+            Genera mensaje con urgencia sobre stock limitado.
+            Valor del carrito: ${cart.total_amount}
+            
+            TONO: Urgente pero respetuoso
+            """
+        )
+        if not message:
+            return None
         
-        logger.info("cart_recovery_urgency_sent", cart_id=cart.id)
+        return "urgency"
     
-    async def _send_final_offer(self, cart: Cart, db: AsyncSession):
+    async def _send_final_offer(self, cart: Cart) -> Optional[str]:
         """Última oportunidad con mejor oferta"""
-        discount_code = await self._generate_discount_code(cart, percentage=15)
+        if not self.ai:
+            return None
         
-        if self.ai:
-            message = await self.ai.generate_response(
-                f"""
-                Mensaje de última oportunidad.
-                
-                INCLUIR:
-                - Reconocimiento de que no completó compra
-                - Mejor oferta (15% descuento): {discount_code}
-                - Urgencia real (expira en 24h)
-                
-                TONO: Último intento pero respetuoso
-                """
-            )
+        discount_code = await self._generate_discount_code(cart, percentage=15)
         
-        cart.recovery_attempt_count += 1
-        cart.final_attempt = True
-        await db.commit()
+        message = await self.ai.generate_response(
+            f"""
+            Mensaje de última oportunidad.
+            
+            INCLUIR:
+            - Reconocimiento de que no completó compra
+            - Mejor oferta (15% descuento): {discount_code}
+            - Urgencia real (expira en 24h)
+            
+            TONO: Último intento pero respetuoso
+            """
+        )
+        if not message:
+            return None
         
-        logger.info("cart_recovery_final_sent", cart_id=cart.id)
+        return "final"
     
     def _format_cart_items(self, cart: Cart) -> str:
         """Formatea items del carrito"""
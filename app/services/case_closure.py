@@ -6,6 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.case import Case, CaseStatus
 from app.ai.base import AIAdapter
 from app.ai.factory import AIAdapterFactory
+from app.ai.usage import ai_flow
 from app.core.logging import get_logger
 from datetime import datetime
 
@@ -81,7 +82,8 @@ class CaseClosureService:
         Responde en JSON: {{"should_close": true/false, "confidence": 0.0-1.0, "reason": "..."}}
         """
         
-        response = await self.ai.generate_response(prompt)
+        with ai_flow("case_closure", case.id):
+            response = await self.ai.generate_response(prompt)
         # TODO: Parsear respuesta JSON
         return {"should_close": False, "confidence": 0.5}
     
@@ -90,14 +92,15 @@ class CaseClosureService:
         if not self.ai:
             return
         
-        message = await self.ai.generate_response(
-            f"""
-            Genera un mensaje breve preguntando si el problema está resuelto.
-            Debe ser amigable y dar opción de reabrir si hay algo más.
+        with ai_flow("case_closure", case.id):
+            message = await self.ai.generate_response(
+                f"""
+                Genera un mensaje breve preguntando si el problema está resuelto.
+                Debe ser amigable y dar opción de reabrir si hay algo más.
             
-            Caso: {case.description}
-            """
-        )
+                Caso: {case.description}
+                """
+            )
         
         # TODO: Enviar mensaje real
         logger.info("closure_confirmation_sent", case_id=case.id)
@@ -1,23 +1,34 @@
 """
 FLUJO 6: Agente Conversacional Autónomo
 """
-from typing import List, Dict, Optional
+import time
+from contextlib import aclosing
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.ai.base import AIAdapter
 from app.ai.factory import AIAdapterFactory
-from app.schemas.conversation import ChatMessage, ChatContext
+from app.ai.usage import ai_flow
+from app.ai.prompt_budget import PromptBudget, prompt_budget
+from app.schemas.conversation import ChatMessage, ChatContext, ChatStreamEvent
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+ESCALATION_MESSAGE = "Tu consulta requiere atención personalizada. Te estoy conectando con un agente humano."
+
 
 class AutonomousChatbot:
     """Bot de IA que mantiene conversaciones naturales"""
     
-    def __init__(self, ai_adapter: Optional[AIAdapter] = None):
+    def __init__(
+        self,
+        ai_adapter: Optional[AIAdapter] = None,
+        budget: Optional[PromptBudget] = None
+    ):
         self.ai = ai_adapter or AIAdapterFactory.get_default_adapter()
         if not self.ai:
             raise ValueError("No hay adaptador de IA disponible")
+        self.budget = budget or prompt_budget
     
     async def respond(
         self,
@@ -32,6 +43,99 @@ class AutonomousChatbot:
         - Historial del cliente
         - Inventario en tiempo real
         """
+        messages, product_context = await self._prepare_messages(message, context, db)
+        
+        with ai_flow("chatbot", context.conversation_id):
+            response_text = await self.ai.chat(
+                messages=messages,
+                temperature=0.7,
+                max_tokens=500
+            )
+        
+        # 4. Validar respuesta
+        validated_response = await self._validate_response(response_text, product_context)
+        
+        # 5. Determinar si necesita escalamiento
+        needs_escalation = await self._should_escalate(message, validated_response)
+        
+        if needs_escalation:
+            return ChatMessage(
+                content=ESCALATION_MESSAGE,
+                action="escalate_to_human"
+            )
+        
+        return ChatMessage(
+            content=validated_response,
+            suggested_replies=await self._generate_quick_replies(validated_response),
+            metadata={"products_mentioned": [p.get("id") for p in product_context]}
+        )
+    
+    async def respond_stream(
+        self,
+        message: str,
+        context: ChatContext,
+        db: AsyncSession
+    ) -> AsyncIterator[ChatStreamEvent]:
+        """
+        Igual que `respond`, pero entrega la respuesta token a token.
+        
+        El escalamiento depende solo del mensaje del cliente, así que se
+        decide antes de llamar a la IA (sin gastar tokens). La validación
+        se aplica a cada fragmento. El último evento (`done` o `escalate`)
+        trae la respuesta completa con el tiempo al primer token y el total.
+        """
+        started = time.perf_counter()
+        
+        if await self._should_escalate(message, ""):
+            yield self._escalation_event(started)
+            return
+        
+        messages, product_context = await self._prepare_messages(message, context, db)
+        
+        parts: List[str] = []
+        first_token_ms: Optional[int] = None
+        with ai_flow("chatbot", context.conversation_id):
+            async with aclosing(self.ai.chat_stream(
+                messages=messages,
+                temperature=0.7,
+                max_tokens=500
+            )) as stream:
+                async for chunk in stream:
+                    validated = await self._validate_response(chunk, product_context)
+                    if not validated:
+                        continue
+                    if first_token_ms is None:
+                        first_token_ms = _elapsed_ms(started)
+                    parts.append(validated)
+                    yield ChatStreamEvent(event="token", content=validated)
+        
+        response_text = "".join(parts)
+        total_ms = _elapsed_ms(started)
+        logger.info(
+            "chatbot_stream_completed",
+            conversation_id=context.conversation_id,
+            time_to_first_token_ms=first_token_ms,
+            total_ms=total_ms
+        )
+        
+        yield ChatStreamEvent(
+            event="done",
+            message=ChatMessage(
+                content=response_text,
+                suggested_replies=await self._generate_quick_replies(response_text),
+                metadata={"products_mentioned": [p.get("id") for p in product_context]}
+            ),
+            time_to_first_token_ms=first_token_ms,
+            total_ms=total_ms
+        )
+    
+    async def _prepare_messages(
+        self,
+        message: str,
+        context: ChatContext,
+        db: AsyncSession
+    ) -> Tuple[List[Dict[str, str]], List[Dict]]:
+        """Mensajes para la IA (ya recortados a la ventana) y productos relevantes"""
         # 1. Obtener contexto relevante
         product_context = await self._search_products(message, db)
         customer_history = await self._get_customer_history(context.customer_id, db)
@@ -52,28 +156,25 @@ class AutonomousChatbot:
             {"role": "user", "content": message}
         ]
         
-        response_text = await self.ai.chat(
-            messages=messages,
-            temperature=0.7,
-            max_tokens=500
-        )
-        
-        # 4. Validar respuesta
-        validated_response = await self._validate_response(response_text, product_context)
-        
-        # 5. Determinar si necesita escalamiento
-        needs_escalation = await self._should_escalate(message, validated_response)
-        
-        if needs_escalation:
-            return ChatMessage(
-                content="Tu consulta requiere atención personalizada. Te estoy conectando con un agente humano.",
-                action="escalate_to_human"
+        # Historial recortado a la ventana de tokens (sistema + últimos turnos)
+        fitted = self.budget.fit(messages, self.ai.model_name)
+        if fitted.dropped:
+            logger.info(
+                "chat_history_truncated",
+                conversation_id=context.conversation_id,
+                dropped=fitted.dropped,
+                summarized=fitted.summarized,
+                tokens=fitted.tokens,
+                original_tokens=fitted.original_tokens
             )
         
-        return ChatMessage(
-            content=validated_response,
-            suggested_replies=await self._generate_quick_replies(validated_response),
-            metadata={"products_mentioned": [p.get("id") for p in product_context]}
+        return fitted.messages, product_context
+    
+    def _escalation_event(self, started: float) -> ChatStreamEvent:
+        return ChatStreamEvent(
+            event="escalate",
+            message=ChatMessage(content=ESCALATION_MESSAGE, action="escalate_to_human"),
+            total_ms=_elapsed_ms(started)
         )
     
     def _get_system_prompt(self) -> str:
@@ -163,3 +264,6 @@ class AutonomousChatbot:
         # TODO: Implementar generación de quick replies
         return []
 
+
+def _elapsed_ms(started: float) -> int:
+    return int((time.perf_counter() - started) * 1000)
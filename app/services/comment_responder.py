@@ -4,7 +4,9 @@ FLUJO 17: Respuesta Automática a Comentarios
 from typing import Dict, Optional
 from app.ai.base import AIAdapter
 from app.ai.factory import AIAdapterFactory
+from app.ai.usage import ai_flow
 from app.services.sentiment_analyzer import SentimentAnalyzer
+from app.services.keywords import COMMENT_KEYWORDS
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -70,14 +72,9 @@ class CommentResponder:
         """Clasifica el tipo de comentario"""
         text = comment.get("text", "").lower()
         
-        if any(word in text for word in ["spam", "scam", "fake"]):
-            return "spam"
-        elif any(word in text for word in ["?", "cuánto", "cómo", "dónde"]):
-            return "question"
-        elif any(word in text for word in ["malo", "defectuoso", "queja", "reclamo"]):
-            return "complaint"
-        elif any(word in text for word in ["excelente", "genial", "gracias", "amor"]):
-            return "praise"
+        for comment_type, words in COMMENT_KEYWORDS.items():
+            if any(word in text for word in words):
+                return comment_type
         
         return "neutral"
     
@@ -99,7 +96,8 @@ class CommentResponder:
         4. Agradece su interés
         """
         
-        return await self.ai.generate_response(prompt)
+        with ai_flow("comment_responder"):
+            return await self.ai.generate_response(prompt)
     
     async def _handle_complaint(self, comment: Dict) -> str:
         """Maneja comentarios negativos con empatía"""
@@ -121,7 +119,8 @@ class CommentResponder:
         LONGITUD: 2-3 oraciones
         """
         
-        return await self.ai.generate_response(prompt)
+        with ai_flow("comment_responder"):
+            return await self.ai.generate_response(prompt)
     
     async def _thank_positive_comment(self, comment: Dict) -> str:
         """Agradece comentarios positivos"""
@@ -137,9 +136,10 @@ class CommentResponder:
         if not self.ai:
             return "Gracias por tu comentario!"
         
-        return await self.ai.generate_response(
-            f"Genera respuesta breve y amigable para comentario: {comment.get('text', '')}"
-        )
+        with ai_flow("comment_responder"):
+            return await self.ai.generate_response(
+                f"Genera respuesta breve y amigable para comentario: {comment.get('text', '')}"
+            )
     
     async def _hide_or_delete_comment(self, comment: Dict):
         """Oculta o elimina comentario spam"""
@@ -0,0 +1,263 @@
+"""
+Archivo frío de conversaciones cerradas
+
+Las conversaciones cerradas hace más de `ARCHIVE_CONVERSATIONS_AFTER_DAYS`
+días no las vuelve a leer el camino caliente, pero ocupan Postgres y su
+buffer cache. El job de archivo:
+
+1. Recorre las candidatas por keyset (closed_at, id) en lotes de
+   `ARCHIVE_BATCH_SIZE`.
+2. Escribe conversaciones, mensajes y análisis de sentimiento de cada lote
+   en Parquet columnar comprimido con zstd, particionado por mes de cierre
+   y canal:
+
+       STORAGE_PATH/archive/month=2024-05/channel=whatsapp/<lote>.messages.parquet
+
+3. Registra cada conversación en `archived_conversations` y borra las filas
+   del lote en la misma transacción.
+
+Las conversaciones con casos asociados no se archivan (cases mantiene su
+FK a conversations).
+
+`get_conversation` busca primero en Postgres y, si la conversación ya fue
+archivada, la lee del Parquet correspondiente.
+"""
+import asyncio
+import enum
+import os
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import JSON, Boolean, DateTime, Float, Integer, delete, exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.streaming import keyset_batches
+from app.models.archive import ArchivedConversation
+from app.models.case import Case
+from app.models.conversation import Conversation, ConversationStatus
+from app.models.message import Message
+from app.models.sentiment import SentimentAnalysis
+from app.core import json
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+ARCHIVE_DIR = "archive"
+
+# Tabla archivada -> (modelo, columna con el id de la conversación)
+ARCHIVED_TABLES = {
+    "conversations": (Conversation, "id"),
+    "messages": (Message, "conversation_id"),
+    "sentiment_analyses": (SentimentAnalysis, "conversation_id"),
+}
+
+
+def arrow_schema(model: Any) -> pa.Schema:
+    """Esquema Arrow fijo a partir de las columnas del modelo"""
+    fields = []
+    for column in model.__table__.columns:
+        if isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp("us")
+        elif isinstance(column.type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, Float):
+            arrow_type = pa.float64()
+        else:
+            # String, Text, Enum y JSON (serializado) como texto
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+def to_row(obj: Any) -> Dict[str, Any]:
+    """Fila plana de una entidad: enums por valor y JSON como texto"""
+    row = {}
+    for column in obj.__table__.columns:
+        value = getattr(obj, column.key)
+        if isinstance(value, enum.Enum):
+            value = value.value
+        elif isinstance(column.type, JSON) and value is not None:
+            value = json.dumps(value)
+        row[column.name] = value
+    return row
+
+
+def write_parquet(path: Path, rows: List[Dict[str, Any]], schema: pa.Schema, level: int):
+    """Escribe un archivo completo o ninguno (nombre temporal + rename)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    table = pa.Table.from_pylist(rows, schema=schema)
+    pq.write_table(table, tmp_path, compression="zstd", compression_level=level)
+    os.replace(tmp_path, path)
+
+
+class ConversationArchive:
+    """Mueve conversaciones cerradas a Parquet y las lee de vuelta"""
+
+    def __init__(
+        self,
+        storage_path: Optional[str] = None,
+        after_days: Optional[int] = None,
+        batch_size: Optional[int] = None
+    ):
+        self.root = Path(storage_path or settings.STORAGE_PATH) / ARCHIVE_DIR
+        self.after_days = after_days or settings.ARCHIVE_CONVERSATIONS_AFTER_DAYS
+        self.batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+        self.schemas = {name: arrow_schema(model) for name, (model, _) in ARCHIVED_TABLES.items()}
+
+    async def archive(self, db: AsyncSession) -> Dict[str, int]:
+        """Archiva todas las conversaciones candidatas, lote por lote"""
+        cutoff = datetime.utcnow() - timedelta(days=self.after_days)
+        stmt = select(Conversation).where(
+            Conversation.status == ConversationStatus.CLOSED,
+            Conversation.closed_at < cutoff,
+            ~exists().where(Case.conversation_id == Conversation.id)
+        )
+
+        totals = {"conversations": 0, "messages": 0, "sentiment_analyses": 0}
+        async for conversations in keyset_batches(
+            db, stmt, [Conversation.closed_at, Conversation.id], self.batch_size
+        ):
+            counts = await self._archive_batch(conversations, db)
+            for name, count in counts.items():
+                totals[name] += count
+
+        logger.info("conversations_archived", cutoff=cutoff.isoformat(), **totals)
+        return totals
+
+    async def _archive_batch(
+        self,
+        conversations: List[Conversation],
+        db: AsyncSession
+    ) -> Dict[str, int]:
+        """Escribe el lote en Parquet, lo indexa y lo borra de Postgres"""
+        ids = [c.id for c in conversations]
+        rows: Dict[str, List[Dict[str, Any]]] = {
+            "conversations": [to_row(c) for c in conversations]
+        }
+        for name in ("messages", "sentiment_analyses"):
+            model, key = ARCHIVED_TABLES[name]
+            result = await db.execute(select(model).where(getattr(model, key).in_(ids)))
+            rows[name] = [to_row(obj) for obj in result.scalars()]
+
+        # (mes de cierre, canal) -> filas de cada tabla
+        batch_id = uuid.uuid4().hex
+        prefixes = {c.id: self._prefix(c, batch_id) for c in conversations}
+        groups: Dict[str, Dict[str, List[Dict[str, Any]]]] = defaultdict(lambda: defaultdict(list))
+        for name, table_rows in rows.items():
+            key = ARCHIVED_TABLES[name][1]
+            for row in table_rows:
+                groups[prefixes[row[key]]][name].append(row)
+
+        await asyncio.to_thread(self._write_groups, groups)
+
+        message_counts = defaultdict(int)
+        for row in rows["messages"]:
+            message_counts[row["conversation_id"]] += 1
+        db.add_all([
+            ArchivedConversation(
+                conversation_id=c.id,
+                customer_id=c.customer_id,
+                lead_id=c.lead_id,
+                channel=c.channel,
+                closed_at=c.closed_at,
+                message_count=message_counts[c.id],
+                path=prefixes[c.id]
+            )
+            for c in conversations
+        ])
+        try:
+            for model, key in (
+                (SentimentAnalysis, SentimentAnalysis.conversation_id),
+                (Message, Message.conversation_id),
+                (Conversation, Conversation.id),
+            ):
+                await db.execute(
+                    delete(model).where(key.in_(ids)).execution_options(synchronize_session=False)
+                )
+            await db.commit()
+        except Exception:
+            # Los archivos quedan huérfanos; la próxima ejecución archiva de nuevo
+            await db.rollback()
+            raise
+
+        # Las filas borradas no deben seguir en la sesión (ni en memoria)
+        db.expunge_all()
+
+        return {name: len(table_rows) for name, table_rows in rows.items()}
+
+    def _prefix(self, conversation: Conversation, batch_id: str) -> str:
+        """Partición por mes de cierre y canal; un archivo por lote"""
+        month = (conversation.closed_at or conversation.started_at).strftime("%Y-%m")
+        return f"month={month}/channel={conversation.channel}/{batch_id}"
+
+    def _write_groups(self, groups: Dict[str, Dict[str, List[Dict[str, Any]]]]):
+        level = settings.ARCHIVE_ZSTD_LEVEL
+        for prefix, tables in groups.items():
+            for name, table_rows in tables.items():
+                write_parquet(self._path(prefix, name), table_rows, self.schemas[name], level)
+
+    def _path(self, prefix: str, table: str) -> Path:
+        return self.root / f"{prefix}.{table}.parquet"
+
+    async def get_conversation(
+        self,
+        conversation_id: str,
+        db: AsyncSession
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Conversación con mensajes y análisis de sentimiento: de Postgres si
+        sigue ahí, si no del archivo. None si no existe en ninguno.
+        """
+        conversation = await db.get(Conversation, conversation_id)
+        if conversation is not None:
+            messages = await db.execute(
+                select(Message)
+                .where(Message.conversation_id == conversation_id)
+                .order_by(Message.sent_at)
+            )
+            sentiments = await db.execute(
+                select(SentimentAnalysis)
+                .where(SentimentAnalysis.conversation_id == conversation_id)
+                .order_by(SentimentAnalysis.analyzed_at)
+            )
+            return {
+                **to_row(conversation),
+                "archived": False,
+                "messages": [to_row(m) for m in messages.scalars()],
+                "sentiment_analyses": [to_row(s) for s in sentiments.scalars()],
+            }
+
+        entry = await db.get(ArchivedConversation, conversation_id)
+        if entry is None:
+            return None
+
+        tables = await asyncio.to_thread(self._read, entry.path, conversation_id)
+        if not tables["conversations"]:
+            logger.error("archived_conversation_missing", conversation_id=conversation_id, path=entry.path)
+            return None
+
+        return {
+            **tables["conversations"][0],
+            "archived": True,
+            "messages": sorted(tables["messages"], key=lambda m: m["sent_at"]),
+            "sentiment_analyses": sorted(tables["sentiment_analyses"], key=lambda s: s["analyzed_at"]),
+        }
+
+    def _read(self, prefix: str, conversation_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Filas de una conversación en los archivos de su lote"""
+        tables = {}
+        for name, (_, key) in ARCHIVED_TABLES.items():
+            path = self._path(prefix, name)
+            if not path.exists():
+                tables[name] = []
+                continue
+            table = pq.read_table(path, filters=[(key, "=", conversation_id)])
+            tables[name] = table.to_pylist()
+        return tables
@@ -0,0 +1,249 @@
+"""
+Índice de candidatos para deduplicación (FLUJO 18)
+
+Genera claves de bloqueo (blocking keys) por contacto en una sola pasada y
+solo compara contactos que comparten al menos una clave, en lugar de
+comparar todos contra todos.
+"""
+import re
+import unicodedata
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import phonenumbers
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Bloques difusos (nombre) más grandes que esto no aportan candidatos
+# útiles (ej: "maria"). Las claves exactas de email/teléfono no se limitan
+# (son las coincidencias de mayor precisión) y se enlazan en estrella.
+DEFAULT_MAX_BLOCK_SIZE = 200
+
+EXACT_KEY_PREFIXES = ("email", "phone")
+
+# MinHash sobre trigramas del nombre: BANDS bandas de ROWS hashes cada una
+MINHASH_BANDS = 2
+MINHASH_ROWS = 2
+_MERSENNE_PRIME = (1 << 61) - 1
+_MINHASH_PARAMS = [
+    (zlib.crc32(f"a{i}".encode()) | 1, zlib.crc32(f"b{i}".encode()))
+    for i in range(MINHASH_BANDS * MINHASH_ROWS)
+]
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9 ]+")
+_NON_DIGIT = re.compile(r"\D+")
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    """Email en minúsculas y sin espacios"""
+    if not email:
+        return None
+    email = email.strip().lower()
+    return email or None
+
+
+def normalize_phone(phone: Optional[str], default_country: str = "PA") -> Optional[str]:
+    """Teléfono en E.164 si es posible, si no solo dígitos"""
+    if not phone:
+        return None
+    try:
+        parsed = phonenumbers.parse(phone, default_country)
+        if phonenumbers.is_possible_number(parsed):
+            return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+    except phonenumbers.phonenumberutil.NumberParseException:
+        pass
+    digits = _NON_DIGIT.sub("", phone)
+    return digits or None
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Nombre sin acentos, en minúsculas y con espacios simples"""
+    if not name:
+        return ""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    name = _NON_ALNUM.sub(" ", name.lower())
+    return " ".join(name.split())
+
+
+def phonetic_code(token: str) -> str:
+    """Código Soundex de una palabra (tolera errores de ortografía comunes)"""
+    if not token:
+        return ""
+    first = token[0]
+    code = [first]
+    last = _SOUNDEX_CODES.get(first, "")
+    for char in token[1:]:
+        digit = _SOUNDEX_CODES.get(char, "")
+        if digit and digit != last:
+            code.append(digit)
+        if char not in "hw":
+            last = digit
+    return "".join(code)[:4].ljust(4, "0")
+
+
+def _minhash_keys(compact_name: str) -> List[str]:
+    """Claves LSH (MinHash por bandas) sobre trigramas del nombre"""
+    padded = f"  {compact_name} "
+    shingles = {zlib.crc32(padded[i:i + 3].encode()) for i in range(len(padded) - 2)}
+    if not shingles:
+        return []
+    signature = [
+        min((a * s + b) % _MERSENNE_PRIME for s in shingles)
+        for a, b in _MINHASH_PARAMS
+    ]
+    return [
+        f"mh{band}:" + ".".join(
+            str(v) for v in signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS]
+        )
+        for band in range(MINHASH_BANDS)
+    ]
+
+
+def is_exact_key(key: str) -> bool:
+    """True para claves de email/teléfono (sin límite de tamaño de bloque)"""
+    return key.split(":", 1)[0] in EXACT_KEY_PREFIXES
+
+
+@dataclass
+class ContactKeys:
+    """Campos normalizados de un contacto"""
+    id: str
+    name: str
+    email: Optional[str]
+    phone: Optional[str]
+
+
+def blocking_keys(contact: ContactKeys) -> List[str]:
+    """
+    Claves de bloqueo de un contacto.
+
+    - email:/phone: coincidencia exacta normalizada
+    - ph: código fonético del primer y último token del nombre
+    - mh: bandas MinHash sobre trigramas del nombre
+    """
+    keys = []
+    if contact.email:
+        keys.append(f"email:{contact.email}")
+    if contact.phone:
+        keys.append(f"phone:{contact.phone}")
+
+    tokens = contact.name.split()
+    if tokens:
+        codes = sorted({phonetic_code(tokens[0]), phonetic_code(tokens[-1])})
+        keys.append("ph:" + ".".join(codes))
+        keys.extend(_minhash_keys(contact.name.replace(" ", "")))
+    return keys
+
+
+class CandidateIndex:
+    """
+    Índice invertido clave -> contactos.
+
+    Se construye con `add` en una sola pasada y `candidate_pairs` devuelve
+    únicamente pares que comparten alguna clave, junto con el motivo.
+    """
+
+    def __init__(self, max_block_size: int = DEFAULT_MAX_BLOCK_SIZE):
+        self.max_block_size = max_block_size
+        self.contacts: Dict[str, ContactKeys] = {}
+        self.keys: Dict[str, List[str]] = {}
+        self._blocks: Dict[str, List[str]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self.contacts)
+
+    def add(
+        self,
+        record_id: str,
+        name: Optional[str],
+        email: Optional[str] = None,
+        phone: Optional[str] = None
+    ) -> ContactKeys:
+        """Normaliza un contacto y lo agrega a sus bloques"""
+        contact = ContactKeys(
+            id=record_id,
+            name=normalize_name(name),
+            email=normalize_email(email),
+            phone=normalize_phone(phone),
+        )
+        self.contacts[record_id] = contact
+        self.keys[record_id] = blocking_keys(contact)
+        for key in self.keys[record_id]:
+            self._blocks[key].append(record_id)
+        return contact
+
+    def candidate_pairs(
+        self,
+        focus: Optional[Set[str]] = None
+    ) -> Iterator[Tuple[str, str, Set[str]]]:
+        """
+        Genera pares (id_a, id_b, motivos) sin repetir.
+
+        Motivos: "email", "phone" y/o "name". Con `focus`, solo se generan
+        pares donde al menos uno de los dos contactos está en ese conjunto.
+
+        Los bloques exactos (email/teléfono) no tienen límite de tamaño, así
+        que no se enumeran todos sus pares: cada miembro se une a un ancla
+        (estrella), n - 1 pares en lugar de n²/2. Al agrupar vecinos el
+        resultado es el mismo grupo.
+        """
+        pairs: Dict[Tuple[str, str], Set[str]] = {}
+        oversized = 0
+
+        for key, members in self._blocks.items():
+            if len(members) < 2:
+                continue
+
+            if is_exact_key(key):
+                self._link_star(key.split(":", 1)[0], members, focus, pairs)
+                continue
+            if len(members) > self.max_block_size:
+                oversized += 1
+                continue
+            reason = "name"
+            for i, a in enumerate(members):
+                for b in members[i + 1:]:
+                    if a == b:
+                        continue
+                    if focus is not None and a not in focus and b not in focus:
+                        continue
+                    pair = (a, b) if a < b else (b, a)
+                    pairs.setdefault(pair, set()).add(reason)
+
+        if oversized:
+            logger.info("dedup_oversized_blocks_skipped", blocks=oversized)
+
+        for (a, b), reasons in pairs.items():
+            yield a, b, reasons
+
+    @staticmethod
+    def _link_star(
+        reason: str,
+        members: List[str],
+        focus: Optional[Set[str]],
+        pairs: Dict[Tuple[str, str], Set[str]]
+    ):
+        """Une cada miembro de un bloque exacto con el ancla (el primero en `focus`)"""
+        if focus is None:
+            anchor = members[0]
+        else:
+            anchor = next((m for m in members if m in focus), None)
+            if anchor is None:
+                return
+        for member in members:
+            if member == anchor:
+                continue
+            pair = (anchor, member) if anchor < member else (member, anchor)
+            pairs.setdefault(pair, set()).add(reason)
@@ -1,146 +1,480 @@
 """
 FLUJO 18: Deduplicación Automática
 """
-from typing import List, Optional
+import asyncio
+import enum
+import json
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models.customer import Customer
+from sqlalchemy import select, insert, delete, func, or_
+from app.models.customer import Customer, CustomerBlockingKey
+from app.models.job import JobWatermark
 from app.models.lead import Lead
 from app.ai.base import AIAdapter
 from app.ai.factory import AIAdapterFactory
+from app.ai.usage import ai_flow
+from app.services.dedup_index import CandidateIndex, is_exact_key
+from app.services.name_similarity import NameSimilarityEngine
+from app.core.config import settings
 from app.core.logging import get_logger
-from fuzzywuzzy import fuzz
 
 logger = get_logger(__name__)
 
+# Similitud mínima de nombres (0-100, mismo corte que el fuzz.ratio anterior)
+NAME_SIMILARITY_THRESHOLD = 85
+
+# Filas por lote al leer la tabla y al cargar contactos candidatos
+INDEX_FETCH_SIZE = 5000
+LOAD_CHUNK_SIZE = 1000
+KEYS_INSERT_CHUNK_SIZE = 10000
+
+WATERMARK_NAME = "deduplicator"
+
+
+class DeduplicationMode(str, enum.Enum):
+    FULL = "full"
+    INCREMENTAL = "incremental"
+
+
+def _pair_key(a: str, b: str) -> Tuple[str, str]:
+    """Clave de par sin orden"""
+    return (a, b) if a < b else (b, a)
+
+
+def _describe(contact: Customer) -> Dict[str, str]:
+    """Datos del contacto que ve la IA"""
+    return {
+        "nombre": contact.name,
+        "email": contact.email or "N/A",
+        "telefono": contact.phone or "N/A",
+    }
+
+
+def _parse_batch_response(response: str) -> Dict[int, bool]:
+    """Extrae {pair_id: duplicate} del JSON devuelto por la IA"""
+    start, end = response.find("{"), response.rfind("}")
+    if start == -1 or end == -1:
+        raise ValueError("Respuesta de IA sin JSON")
+    
+    data = json.loads(response[start:end + 1])
+    return {
+        int(item["pair_id"]): item.get("duplicate") is True
+        for item in data.get("results", [])
+        if "pair_id" in item
+    }
+
 
 class Deduplicator:
     """
     Detecta y fusiona duplicados usando:
-    - Fuzzy matching en nombres
-    - Comparación de emails/teléfonos
-    - IA para casos ambiguos
+    - Índice de bloqueo (email/teléfono normalizados, claves fonéticas y n-gramas)
+    - Similitud vectorizada de nombres dentro de cada bloque
+    - Comparación de emails/teléfonos (deciden sin IA)
+    - IA en lotes concurrentes para casos ambiguos
     """
     
     def __init__(self, ai_adapter: Optional[AIAdapter] = None):
         self.ai = ai_adapter or AIAdapterFactory.get_default_adapter()
+        self.similarity = NameSimilarityEngine(threshold=NAME_SIMILARITY_THRESHOLD)
+    
+    async def deduplicate(
+        self,
+        db: AsyncSession,
+        mode: DeduplicationMode = DeduplicationMode.FULL
+    ) -> Dict:
+        """
+        Detecta duplicados en modo completo o incremental.
+        
+        - full: recorre toda la tabla, reconstruye el índice de bloqueo
+          persistido y compara todos los pares candidatos
+        - incremental: solo contactos creados/modificados desde la marca de
+          agua, comparados contra el índice persistido
+        
+        Si no existe marca de agua, el modo incremental hace un full.
+        """
+        watermark = None
+        if mode == DeduplicationMode.INCREMENTAL:
+            watermark = await self._get_watermark(db)
+            if watermark is None:
+                logger.info("dedup_watermark_missing_running_full")
+                mode = DeduplicationMode.FULL
+        
+        started_at = datetime.utcnow()
+        
+        if mode == DeduplicationMode.FULL:
+            index = await self._build_index(db)
+            await self._rebuild_blocking_keys(index, db)
+            focus = None
+            rows_scanned = len(index)
+        else:
+            index, focus = await self._build_incremental_index(watermark, db)
+            rows_scanned = len(focus)
+        
+        duplicates = await self._resolve_duplicates(index, focus, db)
+        
+        # Índice y marca de agua se confirman juntos, solo si todo salió bien
+        await self._set_watermark(started_at, db)
+        await db.commit()
+        
+        logger.info(
+            "duplicates_scan_completed",
+            mode=mode.value,
+            rows_scanned=rows_scanned,
+            contacts=len(index),
+            groups=len(duplicates)
+        )
+        
+        return {
+            "mode": mode.value,
+            "rows_scanned": rows_scanned,
+            "duplicates": duplicates,
+        }
     
     async def find_duplicates(self, db: AsyncSession) -> List[Dict]:
         """
-        Job que corre diariamente para detectar duplicados.
+        Detección completa de duplicados (reconstruye el índice).
+        
+        Construye un índice de bloqueo en una sola pasada sobre la tabla y
+        solo compara pares que comparten email, teléfono o clave de nombre.
         """
-        # Obtener todos los contactos
-        stmt = select(Customer)
-        result = await db.execute(stmt)
-        all_contacts = result.scalars().all()
+        result = await self.deduplicate(db, DeduplicationMode.FULL)
+        return result["duplicates"]
+    
+    async def _resolve_duplicates(
+        self,
+        index: CandidateIndex,
+        focus: Optional[Set[str]],
+        db: AsyncSession
+    ) -> List[Dict]:
+        """Pares candidatos -> grupos {primary, duplicates} confirmados"""
+        neighbors = self._find_potential_duplicates(index, focus)
+        customers = await self._load_customers(list(neighbors), db)
+        
+        # Confirmar todos los pares candidatos de una vez (reglas + IA en lote)
+        pairs = {
+            _pair_key(contact_id, other_id)
+            for contact_id, others in neighbors.items()
+            for other_id in others
+            if contact_id in customers and other_id in customers
+        }
+        confirmed = await self._confirm_duplicates(
+            [(customers[a], customers[b]) for a, b in sorted(pairs)],
+            index
+        )
         
         duplicates = []
         processed = set()
         
-        for contact in all_contacts:
-            if contact.id in processed:
+        for contact_id in index.contacts:
+            if contact_id in processed or contact_id not in neighbors:
                 continue
             
-            # Buscar potenciales duplicados
-            potential_dupes = await self._find_potential_duplicates(contact, db)
+            confirmed_dupes = [
+                customers[other_id]
+                for other_id in neighbors[contact_id]
+                if other_id not in processed
+                and _pair_key(contact_id, other_id) in confirmed
+            ]
             
-            if potential_dupes:
-                # Usar IA para confirmar si son duplicados
-                confirmed_dupes = await self._confirm_duplicates_with_ai(
-                    contact,
-                    potential_dupes
-                )
-                
-                if confirmed_dupes:
-                    duplicates.append({
-                        "primary": contact,
-                        "duplicates": confirmed_dupes
-                    })
-                    processed.update([d.id for d in confirmed_dupes])
+            if confirmed_dupes:
+                duplicates.append({
+                    "primary": customers[contact_id],
+                    "duplicates": confirmed_dupes
+                })
+                processed.add(contact_id)
+                processed.update([d.id for d in confirmed_dupes])
         
         return duplicates
     
-    async def _find_potential_duplicates(
+    async def _build_index(self, db: AsyncSession) -> CandidateIndex:
+        """Lee solo las columnas necesarias en streaming y arma el índice"""
+        index = CandidateIndex()
+        stmt = select(
+            Customer.id, Customer.name, Customer.email, Customer.phone
+        ).execution_options(yield_per=INDEX_FETCH_SIZE)
+        
+        result = await db.stream(stmt)
+        async for row in result:
+            index.add(row.id, row.name, row.email, row.phone)
+        
+        return index
+    
+    async def _build_incremental_index(
+        self,
+        watermark: datetime,
+        db: AsyncSession
+    ) -> Tuple[CandidateIndex, Set[str]]:
+        """
+        Índice con los contactos modificados y los contactos existentes que
+        comparten alguna clave de bloqueo con ellos.
+        """
+        index = CandidateIndex()
+        changed_at = func.coalesce(Customer.updated_at, Customer.created_at)
+        stmt = select(
+            Customer.id, Customer.name, Customer.email, Customer.phone
+        ).where(changed_at > watermark).execution_options(yield_per=INDEX_FETCH_SIZE)
+        
+        result = await db.stream(stmt)
+        async for row in result:
+            index.add(row.id, row.name, row.email, row.phone)
+        
+        changed_ids = set(index.contacts)
+        if not changed_ids:
+            return index, changed_ids
+        
+        await self._replace_blocking_keys(index, list(changed_ids), db)
+        
+        keys = list({key for contact_id in changed_ids for key in index.keys[contact_id]})
+        member_ids = await self._find_block_members(keys, index.max_block_size, db)
+        member_ids = list(member_ids - changed_ids)
+        
+        for start in range(0, len(member_ids), LOAD_CHUNK_SIZE):
+            chunk = member_ids[start:start + LOAD_CHUNK_SIZE]
+            result = await db.execute(
+                select(Customer.id, Customer.name, Customer.email, Customer.phone)
+                .where(Customer.id.in_(chunk))
+            )
+            for row in result:
+                index.add(row.id, row.name, row.email, row.phone)
+        
+        return index, changed_ids
+    
+    async def _find_block_members(
         self,
-        contact: Customer,
+        keys: List[str],
+        max_block_size: int,
         db: AsyncSession
-    ) -> List[Customer]:
-        """Encuentra potenciales duplicados usando reglas básicas"""
-        potentials = []
-        
-        # Regla 1: Email exacto
-        if contact.email:
-            stmt = select(Customer).where(
-                Customer.email == contact.email,
-                Customer.id != contact.id
+    ) -> Set[str]:
+        """
+        Contactos que comparten alguna clave: todos los de claves exactas
+        (email/teléfono) y, en claves de nombre, solo bloques de tamaño
+        razonable.
+        """
+        members: Set[str] = set()
+        for start in range(0, len(keys), LOAD_CHUNK_SIZE):
+            chunk = keys[start:start + LOAD_CHUNK_SIZE]
+            exact = [key for key in chunk if is_exact_key(key)]
+            fuzzy = [key for key in chunk if not is_exact_key(key)]
+            small_blocks = (
+                select(CustomerBlockingKey.key)
+                .where(CustomerBlockingKey.key.in_(fuzzy))
+                .group_by(CustomerBlockingKey.key)
+                .having(func.count() <= max_block_size)
+            )
+            result = await db.execute(
+                select(CustomerBlockingKey.customer_id)
+                .where(or_(
+                    CustomerBlockingKey.key.in_(exact),
+                    CustomerBlockingKey.key.in_(small_blocks)
+                ))
+                .distinct()
             )
-            result = await db.execute(stmt)
-            potentials.extend(result.scalars().all())
-        
-        # Regla 2: Teléfono exacto
-        if contact.phone:
-            stmt = select(Customer).where(
-                Customer.phone == contact.phone,
-                Customer.id != contact.id
+            members.update(result.scalars().all())
+        return members
+    
+    async def _rebuild_blocking_keys(self, index: CandidateIndex, db: AsyncSession):
+        """Reemplaza todo el índice de bloqueo persistido"""
+        await db.execute(delete(CustomerBlockingKey))
+        await self._insert_blocking_keys(index, list(index.contacts), db)
+    
+    async def _replace_blocking_keys(
+        self,
+        index: CandidateIndex,
+        customer_ids: List[str],
+        db: AsyncSession
+    ):
+        """Actualiza las claves de bloqueo de los contactos indicados"""
+        for start in range(0, len(customer_ids), LOAD_CHUNK_SIZE):
+            chunk = customer_ids[start:start + LOAD_CHUNK_SIZE]
+            await db.execute(
+                delete(CustomerBlockingKey).where(CustomerBlockingKey.customer_id.in_(chunk))
             )
-            result = await db.execute(stmt)
-            potentials.extend(result.scalars().all())
-        
-        # Regla 3: Nombre muy similar (fuzzy match)
-        stmt = select(Customer).where(Customer.id != contact.id)
-        result = await db.execute(stmt)
-        all_others = result.scalars().all()
-        
-        for other in all_others:
-            if contact.name and other.name:
-                similarity = fuzz.ratio(
-                    contact.name.lower(),
-                    other.name.lower()
-                )
-                if similarity > 85:  # 85% similar
-                    potentials.append(other)
-        
-        return list(set(potentials))
-    
-    async def _confirm_duplicates_with_ai(
+        await self._insert_blocking_keys(index, customer_ids, db)
+    
+    async def _insert_blocking_keys(
+        self,
+        index: CandidateIndex,
+        customer_ids: List[str],
+        db: AsyncSession
+    ):
+        """Inserta claves en lotes (executemany)"""
+        rows = []
+        for customer_id in customer_ids:
+            rows.extend({"customer_id": customer_id, "key": key} for key in index.keys[customer_id])
+            if len(rows) >= KEYS_INSERT_CHUNK_SIZE:
+                await db.execute(insert(CustomerBlockingKey), rows)
+                rows = []
+        if rows:
+            await db.execute(insert(CustomerBlockingKey), rows)
+    
+    async def _get_watermark(self, db: AsyncSession) -> Optional[datetime]:
+        """Última marca de agua del job"""
+        watermark = await db.get(JobWatermark, WATERMARK_NAME)
+        return watermark.value if watermark else None
+    
+    async def _set_watermark(self, value: datetime, db: AsyncSession):
+        """Actualiza la marca de agua (se confirma con el commit del llamador)"""
+        watermark = await db.get(JobWatermark, WATERMARK_NAME)
+        if watermark:
+            watermark.value = value
+        else:
+            db.add(JobWatermark(name=WATERMARK_NAME, value=value))
+    
+    def _find_potential_duplicates(
+        self,
+        index: CandidateIndex,
+        focus: Optional[Set[str]] = None
+    ) -> Dict[str, List[str]]:
+        """
+        Encuentra potenciales duplicados usando reglas básicas:
+        1. Email exacto (normalizado)
+        2. Teléfono exacto (normalizado)
+        3. Nombre muy similar (similitud vectorizada) dentro del mismo bloque
+        
+        Con `focus` solo considera pares que involucran esos contactos.
+        """
+        neighbors: Dict[str, List[str]] = defaultdict(list)
+        name_pairs = []
+        
+        def link(a: str, b: str):
+            neighbors[a].append(b)
+            neighbors[b].append(a)
+        
+        for a, b, reasons in index.candidate_pairs(focus):
+            if "email" in reasons or "phone" in reasons:
+                link(a, b)
+            elif index.contacts[a].name and index.contacts[b].name:
+                name_pairs.append((a, b))
+        
+        # Similitud de nombres en lote (vectorizada)
+        names = {
+            cid: index.contacts[cid].name
+            for pair in name_pairs
+            for cid in pair
+        }
+        for a, b in self.similarity.filter_pairs(name_pairs, names):
+            link(a, b)
+        
+        return neighbors
+    
+    async def _load_customers(
         self,
-        contact: Customer,
-        potentials: List[Customer]
-    ) -> List[Customer]:
-        """IA decide si son duplicados reales"""
+        customer_ids: List[str],
+        db: AsyncSession
+    ) -> Dict[str, Customer]:
+        """Carga solo los contactos involucrados en algún par candidato"""
+        customers = {}
+        for start in range(0, len(customer_ids), LOAD_CHUNK_SIZE):
+            chunk = customer_ids[start:start + LOAD_CHUNK_SIZE]
+            result = await db.execute(select(Customer).where(Customer.id.in_(chunk)))
+            customers.update({c.id: c for c in result.scalars().all()})
+        return customers
+    
+    async def _confirm_duplicates(
+        self,
+        pairs: List[Tuple[Customer, Customer]],
+        index: CandidateIndex
+    ) -> Set[Tuple[str, str]]:
+        """
+        Decide qué pares son duplicados reales.
+        
+        - Email o teléfono normalizado idéntico: duplicado sin consultar IA
+        - Resto: IA en lotes de DEDUP_AI_BATCH_SIZE pares por prompt,
+          con hasta DEDUP_AI_MAX_CONCURRENCY lotes en paralelo
+        """
+        confirmed: Set[Tuple[str, str]] = set()
+        ambiguous = []
+        
+        for a, b in pairs:
+            keys_a, keys_b = index.contacts[a.id], index.contacts[b.id]
+            if (
+                (keys_a.email and keys_a.email == keys_b.email)
+                or (keys_a.phone and keys_a.phone == keys_b.phone)
+            ):
+                confirmed.add(_pair_key(a.id, b.id))
+            else:
+                ambiguous.append((a, b))
+        
+        deterministic = len(confirmed)
+        
         if not self.ai:
             # Sin IA, usar solo reglas básicas
-            return potentials
+            confirmed.update(_pair_key(a.id, b.id) for a, b in ambiguous)
+            return confirmed
         
-        confirmed = []
+        batch_size = settings.DEDUP_AI_BATCH_SIZE
+        batches = [
+            ambiguous[start:start + batch_size]
+            for start in range(0, len(ambiguous), batch_size)
+        ]
+        semaphore = asyncio.Semaphore(settings.DEDUP_AI_MAX_CONCURRENCY)
+        results = await asyncio.gather(*[
+            self._confirm_batch_with_ai(batch, semaphore) for batch in batches
+        ])
+        for batch_confirmed in results:
+            confirmed.update(batch_confirmed)
         
-        for potential in potentials:
-            prompt = f"""
-            Determina si estos dos registros son la misma persona:
-            
-            REGISTRO 1:
-            - Nombre: {contact.name}
-            - Email: {contact.email or 'N/A'}
-            - Teléfono: {contact.phone or 'N/A'}
-            
-            REGISTRO 2:
-            - Nombre: {potential.name}
-            - Email: {potential.email or 'N/A'}
-            - Teléfono: {potential.phone or 'N/A'}
-            
-            CRITERIOS:
-            - Email o teléfono idéntico = casi seguro duplicado
-            - Nombre muy similar = probablemente duplicado
-            
-            Responde: "duplicado" o "diferente"
-            """
-            
-            response = await self.ai.generate_response(prompt)
-            if "duplicado" in response.lower():
-                confirmed.append(potential)
+        logger.info(
+            "duplicates_confirmed",
+            pairs=len(pairs),
+            deterministic=deterministic,
+            ai_pairs=len(ambiguous),
+            ai_calls=len(batches),
+            confirmed=len(confirmed)
+        )
         
         return confirmed
     
+    async def _confirm_batch_with_ai(
+        self,
+        batch: List[Tuple[Customer, Customer]],
+        semaphore: asyncio.Semaphore
+    ) -> Set[Tuple[str, str]]:
+        """IA decide en una sola llamada si cada par del lote es duplicado"""
+        records = [
+            {
+                "pair_id": i,
+                "registro_1": _describe(a),
+                "registro_2": _describe(b),
+            }
+            for i, (a, b) in enumerate(batch)
+        ]
+        prompt = f"""
+        Determina, para cada par, si los dos registros son la misma persona.
+        
+        PARES:
+        {json.dumps(records, ensure_ascii=False)}
+        
+        CRITERIOS:
+        - Nombre muy similar con datos de contacto compatibles = probablemente duplicado
+        - Nombres distintos o datos de contacto contradictorios = diferente
+        
+        Responde SOLO con JSON válido:
+        {{"results": [{{"pair_id": 0, "duplicate": true}}]}}
+        """
+        
+        try:
+            async with semaphore:
+                with ai_flow("deduplicator"):
+                    response = await self.ai.generate_response(
+                        prompt,
+                        temperature=0,
+                        max_tokens=20 * len(batch) + 50
+                    )
+            decisions = _parse_batch_response(response)
+        except Exception as e:
+            # Ante la duda no se fusiona nada de este lote
+            logger.error("dedup_ai_batch_error", pairs=len(batch), error=str(e))
+            return set()
+        
+        return {
+            _pair_key(a.id, b.id)
+            for i, (a, b) in enumerate(batch)
+            if decisions.get(i)
+        }
+    
     async def merge_duplicates(
         self,
         primary: Customer,
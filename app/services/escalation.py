@@ -5,6 +5,7 @@ from typing import Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.conversation import Conversation
 from app.models.case import Case, CaseStatus
+from app.services.keywords import HUMAN_REQUEST_KEYWORDS, LEGAL_KEYWORDS
 from app.core.logging import get_logger
 from datetime import datetime
 import enum
@@ -119,19 +120,11 @@ class EscalationService:
     
     def _customer_requests_human(self, message: str) -> bool:
         """Detecta si el cliente pide explícitamente hablar con humano"""
-        keywords = [
-            "hablar con humano", "agente humano", "supervisor",
-            "manager", "representante", "persona real"
-        ]
-        return any(keyword in message.lower() for keyword in keywords)
+        return any(keyword in message.lower() for keyword in HUMAN_REQUEST_KEYWORDS)
     
     def _contains_legal_keywords(self, message: str) -> bool:
         """Detecta temas legales o de compliance"""
-        keywords = [
-            "demanda", "abogado", "legal", "demandar",
-            "regulación", "compliance", "violación"
-        ]
-        return any(keyword in message.lower() for keyword in keywords)
+        return any(keyword in message.lower() for keyword in LEGAL_KEYWORDS)
     
     async def _find_best_agent(
         self,
@@ -6,8 +6,11 @@ from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.models.lead import Lead
+from app.jobs.worker_pool import AsyncWorkerPool
 from app.ai.base import AIAdapter
 from app.ai.factory import AIAdapterFactory
+from app.ai.rate_limit import rate_limiter_for
+from app.ai.usage import ai_flow
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -34,18 +37,26 @@ class FollowUpService:
         """
         # Leads sin respuesta en 24h (Follow-up 1)
         leads_24h = await self._get_silent_leads(hours=24, followup_count=0, db=db)
-        for lead in leads_24h:
-            await self._send_followup_1(lead, db)
+        await self._send_all(leads_24h, self._send_followup_1)
         
         # Leads sin respuesta en 4 días (Follow-up 2)
         leads_4d = await self._get_silent_leads(hours=96, followup_count=1, db=db)
-        for lead in leads_4d:
-            await self._send_followup_2(lead, db)
+        await self._send_all(leads_4d, self._send_followup_2)
         
         # Leads sin respuesta en 7 días (Follow-up 3)
         leads_7d = await self._get_silent_leads(hours=168, followup_count=2, db=db)
-        for lead in leads_7d:
-            await self._send_followup_3(lead, db)
+        await self._send_all(leads_7d, self._send_followup_3)
+    
+    async def _send_all(self, leads: List[Lead], send):
+        """Genera los follow-ups en paralelo, acotado por el límite del proveedor"""
+        async def send_tagged(lead: Lead):
+            with ai_flow("follow_up", lead.id):
+                return await send(lead)
+        
+        pool = AsyncWorkerPool(rate_limiter=rate_limiter_for(self.ai))
+        async for lead, result in pool.map(leads, send_tagged):
+            if isinstance(result, Exception):
+                logger.error("followup_error", lead_id=lead.id, error=str(result))
     
     async def _get_silent_leads(
         self,
@@ -58,7 +69,7 @@ class FollowUpService:
         # TODO: Implementar query real con tracking de follow-ups
         return []
     
-    async def _send_followup_1(self, lead: Lead, db: AsyncSession):
+    async def _send_followup_1(self, lead: Lead):
         """Follow-up 1: Valor agregado"""
         if not self.ai:
             return
@@ -78,7 +89,7 @@ class FollowUpService:
         # TODO: Enviar mensaje real
         logger.info("followup_1_sent", lead_id=lead.id)
     
-    async def _send_followup_2(self, lead: Lead, db: AsyncSession):
+    async def _send_followup_2(self, lead: Lead):
         """Follow-up 2: Urgencia suave"""
         if not self.ai:
             return
@@ -97,7 +108,7 @@ class FollowUpService:
         # TODO: Enviar mensaje real
         logger.info("followup_2_sent", lead_id=lead.id)
     
-    async def _send_followup_3(self, lead: Lead, db: AsyncSession):
+    async def _send_followup_3(self, lead: Lead):
         """Follow-up 3: Última oportunidad"""
         if not self.ai:
             return
@@ -5,12 +5,17 @@ from typing import Optional, Dict, Any, List
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.ai.base import AIAdapter
 from app.ai.factory import AIAdapterFactory
+from app.ai.usage import ai_flow, usage_ledger
 from app.schemas.intent import IntentDetectionRequest, IntentDetectionResult
 from app.models.intent import LeadIntent, IntentType
+from app.services.intent_fast_path import intent_fast_path, INTENT_DETECTIONS
+from app.core.config import settings
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+FLOW_NAME = "intent_detector"
+
 
 class IntentDetector:
     """Detecta la intención de los mensajes"""
@@ -34,20 +39,43 @@ class IntentDetector:
             - secondary_intents: Lista de intenciones secundarias
             - confidence: 0.0 - 1.0
             - entities: Entidades extraídas (productos, fechas, etc)
+        
+        Los mensajes inequívocos se resuelven con el atajo local de
+        palabras clave (sin llamar a la IA) si su confianza supera
+        INTENT_FAST_PATH_MIN_CONFIDENCE. Si el flujo agotó su presupuesto
+        de IA del día basta INTENT_FAST_PATH_BUDGET_MIN_CONFIDENCE (una
+        sola palabra clave), pero los resultados ambiguos siguen yendo al
+        modelo barato.
         """
+        local_result = intent_fast_path.match(request.message)
+        if local_result and local_result.confidence >= self._min_local_confidence():
+            INTENT_DETECTIONS.labels(source="rules").inc()
+            logger.info(
+                "intent_detected_locally",
+                intent=local_result.primary_intent,
+                confidence=local_result.confidence
+            )
+            try:
+                await self.save_intent(request, local_result, db)
+            except Exception as e:
+                logger.error("intent_save_failed", error=str(e))
+            return local_result
+        
+        INTENT_DETECTIONS.labels(source="model").inc()
         prompt = self._build_intent_prompt(request.message, request.context)
         
         # Obtener lista de intenciones válidas
         valid_intents = [intent.value for intent in IntentType]
         
         try:
-            result = await self.ai.detect_intent(
-                prompt=prompt,
-                valid_intents=valid_intents
-            )
+            with ai_flow(FLOW_NAME, request.lead_id):
+                result = await self.ai.detect_intent(
+                    prompt=prompt,
+                    valid_intents=valid_intents
+                )
             
             # Guardar en DB
-            await self._save_intent(request, result, db)
+            await self.save_intent(request, result, db)
             
             return result
         except Exception as e:
@@ -62,6 +90,13 @@ class IntentDetector:
                 error=str(e)
             )
     
+    @staticmethod
+    def _min_local_confidence() -> float:
+        """Umbral del atajo local (más bajo con el presupuesto agotado)"""
+        if usage_ledger.budget_exhausted(FLOW_NAME):
+            return settings.INTENT_FAST_PATH_BUDGET_MIN_CONFIDENCE
+        return settings.INTENT_FAST_PATH_MIN_CONFIDENCE
+    
     def _build_intent_prompt(
         self,
         message: str,
@@ -75,7 +110,7 @@ class IntentDetector:
         {f"CONTEXTO: {context}" if context else ""}
         
         INTENCIONES POSIBLES:
-        {self._format_intents_description()}
+        {self.format_intents_description()}
         
         INSTRUCCIONES:
         1. Identifica la intención PRIMARIA (la más importante)
@@ -97,7 +132,7 @@ class IntentDetector:
         }}
         """
     
-    def _format_intents_description(self) -> str:
+    def format_intents_description(self) -> str:
         """Formatea descripción de intenciones"""
         descriptions = {
             "purchase_inquiry": "Quiere comprar",
@@ -115,7 +150,7 @@ class IntentDetector:
         
         return "\n".join([f"- {intent}: {desc}" for intent, desc in descriptions.items()])
     
-    async def _save_intent(
+    async def save_intent(
         self,
         request: IntentDetectionRequest,
         result: IntentDetectionResult,
@@ -127,7 +162,8 @@ class IntentDetector:
         
         intent = LeadIntent(
             lead_id=request.lead_id,
-            message_id=request.message_id if hasattr(request, 'message_id') else None,
+            message_id=request.message_id,
+            raw_message_id=request.raw_message_id,
             primary_intent=result.primary_intent,
             secondary_intents=result.secondary_intents,
             confidence=result.confidence,
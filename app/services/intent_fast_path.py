@@ -0,0 +1,161 @@
+"""
+Atajo local de detección de intención - FLUJO 3
+
+Un único regex compilado con todas las palabras clave conocidas (las mismas
+tablas de escalamiento, objeciones y comentarios), por palabras completas,
+detecta intenciones obvias sin llamar al modelo. Solo se usa cuando el
+resultado es inequívoco; si no, `IntentDetector` sigue con la IA:
+
+- las palabras clave precedidas de una negación ("no quiero reembolso")
+  se ignoran;
+- una sola palabra clave no alcanza el umbral, hacen falta dos de la misma
+  intención;
+- los mensajes con señales de compra ("quiero hacer mi pedido") siempre
+  van al modelo;
+- igual que una negación, una frase de estado resuelto ("recibí el
+  reembolso", "ya me devolvieron") invierte el sentido de las palabras
+  clave: esos mensajes también van al modelo.
+"""
+import re
+from collections import Counter as HitCounter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+from prometheus_client import Counter
+from app.models.intent import IntentType
+from app.schemas.intent import IntentDetectionResult
+from app.services.keywords import (
+    COMMENT_KEYWORDS, HUMAN_REQUEST_KEYWORDS, OBJECTION_KEYWORDS
+)
+
+INTENT_DETECTIONS = Counter(
+    "intent_detection_total",
+    "Detecciones de intención por origen (rules = atajo local, model = IA)",
+    ["source"]
+)
+
+RULES_MODEL_NAME = "rules"
+
+INTENT_KEYWORDS: Dict[IntentType, List[str]] = {
+    IntentType.SPAM: COMMENT_KEYWORDS["spam"],
+    # Solo los términos legales que implican reclamo ("legal" o "regulación"
+    # también aparecen en preguntas comunes)
+    IntentType.COMPLAINT: COMMENT_KEYWORDS["complaint"] + ["demanda", "demandar", "abogado"],
+    IntentType.SUPPORT_REQUEST: HUMAN_REQUEST_KEYWORDS,
+    IntentType.PRICING_QUESTION: OBJECTION_KEYWORDS["price"] + ["cuánto cuesta", "cuanto cuesta"],
+    IntentType.REFUND_REQUEST: ["reembolso", "devolución", "devolver mi dinero"],
+    IntentType.WARRANTY_CLAIM: ["garantía"],
+    IntentType.DELIVERY_TRACKING: ["mi pedido", "rastreo", "número de guía", "no ha llegado", "no me ha llegado"],
+}
+
+# Señales de compra: el mensaje puede ser una venta y lo decide la IA
+PURCHASE_KEYWORDS: List[str] = [
+    "comprar", "cotizar", "cotización", "adquirir", "ordenar",
+    "hacer mi pedido", "hacer un pedido", "quiero pedir", "unidades",
+]
+
+# Estado resuelto: la palabra clave describe algo que ya pasó ("después de
+# la devolución recibí el reembolso, gracias"), no una solicitud
+RESOLVED_KEYWORDS: List[str] = [
+    "recibí el reembolso", "recibí mi reembolso", "recibi el reembolso", "recibi mi reembolso",
+    "ya me devolvieron", "ya me reembolsaron", "me llegó el reembolso", "ya llegó el reembolso",
+    "ya me llegó", "ya llegó mi pedido", "ya recibí", "ya recibi",
+    "ya se resolvió", "ya quedó resuelto", "ya lo resolvieron",
+]
+
+# Una palabra clave negada ("no quiero reembolso") no cuenta
+NEGATIONS = {"no", "sin", "nunca"}
+NEGATION_WINDOW_WORDS = 3
+_CLAUSE_BREAK = re.compile(r"[.,;:!?¡¿]")
+
+# Una sola palabra clave queda bajo INTENT_FAST_PATH_MIN_CONFIDENCE; con dos
+# o más de la misma intención (corroborada) se resuelve sin IA
+SINGLE_HIT_CONFIDENCE = 0.8
+CORROBORATED_CONFIDENCE = 0.9
+EXTRA_HIT_BONUS = 0.05
+MAX_CONFIDENCE = 0.98
+AMBIGUOUS_CONFIDENCE = 0.6
+
+# Mensajes largos suelen mezclar temas: se penaliza la confianza
+LONG_MESSAGE_WORDS = 30
+LONG_MESSAGE_PENALTY = 0.15
+
+
+def _alternation(keywords: Iterable[str]) -> re.Pattern:
+    """Regex de palabras completas; las más largas primero ("muy caro" antes que prefijos)"""
+    alternatives = sorted(keywords, key=len, reverse=True)
+    return re.compile(r"\b(?:" + "|".join(re.escape(k) for k in alternatives) + r")\b")
+
+
+def is_negated(text: str, start: int) -> bool:
+    """True si hay una negación pocas palabras antes de `start`, en la misma frase"""
+    clause = _CLAUSE_BREAK.split(text[:start])[-1]
+    return any(word in NEGATIONS for word in clause.split()[-NEGATION_WINDOW_WORDS:])
+
+
+class IntentFastPath:
+    """Matcher multi-patrón (un solo regex) sobre las tablas de palabras clave"""
+
+    def __init__(
+        self,
+        intent_keywords: Optional[Dict[IntentType, List[str]]] = None,
+        purchase_keywords: Optional[List[str]] = None,
+        resolved_keywords: Optional[List[str]] = None
+    ):
+        intent_keywords = intent_keywords or INTENT_KEYWORDS
+        self._intent_by_keyword: Dict[str, IntentType] = {}
+        for intent, keywords in intent_keywords.items():
+            for keyword in keywords:
+                self._intent_by_keyword.setdefault(keyword.lower(), intent)
+
+        self._pattern = _alternation(self._intent_by_keyword)
+        self._purchase_pattern = _alternation(
+            k.lower() for k in (purchase_keywords or PURCHASE_KEYWORDS)
+        )
+        self._resolved_pattern = _alternation(
+            k.lower() for k in (resolved_keywords or RESOLVED_KEYWORDS)
+        )
+
+    def match(self, message: str) -> Optional[IntentDetectionResult]:
+        """
+        Intención detectada localmente, o None si no hay coincidencias o el
+        mensaje tiene señales de compra o de un estado ya resuelto.
+        """
+        text = message.lower()
+        if self._purchase_pattern.search(text) or self._resolved_pattern.search(text):
+            return None
+
+        # Palabras clave distintas por intención, sin las negadas
+        keywords_by_intent: Dict[IntentType, Set[str]] = defaultdict(set)
+        for m in self._pattern.finditer(text):
+            if not is_negated(text, m.start()):
+                keyword = m.group(0)
+                keywords_by_intent[self._intent_by_keyword[keyword]].add(keyword)
+        if not keywords_by_intent:
+            return None
+
+        hits = HitCounter({intent: len(kws) for intent, kws in keywords_by_intent.items()})
+        ranked = hits.most_common()
+        primary, primary_hits = ranked[0]
+        if len(ranked) > 1:
+            confidence = AMBIGUOUS_CONFIDENCE
+        elif primary_hits == 1:
+            confidence = SINGLE_HIT_CONFIDENCE
+        else:
+            confidence = min(
+                CORROBORATED_CONFIDENCE + EXTRA_HIT_BONUS * (primary_hits - 2),
+                MAX_CONFIDENCE
+            )
+
+        if len(text.split()) > LONG_MESSAGE_WORDS:
+            confidence -= LONG_MESSAGE_PENALTY
+
+        return IntentDetectionResult(
+            primary_intent=primary.value,
+            secondary_intents=[intent.value for intent, _ in ranked[1:]],
+            confidence=round(confidence, 2),
+            entities={},
+            reasoning="Detectado por palabras clave",
+            ai_model_used=RULES_MODEL_NAME
+        )
+
+
+intent_fast_path = IntentFastPath()
@@ -0,0 +1,35 @@
+"""
+Tablas de palabras clave compartidas
+
+Usadas por el cierre de ventas (objeciones), el escalamiento, la respuesta
+a comentarios y el atajo local de detección de intención.
+"""
+from typing import Dict, List
+
+# FLUJO 11: objeciones de venta
+OBJECTION_KEYWORDS: Dict[str, List[str]] = {
+    "price": ["muy caro", "precio", "costoso", "barato"],
+    "timing": ["no es el momento", "después", "más tarde", "no ahora"],
+    "authority": ["tengo que consultarlo", "mi jefe", "necesito aprobación"],
+    "need": ["no estoy seguro", "no lo necesito", "no sé si"],
+    "trust": ["no los conozco", "confianza", "garantía"],
+}
+
+# FLUJO 7: escalamiento
+HUMAN_REQUEST_KEYWORDS: List[str] = [
+    "hablar con humano", "agente humano", "supervisor",
+    "manager", "representante", "persona real",
+]
+
+LEGAL_KEYWORDS: List[str] = [
+    "demanda", "abogado", "legal", "demandar",
+    "regulación", "compliance", "violación",
+]
+
+# FLUJO 17: tipo de comentario (se evalúan en este orden)
+COMMENT_KEYWORDS: Dict[str, List[str]] = {
+    "spam": ["spam", "scam", "fake"],
+    "question": ["?", "cuánto", "cómo", "dónde"],
+    "complaint": ["malo", "defectuoso", "queja", "reclamo"],
+    "praise": ["excelente", "genial", "gracias", "amor"],
+}
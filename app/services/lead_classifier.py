@@ -5,6 +5,7 @@ from typing import Optional, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.ai.base import AIAdapter
 from app.ai.factory import AIAdapterFactory
+from app.ai.usage import ai_flow
 from app.schemas.lead import LeadClassificationRequest, LeadScore
 from app.models.lead import Lead
 from app.models.classification import LeadClassification
@@ -39,14 +40,15 @@ class LeadClassifier:
         
         try:
             # Llamada a IA
-            response = await self.ai.classify_lead(prompt=prompt)
+            with ai_flow("lead_classifier", request.lead_id):
+                response = await self.ai.classify_lead(prompt=prompt)
             
             # Validar respuesta
             if not (0 <= response.score <= 100):
                 raise ValueError("Score fuera de rango")
             
             # Guardar en DB
-            await self._save_classification(request, response, db)
+            await self.save_classification(request, response, db)
             
             # Log para analytics
             logger.info(
@@ -101,7 +103,7 @@ class LeadClassifier:
         - recommended_action (siguiente acción)
         """
     
-    async def _save_classification(
+    async def save_classification(
         self,
         request: LeadClassificationRequest,
         result: LeadScore,
@@ -135,6 +137,7 @@ class LeadClassifier:
         # Crear registro de clasificación
         classification = LeadClassification(
             lead_id=lead.id,
+            raw_message_id=request.raw_message_id,
             score=result.score,
             category=result.category,
             reasoning=result.reasoning,
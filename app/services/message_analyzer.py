@@ -0,0 +1,221 @@
+"""
+Analizador combinado de mensajes - FLUJOS 2, 3 y 4
+
+Obtiene score de lead, intención y sentimiento con una sola llamada a IA
+(un prompt de instrucciones en lugar de tres) y guarda cada resultado con
+los mismos métodos públicos de los servicios individuales.
+
+Solo lo usan el worker de mensajes (vía `InboundAnalysisPipeline`) y
+`POST /leads/analyze`; los endpoints de cada flujo (clasificar, intención,
+sentimiento) siguen haciendo su propia llamada.
+"""
+from typing import Optional, Set
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.ai.base import AIAdapter
+from app.ai.factory import AIAdapterFactory
+from app.ai.usage import ai_flow
+from app.schemas.analysis import MessageAnalysisRequest, MessageAnalysis, neutral_result
+from app.schemas.lead import LeadClassificationRequest
+from app.schemas.intent import IntentDetectionRequest
+from app.schemas.sentiment import SentimentAnalysisRequest
+from app.models.intent import IntentType, LeadIntent
+from app.models.classification import LeadClassification
+from app.models.sentiment import SentimentAnalysis
+from app.services.lead_classifier import LeadClassifier
+from app.services.intent_detector import IntentDetector
+from app.services.sentiment_analyzer import SentimentAnalyzer
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class MessageAnalyzer:
+    """Clasifica lead, detecta intención y analiza sentimiento en una llamada"""
+
+    def __init__(self, ai_adapter: Optional[AIAdapter] = None):
+        self.ai = ai_adapter or AIAdapterFactory.get_default_adapter()
+        if not self.ai:
+            raise ValueError("No hay adaptador de IA disponible")
+
+        # Reutilizados para persistir con la misma lógica que cada flujo
+        self.classifier = LeadClassifier(self.ai)
+        self.intent_detector = IntentDetector(self.ai)
+        self.sentiment_analyzer = SentimentAnalyzer(self.ai)
+
+    async def analyze(
+        self,
+        request: MessageAnalysisRequest,
+        db: AsyncSession
+    ) -> MessageAnalysis:
+        """
+        Analiza un mensaje y guarda clasificación, intención y sentimiento.
+
+        Si la llamada falla, retorna los resultados neutros de cada flujo.
+        Si solo una sección de la respuesta es inválida, esa sección queda
+        neutra (con `error`) y no se guarda; las demás se guardan igual.
+        """
+        prompt = self._build_prompt(request)
+        valid_intents = [intent.value for intent in IntentType]
+
+        try:
+            with ai_flow("message_analyzer", request.lead_id):
+                analysis = await self.ai.analyze_message(
+                    prompt=prompt,
+                    valid_intents=valid_intents
+                )
+        except Exception as e:
+            logger.error(
+                "message_analysis_failed",
+                lead_id=request.lead_id,
+                error=str(e)
+            )
+            return self._fallback(str(e))
+
+        analysis.lead_score.lead_id = request.lead_id
+        failed = analysis.failed_sections
+        if failed:
+            logger.warning(
+                "message_analysis_sections_failed",
+                lead_id=request.lead_id,
+                sections=failed
+            )
+
+        try:
+            await self._save(request, analysis, db)
+        except Exception as e:
+            # El análisis sigue siendo válido para enrutar aunque no se guarde
+            logger.error("message_analysis_save_failed", lead_id=request.lead_id, error=str(e))
+            await db.rollback()
+
+        logger.info(
+            "message_analyzed",
+            lead_id=request.lead_id,
+            score=analysis.lead_score.score,
+            intent=analysis.intent.primary_intent,
+            sentiment=analysis.sentiment.sentiment,
+            model=self.ai.model_name,
+            processing_time_ms=analysis.processing_time_ms
+        )
+
+        return analysis
+
+    def _build_prompt(self, request: MessageAnalysisRequest) -> str:
+        """Prompt único con las instrucciones de los tres análisis"""
+        metadata = request.sender_metadata
+        return f"""
+        Analiza el siguiente mensaje de un cliente.
+
+        MENSAJE: "{request.message}"
+
+        METADATA:
+        - Nombre: {metadata.get('name', 'Desconocido')}
+        - Interacciones previas: {metadata.get('previous_interactions', 0)}
+        - Fuente: {metadata.get('source', 'Orgánico')}
+        {f"CONTEXTO: {request.context}" if request.context else ""}
+
+        1. LEAD: score 0-100 = urgencia (0-30) + poder de decisión (0-25)
+           + budget aparente (0-25) + fit con producto (0-20);
+           category hot/warm/cold
+        2. INTENT: intención primaria, secundarias, confianza 0-1 y
+           entidades (productos, cantidades, fechas). Opciones:
+        {self.intent_detector.format_intents_description()}
+        3. SENTIMENT: positive/neutral/negative, score -1.0 a +1.0,
+           emociones, urgencia (low/medium/high/critical), churn_risk 0-100
+
+        RESPONDE EN JSON:
+        {{
+          "lead": {{"score": 85, "category": "hot", "reasoning": "...", "recommended_action": "..."}},
+          "intent": {{"primary_intent": "purchase_inquiry", "secondary_intents": [], "confidence": 0.9, "entities": {{}}, "reasoning": "..."}},
+          "sentiment": {{"sentiment": "neutral", "score": 0.1, "confidence": 0.9, "emotions": {{}}, "urgency_level": "low", "churn_risk": 10, "recommended_priority": "normal"}}
+        }}
+        """
+
+    async def _save(
+        self,
+        request: MessageAnalysisRequest,
+        analysis: MessageAnalysis,
+        db: AsyncSession
+    ):
+        """
+        Persiste los tres resultados como lo hacen los flujos individuales.
+
+        Con `raw_message_id` cada resultado se guarda una sola vez: si el
+        worker reprocesa un mensaje (reentrega tras una caída) no se
+        duplican filas ni alertas. Las secciones que fallaron no se guardan
+        (igual que en cada flujo, donde el resultado neutro no se persiste).
+        """
+        saved = await self._saved_results(request.raw_message_id, db)
+        if saved:
+            logger.info(
+                "message_analysis_already_saved",
+                raw_message_id=request.raw_message_id,
+                results=sorted(saved)
+            )
+        skip = saved | set(analysis.failed_sections)
+
+        if "classification" not in skip:
+            await self.classifier.save_classification(
+                LeadClassificationRequest(
+                    message=request.message,
+                    sender_metadata=request.sender_metadata,
+                    lead_id=request.lead_id,
+                    raw_message_id=request.raw_message_id
+                ),
+                analysis.lead_score,
+                db
+            )
+        if "intent" not in skip:
+            await self.intent_detector.save_intent(
+                IntentDetectionRequest(
+                    message=request.message,
+                    context=request.context,
+                    lead_id=request.lead_id,
+                    message_id=request.message_id,
+                    raw_message_id=request.raw_message_id
+                ),
+                analysis.intent,
+                db
+            )
+        if "sentiment" not in skip:
+            await self.sentiment_analyzer.save_sentiment(
+                SentimentAnalysisRequest(
+                    message=request.message,
+                    conversation_id=request.conversation_id,
+                    message_id=request.message_id,
+                    raw_message_id=request.raw_message_id
+                ),
+                analysis.sentiment,
+                db
+            )
+
+            if analysis.sentiment.score < -0.7:
+                await self.sentiment_analyzer.trigger_escalation_alert(analysis.sentiment, db)
+
+    async def _saved_results(self, raw_message_id: Optional[str], db: AsyncSession) -> Set[str]:
+        """Resultados que ya están guardados para el mensaje raw"""
+        if not raw_message_id:
+            return set()
+
+        saved = set()
+        for name, model in (
+            ("classification", LeadClassification),
+            ("intent", LeadIntent),
+            ("sentiment", SentimentAnalysis),
+        ):
+            result = await db.execute(
+                select(model.id).where(model.raw_message_id == raw_message_id).limit(1)
+            )
+            if result.scalar_one_or_none() is not None:
+                saved.add(name)
+        return saved
+
+    def _fallback(self, error: str) -> MessageAnalysis:
+        """Resultados neutros (mismos valores que cada flujo por separado)"""
+        return MessageAnalysis(
+            lead_score=neutral_result("classification", error),
+            intent=neutral_result("intent", error),
+            sentiment=neutral_result("sentiment", error),
+            error=error
+        )
+
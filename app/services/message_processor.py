@@ -2,8 +2,10 @@
 Procesador de mensajes - FLUJO 1
 """
 from typing import Optional
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.message import RawMessage, MessageChannel
+from app.services.analysis_pipeline import InboundAnalysisPipeline
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -17,18 +19,32 @@ class MessageProcessor:
         message_id: str,
         channel: str,
         db: AsyncSession
-    ) -> None:
+    ) -> bool:
         """
         Procesa un mensaje raw.
         
-        Este método se ejecuta en background después de recibir el webhook.
+        Este método lo ejecuta el worker de la cola de mensajes:
+        análisis combinado (lead, intención, sentimiento) y luego enrutamiento.
+        
+        Retorna False si no había nada que procesar (mensaje inexistente o ya
+        procesado por una entrega anterior); el worker confirma la entrada
+        igual. Si el procesamiento falla se registra `processing_error` y se
+        relanza la excepción, para que el worker no confirme la entrada.
         """
         try:
             # Obtener mensaje raw
-            raw_message = await db.get(RawMessage, message_id)
+            raw_message = await MessageProcessor._get_raw_message(message_id, db)
             if not raw_message:
                 logger.error("raw_message_not_found", message_id=message_id)
-                return
+                return False
+            
+            # Reentrega de un mensaje que ya se procesó
+            if raw_message.processed:
+                logger.info("message_already_processed", message_id=message_id)
+                return False
+            
+            # Clasificación + intención + sentimiento (una llamada) -> enrutamiento
+            result = await InboundAnalysisPipeline().run(raw_message, db)
             
             # Marcar como procesado
             raw_message.processed = True
@@ -37,14 +53,12 @@ class MessageProcessor:
             logger.info(
                 "message_processed",
                 message_id=message_id,
-                channel=channel
+                channel=channel,
+                lead_id=result.lead_id,
+                destination=result.routing.destination,
+                latencies_ms=result.latencies_ms
             )
-            
-            # Aquí se dispararían los siguientes pasos:
-            # 1. Clasificación de lead
-            # 2. Detección de intención
-            # 3. Análisis de sentimiento
-            # 4. Enrutamiento
+            return True
             
         except Exception as e:
             logger.error(
@@ -52,12 +66,23 @@ class MessageProcessor:
                 message_id=message_id,
                 error=str(e)
             )
-            # Marcar error en el mensaje
+            # Marcar error en el mensaje (la transacción fallida se descarta)
             try:
-                raw_message = await db.get(RawMessage, message_id)
+                await db.rollback()
+                raw_message = await MessageProcessor._get_raw_message(message_id, db)
                 if raw_message:
                     raw_message.processing_error = str(e)
                     await db.commit()
-            except:
+            except Exception:
                 pass  # Si falla, al menos logueamos el error
-
+            # Sin confirmar: la entrada queda pendiente y se reintenta
+            raise
+    
+    @staticmethod
+    async def _get_raw_message(message_id: str, db: AsyncSession) -> Optional[RawMessage]:
+        """
+        Mensaje raw por id. La clave primaria es (id, received_at) por el
+        particionado, así que se busca por id en todas las particiones.
+        """
+        result = await db.execute(select(RawMessage).where(RawMessage.id == message_id))
+        return result.scalar_one_or_none()
@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.lead import Lead
 from app.ai.base import AIAdapter
 from app.ai.factory import AIAdapterFactory
+from app.ai.usage import ai_flow
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -120,25 +121,29 @@ class ColdToWarmCampaign:
         TONO: Experto pero accesible
         """
         
-        return await self.ai.generate_response(prompt)
+        with ai_flow("nurturing", lead.id):
+            return await self.ai.generate_response(prompt)
     
     async def _generate_case_study(self, lead: Lead) -> str:
         """Genera caso de éxito"""
         if not self.ai:
             return ""
-        return await self.ai.generate_response(f"Genera caso de éxito relevante para {lead.name}")
+        with ai_flow("nurturing", lead.id):
+            return await self.ai.generate_response(f"Genera caso de éxito relevante para {lead.name}")
     
     async def _generate_comparison(self, lead: Lead) -> str:
         """Genera comparativa"""
         if not self.ai:
             return ""
-        return await self.ai.generate_response(f"Genera comparativa de soluciones para {lead.name}")
+        with ai_flow("nurturing", lead.id):
+            return await self.ai.generate_response(f"Genera comparativa de soluciones para {lead.name}")
     
     async def _generate_offer(self, lead: Lead) -> str:
         """Genera oferta especial"""
         if not self.ai:
             return ""
-        return await self.ai.generate_response(f"Genera oferta especial para {lead.name}")
+        with ai_flow("nurturing", lead.id):
+            return await self.ai.generate_response(f"Genera oferta especial para {lead.name}")
 
 
 class ProductEducationCampaign:
@@ -152,5 +157,6 @@ class ProductEducationCampaign:
         """Genera contenido educativo"""
         if not self.ai:
             return None
-        return await self.ai.generate_response(f"Genera contenido educativo sobre productos para {lead.name}")
+        with ai_flow("nurturing", lead.id):
+            return await self.ai.generate_response(f"Genera contenido educativo sobre productos para {lead.name}")
 
@@ -0,0 +1,52 @@
+"""
+Mantenimiento de tablas particionadas (raw_messages, messages)
+
+Job diario: crea las particiones de los próximos meses y elimina las que
+quedaron fuera de la retención (DETACH + DROP, sin DELETE masivo). También
+purga `raw_message_ids`, que solo necesita cubrir la ventana de reintentos
+de Meta.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.partitions import MESSAGES, RAW_MESSAGES, drop_expired_partitions, ensure_partitions
+from app.models.message import RawMessageId
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class PartitionMaintenance:
+    """Crea particiones futuras y elimina las vencidas"""
+    
+    async def run(self, db: AsyncSession) -> Dict[str, Any]:
+        """
+        Retención 0 = las particiones de esa tabla no se eliminan nunca.
+        """
+        created, dropped = [], []
+        for table, retention_months in (
+            (RAW_MESSAGES, settings.RAW_MESSAGES_RETENTION_MONTHS),
+            (MESSAGES, settings.MESSAGES_RETENTION_MONTHS),
+        ):
+            created += await ensure_partitions(db, table, settings.PARTITION_MONTHS_AHEAD)
+            if retention_months:
+                dropped += await drop_expired_partitions(db, table, retention_months)
+        
+        purged = await self._purge_message_ids(db)
+        
+        logger.info(
+            "partition_maintenance_completed",
+            created=created,
+            dropped=dropped,
+            message_ids_purged=purged
+        )
+        return {"created": created, "dropped": dropped, "message_ids_purged": purged}
+    
+    async def _purge_message_ids(self, db: AsyncSession) -> int:
+        """Ids de proveedor más antiguos que la ventana de idempotencia"""
+        cutoff = datetime.utcnow() - timedelta(days=settings.RAW_MESSAGE_IDS_RETENTION_DAYS)
+        result = await db.execute(delete(RawMessageId).where(RawMessageId.received_at < cutoff))
+        await db.commit()
+        return result.rowcount
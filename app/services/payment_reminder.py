@@ -2,11 +2,17 @@
 FLUJO 13: Recordatorios de Pago
 """
 from datetime import datetime, timedelta
+from typing import Callable, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, Select
 from app.models.invoice import Invoice
+from app.db.streaming import keyset_iter
+from app.db.bulk import BulkUpdate
+from app.jobs.worker_pool import AsyncWorkerPool
 from app.ai.base import AIAdapter
 from app.ai.factory import AIAdapterFactory
+from app.ai.rate_limit import rate_limiter_for
+from app.ai.usage import ai_flow
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -26,52 +32,91 @@ class PaymentReminderService:
     def __init__(self, ai_adapter: Optional[AIAdapter] = None):
         self.ai = ai_adapter or AIAdapterFactory.get_default_adapter()
     
+    # Consultas del job (usan ix_invoices_status_due_date)
+    
+    @staticmethod
+    def upcoming_invoices_query(now: datetime) -> Select:
+        """Facturas pendientes que vencen en los próximos 7 días"""
+        return select(Invoice).where(
+            Invoice.status == "pending",
+            Invoice.due_date <= now + timedelta(days=7),
+            Invoice.due_date > now
+        )
+    
+    @staticmethod
+    def recently_overdue_invoices_query(now: datetime) -> Select:
+        """Facturas pendientes vencidas hace menos de 1 día"""
+        return select(Invoice).where(
+            Invoice.status == "pending",
+            Invoice.due_date < now,
+            Invoice.due_date >= now - timedelta(days=1)
+        )
+    
+    @staticmethod
+    def long_overdue_invoices_query(now: datetime) -> Select:
+        """Facturas pendientes vencidas hace 7+ días"""
+        return select(Invoice).where(
+            Invoice.status == "pending",
+            Invoice.due_date < now - timedelta(days=7)
+        )
+    
     async def send_reminders(self, db: AsyncSession):
         """Job diario para enviar recordatorios"""
         
+        now = datetime.utcnow()
+        keys = (Invoice.due_date, Invoice.id)
+        
         # Facturas próximas a vencer (7 días)
-        upcoming_date = datetime.utcnow() + timedelta(days=7)
-        stmt = select(Invoice).where(
-            Invoice.status == "pending",
-            Invoice.due_date <= upcoming_date,
-            Invoice.due_date > datetime.utcnow()
+        await self._send_batch(
+            keyset_iter(db, self.upcoming_invoices_query(now), keys),
+            self._send_friendly_reminder,
+            "payment_reminder_friendly_sent",
+            db
         )
-        result = await db.execute(stmt)
-        upcoming = result.scalars().all()
-        
-        for invoice in upcoming:
-            if invoice.reminder_count == 0:
-                await self._send_friendly_reminder(invoice, db)
         
         # Facturas vencidas (1 día)
-        overdue_1d = datetime.utcnow() - timedelta(days=1)
-        stmt = select(Invoice).where(
-            Invoice.status == "pending",
-            Invoice.due_date < datetime.utcnow(),
-            Invoice.due_date >= overdue_1d
+        await self._send_batch(
+            keyset_iter(db, self.recently_overdue_invoices_query(now), keys),
+            self._send_polite_overdue_reminder,
+            "payment_reminder_overdue_sent",
+            db
         )
-        result = await db.execute(stmt)
-        overdue_recent = result.scalars().all()
-        
-        for invoice in overdue_recent:
-            await self._send_polite_overdue_reminder(invoice, db)
         
         # Facturas muy vencidas (7+ días)
-        overdue_7d = datetime.utcnow() - timedelta(days=7)
-        stmt = select(Invoice).where(
-            Invoice.status == "pending",
-            Invoice.due_date < overdue_7d
-        )
-        result = await db.execute(stmt)
-        overdue_old = result.scalars().all()
-        
-        for invoice in overdue_old:
+        async for invoice in keyset_iter(db, self.long_overdue_invoices_query(now), keys):
             await self._escalate_overdue_invoice(invoice, db)
     
-    async def _send_friendly_reminder(self, invoice: Invoice, db: AsyncSession):
+    async def _send_batch(self, invoices, send: Callable, event: str, db: AsyncSession):
+        """
+        Genera los recordatorios en paralelo (acotado por proveedor) y
+        registra cada envío con UPDATEs agrupados (solo los enviados).
+        """
+        pool = AsyncWorkerPool(rate_limiter=rate_limiter_for(self.ai))
+        reminders = BulkUpdate(db, Invoice, {
+            "sent": {"reminder_count": Invoice.reminder_count + 1},
+        })
+        
+        async def send_tagged(invoice: Invoice) -> bool:
+            with ai_flow("payment_reminder", invoice.id):
+                return await send(invoice)
+        
+        async for invoice, sent in pool.map(invoices, send_tagged):
+            if isinstance(sent, Exception):
+                logger.error("payment_reminder_error", invoice_id=invoice.id, error=str(sent))
+                continue
+            if not sent:
+                continue
+            
+            await reminders.add("sent", invoice.id)
+            
+            logger.info(event, invoice_id=invoice.id)
+        
+        await reminders.flush()
+    
+    async def _send_friendly_reminder(self, invoice: Invoice) -> bool:
         """Recordatorio 7 días antes de vencimiento"""
-        if not self.ai:
-            return
+        if not self.ai or invoice.reminder_count > 0:
+            return False
         
         message = await self.ai.generate_response(
             f"""
@@ -93,15 +138,12 @@ class PaymentReminderService:
         )
         
         # TODO: Enviar mensaje real
-        invoice.reminder_count += 1
-        await db.commit()
-        
-        logger.info("payment_reminder_friendly_sent", invoice_id=invoice.id)
+        return True
     
-    async def _send_polite_overdue_reminder(self, invoice: Invoice, db: AsyncSession):
+    async def _send_polite_overdue_reminder(self, invoice: Invoice) -> bool:
         """Recordatorio cortés para facturas vencidas recientemente"""
         if not self.ai:
-            return
+            return False
         
         message = await self.ai.generate_response(
             f"""
@@ -122,10 +164,7 @@ class PaymentReminderService:
         )
         
         # TODO: Enviar mensaje y notificar equipo de finanzas
-        invoice.reminder_count += 1
-        await db.commit()
-        
-        logger.info("payment_reminder_overdue_sent", invoice_id=invoice.id)
+        return True
     
     async def _escalate_overdue_invoice(self, invoice: Invoice, db: AsyncSession):
         """Escala facturas muy vencidas"""
@@ -5,6 +5,7 @@ from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.ai.base import AIAdapter
 from app.ai.factory import AIAdapterFactory
+from app.ai.usage import ai_flow
 from app.schemas.sentiment import SentimentAnalysisRequest, SentimentResult
 from app.models.sentiment import SentimentAnalysis
 from app.core.logging import get_logger
@@ -38,14 +39,15 @@ class SentimentAnalyzer:
         prompt = self._build_sentiment_prompt(request.message)
         
         try:
-            result = await self.ai.analyze_sentiment(prompt)
+            with ai_flow("sentiment_analyzer", request.conversation_id):
+                result = await self.ai.analyze_sentiment(prompt)
             
             # Guardar en DB
-            await self._save_sentiment(request, result, db)
+            await self.save_sentiment(request, result, db)
             
             # Si es muy negativo, disparar alerta
             if result.score < -0.7:
-                await self._trigger_escalation_alert(result, db)
+                await self.trigger_escalation_alert(result, db)
             
             return result
         except Exception as e:
@@ -90,7 +92,7 @@ class SentimentAnalyzer:
         }}
         """
     
-    async def _save_sentiment(
+    async def save_sentiment(
         self,
         request: SentimentAnalysisRequest,
         result: SentimentResult,
@@ -99,6 +101,7 @@ class SentimentAnalyzer:
         """Guarda el análisis de sentimiento en la base de datos"""
         sentiment = SentimentAnalysis(
             message_id=request.message_id,
+            raw_message_id=request.raw_message_id,
             conversation_id=request.conversation_id,
             sentiment=result.sentiment,
             score=result.score,
@@ -111,7 +114,7 @@ class SentimentAnalyzer:
         db.add(sentiment)
         await db.commit()
     
-    async def _trigger_escalation_alert(
+    async def trigger_escalation_alert(
         self,
         result: SentimentResult,
         db: AsyncSession
@@ -0,0 +1,88 @@
+"""
+Idempotencia de webhooks de Meta - FLUJO 1
+
+Meta reintenta la entrega cuando el webhook tarda en responder. Cada
+mensaje trae su id del proveedor (`wamid` en WhatsApp, `mid` en
+Instagram/Messenger):
+
+- Primer filtro: SET NX con TTL en Redis; una entrega repetida se
+  responde sin tocar Postgres ni el pipeline.
+- Respaldo: clave primaria (channel, provider_message_id) en
+  raw_message_ids, por si la clave expiró o Redis no estaba disponible.
+"""
+from typing import List, Optional
+import redis.asyncio as redis
+from prometheus_client import Counter
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+WEBHOOK_DUPLICATES = Counter(
+    "webhook_duplicates_suppressed_total",
+    "Entregas repetidas de webhooks descartadas (layer = redis | database)",
+    ["channel", "layer"]
+)
+
+REDIS_KEY_PREFIX = "webhook:seen:"
+
+
+class WebhookIdempotency:
+    """Registro de ids de mensajes del proveedor ya recibidos"""
+
+    def __init__(self, redis_url: Optional[str] = None, ttl_seconds: Optional[int] = None):
+        self.redis_url = redis_url or settings.REDIS_URL
+        self.ttl_seconds = ttl_seconds or settings.WEBHOOK_IDEMPOTENCY_TTL_SECONDS
+        self._client: Optional[redis.Redis] = None
+
+    @property
+    def client(self) -> redis.Redis:
+        """Cliente Redis (se crea al primer uso)"""
+        if self._client is None:
+            self._client = redis.from_url(self.redis_url, decode_responses=True)
+        return self._client
+
+    async def close(self):
+        """Cierra la conexión a Redis"""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    async def claim(self, channel: str, provider_message_ids: List[str]) -> List[str]:
+        """
+        Ids recibidos por primera vez (un solo round-trip para todo el lote).
+
+        Si Redis falla se dejan pasar todos: la tabla raw_message_ids
+        sigue descartando los duplicados.
+        """
+        if not provider_message_ids:
+            return []
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for provider_message_id in provider_message_ids:
+                    pipe.set(self._key(channel, provider_message_id), "1", nx=True, ex=self.ttl_seconds)
+                results = await pipe.execute()
+        except Exception as e:
+            logger.warning("webhook_idempotency_redis_error", operation="claim", error=str(e))
+            return list(provider_message_ids)
+
+        claimed = [i for i, ok in zip(provider_message_ids, results) if ok]
+        duplicates = len(provider_message_ids) - len(claimed)
+        if duplicates:
+            WEBHOOK_DUPLICATES.labels(channel=channel, layer="redis").inc(duplicates)
+        return claimed
+
+    async def release(self, channel: str, provider_message_ids: List[str]):
+        """Libera las claves de mensajes que no llegaron a guardarse (el reintento debe pasar)"""
+        if not provider_message_ids:
+            return
+        try:
+            await self.client.delete(*(self._key(channel, i) for i in provider_message_ids))
+        except Exception as e:
+            logger.warning("webhook_idempotency_redis_error", operation="release", error=str(e))
+
+    def _key(self, channel: str, provider_message_id: str) -> str:
+        return f"{REDIS_KEY_PREFIX}{channel}:{provider_message_id}"
+
+
+webhook_idempotency = WebhookIdempotency()
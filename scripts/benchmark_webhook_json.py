@@ -0,0 +1,133 @@
+"""
+Benchmark: intake del webhook con json/pydantic vs orjson
+
+Compara el camino anterior (body parseado por FastAPI como Dict, validado
+con `InboundWebhook(**payload)`, columna JSON serializada con json y
+respuesta con JSONResponse) con el actual (`InboundWebhook.from_json`,
+columna JSON serializada con orjson y ORJSONResponse).
+
+Las dos rutas guardan lo mismo que producción: una entrega con un único
+mensaje guarda el payload completo (en la actual, los bytes originales);
+con varios, cada fila serializa el payload de su mensaje.
+
+Las dos rutas corren sobre la app ASGI en proceso (httpx.ASGITransport) y
+omiten Postgres y Redis para medir solo el costo de JSON + framework.
+
+Uso:
+    python scripts/benchmark_webhook_json.py --requests 2000 --messages 20
+"""
+import argparse
+import asyncio
+import json as std_json
+import os
+import random
+import sys
+import time
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, ORJSONResponse
+from app.core import json
+from app.schemas.webhook import InboundWebhook, WebhookResponse
+
+stored = []
+
+
+def build_payload(messages: int) -> bytes:
+    """Entrega de WhatsApp con `messages` mensajes de texto"""
+    random.seed(42)
+    return std_json.dumps({
+        "object": "whatsapp_business_account",
+        "entry": [{
+            "id": "1029384756",
+            "changes": [{
+                "field": "messages",
+                "value": {
+                    "messaging_product": "whatsapp",
+                    "metadata": {"display_phone_number": "50760000000", "phone_number_id": "1122"},
+                    "contacts": [{"profile": {"name": f"Cliente {i}"}, "wa_id": f"5076{i:07d}"} for i in range(messages)],
+                    "messages": [
+                        {
+                            "id": f"wamid.{random.getrandbits(64):x}",
+                            "from": f"5076{i:07d}",
+                            "timestamp": "1717000000",
+                            "type": "text",
+                            "text": {"body": "Hola, ¿cuánto cuesta el envío a David? " * 3}
+                        }
+                        for i in range(messages)
+                    ]
+                }
+            }]
+        }]
+    }).encode()
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/before", response_model=WebhookResponse, response_class=JSONResponse)
+    async def before(payload: Dict[str, Any]):
+        webhook = InboundWebhook(**payload)
+        messages = webhook.extract_messages()
+        # Serializador por defecto de SQLAlchemy para columnas JSON
+        single = len(messages) == 1
+        stored.extend(std_json.dumps(payload if single else m.payload) for m in messages)
+        return WebhookResponse(status="received", message_ids=[str(i) for i in range(len(messages))])
+
+    @app.post("/after", response_model=WebhookResponse, response_class=ORJSONResponse)
+    async def after(request: Request):
+        body = await request.body()
+        webhook = InboundWebhook.from_json(body)
+        messages = webhook.extract_messages()
+        # Serializador de los engines (app.core.json), como en _insert_raw_messages
+        whole_payload = json.RawJSON(body.decode()) if len(messages) == 1 else None
+        stored.extend(
+            json.dumps(whole_payload if whole_payload is not None else m.payload)
+            for m in messages
+        )
+        return WebhookResponse(status="received", message_ids=[str(i) for i in range(len(messages))])
+
+    return app
+
+
+async def run(client: httpx.AsyncClient, path: str, body: bytes, requests: int):
+    headers = {"Content-Type": "application/json"}
+    for _ in range(min(100, requests)):
+        await client.post(path, content=body, headers=headers)
+
+    stored.clear()
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    for _ in range(requests):
+        response = await client.post(path, content=body, headers=headers)
+        response.raise_for_status()
+    return time.perf_counter() - wall, time.process_time() - cpu
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=20)
+    args = parser.parse_args()
+
+    body = build_payload(args.messages)
+    transport = httpx.ASGITransport(app=build_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        results = {path: await run(client, path, body, args.requests) for path in ("/before", "/after")}
+
+    print(f"Requests:              {args.requests}")
+    print(f"Mensajes por payload:  {args.messages}  ({len(body) / 1024:.1f} KiB)")
+    for label, path in (("json + pydantic", "/before"), ("orjson", "/after")):
+        wall, cpu = results[path]
+        print(
+            f"{label:<22} {args.requests / wall:>8,.0f} req/s   "
+            f"{cpu / args.requests * 1e6:>7,.0f} µs CPU/request"
+        )
+    print(f"Speedup (req/s):       {results['/before'][0] / results['/after'][0]:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,7 +3,8 @@ Script para inicializar la base de datos
 """
 import asyncio
 from sqlalchemy import text
-from app.db.session import async_engine
+from app.db.session import async_engine, AsyncSessionLocal
+from app.services.partition_maintenance import PartitionMaintenance
 from app.core.logging import configure_logging
 
 configure_logging()
@@ -16,7 +17,11 @@ async def init_db():
     
     async with async_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
-        print("✅ Base de datos inicializada correctamente")
+    
+    # Las tablas particionadas necesitan sus particiones antes del primer INSERT
+    async with AsyncSessionLocal() as db:
+        await PartitionMaintenance().run(db)
+    print("✅ Base de datos inicializada correctamente")
 
 
 if __name__ == "__main__":
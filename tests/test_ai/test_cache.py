@@ -0,0 +1,123 @@
+"""
+Tests del caché de respuestas de IA
+"""
+import pytest
+from app.ai.base import AIAdapter
+from app.ai.cache import CachedAIAdapter, LRUCache
+from app.ai.usage import usage_ledger
+from app.schemas.sentiment import SentimentResult
+
+
+class CountingAdapter(AIAdapter):
+    """Adaptador de prueba que cuenta llamadas al proveedor"""
+
+    def __init__(self, message_json=None):
+        self.calls = 0
+        self.message_json = message_json or {}
+
+    @property
+    def model_name(self) -> str:
+        return "test-model"
+
+    async def classify_lead(self, prompt, response_format=None):
+        raise NotImplementedError
+
+    async def detect_intent(self, prompt, valid_intents=None):
+        raise NotImplementedError
+
+    async def analyze_sentiment(self, prompt):
+        self.calls += 1
+        return SentimentResult(sentiment="positive", score=0.8, confidence=0.9)
+
+    async def analyze_message(self, prompt, valid_intents=None):
+        self.calls += 1
+        return self._build_message_analysis(self.message_json)
+
+    async def chat(self, messages, temperature=0.7, max_tokens=500):
+        self.calls += 1
+        return "hola"
+
+    async def generate_response(self, prompt, **kwargs):
+        self.calls += 1
+        return f"respuesta {self.calls}"
+
+    async def embed(self, texts):
+        # "Gracias!!" y "gracias" caen en el mismo vector
+        return [[1.0, 0.0] if "gracias" in t.lower() else [0.0, 1.0] for t in texts]
+
+
+@pytest.mark.asyncio
+async def test_exact_tier_ignores_whitespace_and_keys_on_params():
+    inner = CountingAdapter()
+    cached = CachedAIAdapter(inner, redis_url="", semantic=False, cache_generate=True)
+
+    first = await cached.generate_response("Genera   hashtags\n para X", temperature=0.7)
+    second = await cached.generate_response("Genera hashtags para X", temperature=0.7)
+    third = await cached.generate_response("Genera hashtags para X", temperature=0.2)
+
+    assert first == second
+    assert third != first
+    assert inner.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_generate_response_not_cached_by_default():
+    inner = CountingAdapter()
+    cached = CachedAIAdapter(inner, redis_url="", semantic=False)
+
+    first = await cached.generate_response("Genera hashtags para X")
+    second = await cached.generate_response("Genera hashtags para X")
+
+    assert first != second
+    assert inner.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_budget_fallback_model_gets_its_own_entry(monkeypatch):
+    inner = CountingAdapter()
+    cached = CachedAIAdapter(inner, redis_url="", semantic=False)
+
+    await cached.analyze_sentiment("Excelente servicio")
+    monkeypatch.setattr(usage_ledger, "fallback_model", lambda provider: "cheap-model")
+    await cached.analyze_sentiment("Excelente servicio")
+    await cached.analyze_sentiment("Excelente servicio")
+
+    assert inner.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_semantic_tier_reuses_near_identical_prompts():
+    inner = CountingAdapter()
+    cached = CachedAIAdapter(inner, redis_url="", semantic=True)
+
+    first = await cached.analyze_sentiment("Muchas gracias!")
+    second = await cached.analyze_sentiment("muchas GRACIAS")
+
+    assert second == first
+    assert inner.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_analysis_with_invalid_section_is_not_cached():
+    inner = CountingAdapter({
+        "lead": {"score": 80, "category": "hot"},
+        "intent": {"primary_intent": "purchase_inquiry", "confidence": 0.9},
+    })
+    cached = CachedAIAdapter(inner, redis_url="", semantic=False)
+
+    first = await cached.analyze_message("Quiero 10 unidades")
+    await cached.analyze_message("Quiero 10 unidades")
+
+    assert list(first.failed_sections) == ["sentiment"]
+    assert inner.calls == 2
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(max_entries=2, ttl_seconds=60)
+    lru.set("a", "1")
+    lru.set("b", "2")
+    lru.get("a")
+    lru.set("c", "3")
+
+    assert lru.get("b") is None
+    assert lru.get("a") == "1"
@@ -0,0 +1,67 @@
+"""
+Tests del parseo por sección del análisis combinado
+"""
+from app.ai.base import AIAdapter
+
+
+class ParsingAdapter(AIAdapter):
+    """Adaptador de prueba: solo se usa su parseo de la respuesta combinada"""
+
+    @property
+    def model_name(self) -> str:
+        return "test-model"
+
+    async def classify_lead(self, prompt, response_format=None):
+        raise NotImplementedError
+
+    async def detect_intent(self, prompt, valid_intents=None):
+        raise NotImplementedError
+
+    async def analyze_sentiment(self, prompt):
+        raise NotImplementedError
+
+    async def analyze_message(self, prompt, valid_intents=None):
+        raise NotImplementedError
+
+    async def chat(self, messages, temperature=0.7, max_tokens=500):
+        raise NotImplementedError
+
+    async def generate_response(self, prompt, **kwargs):
+        raise NotImplementedError
+
+
+VALID = {
+    "lead": {"score": 85, "category": "hot", "reasoning": "", "recommended_action": "call"},
+    "intent": {"primary_intent": "purchase_inquiry", "confidence": 0.9},
+    "sentiment": {"sentiment": "positive", "score": 0.7, "confidence": 0.8},
+}
+
+
+def test_valid_response_has_no_failed_sections():
+    analysis = ParsingAdapter()._build_message_analysis(VALID, processing_time_ms=120)
+
+    assert analysis.failed_sections == {}
+    assert analysis.lead_score.score == 85
+    assert analysis.lead_score.processing_time_ms == 120
+    assert analysis.intent.primary_intent == "purchase_inquiry"
+    assert analysis.sentiment.sentiment == "positive"
+
+
+def test_invalid_section_falls_back_alone():
+    response = dict(VALID, intent={"primary_intent": "purchase_inquiry", "confidence": 7})
+
+    analysis = ParsingAdapter()._build_message_analysis(response)
+
+    assert list(analysis.failed_sections) == ["intent"]
+    assert analysis.intent.primary_intent == "general_inquiry"
+    assert analysis.lead_score.score == 85
+    assert analysis.lead_score.error is None
+    assert analysis.sentiment.sentiment == "positive"
+
+
+def test_missing_sections_fall_back():
+    analysis = ParsingAdapter()._build_message_analysis({"lead": VALID["lead"], "sentiment": "?"})
+
+    assert sorted(analysis.failed_sections) == ["intent", "sentiment"]
+    assert analysis.error is None
+    assert analysis.lead_score.error is None
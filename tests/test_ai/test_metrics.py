@@ -0,0 +1,142 @@
+"""
+Tests de métricas de llamadas a proveedores de IA
+"""
+from contextlib import aclosing
+import pytest
+from prometheus_client import REGISTRY
+from app.ai.base import AIAdapter
+from app.core.config import settings
+
+
+class Usage:
+    prompt_tokens = 12
+    completion_tokens = 30
+
+
+class Response:
+    usage = Usage()
+
+
+class ProviderStream:
+    """Stream de prueba que registra si se cerró, como AsyncStream del SDK"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def close(self):
+        self.closed = True
+
+
+class MeteredAdapter(AIAdapter):
+    """Adaptador de prueba que reporta tokens como OpenAI"""
+
+    provider_name = "test"
+
+    def __init__(self):
+        self.streams = []
+
+    @property
+    def model_name(self) -> str:
+        return "metered-model"
+
+    def _token_usage(self, response):
+        return response.usage.prompt_tokens, response.usage.completion_tokens
+
+    async def classify_lead(self, prompt, response_format=None):
+        raise NotImplementedError
+
+    async def detect_intent(self, prompt, valid_intents=None):
+        raise NotImplementedError
+
+    async def analyze_sentiment(self, prompt):
+        raise NotImplementedError
+
+    async def analyze_message(self, prompt, valid_intents=None):
+        raise NotImplementedError
+
+    async def chat(self, messages, temperature=0.7, max_tokens=500):
+        raise NotImplementedError
+
+    async def generate_response(self, prompt, **kwargs):
+        return await self._observed("generate_response", self._provider_call, prompt=prompt)
+
+    async def chat_stream(self, messages, temperature=0.7, max_tokens=500):
+        async with aclosing(self._observed_stream(
+            "chat", self._stream_call, lambda chunk: chunk, messages, chunks=["", "Ho", "la"]
+        )) as stream:
+            async for text in stream:
+                yield text
+
+    async def _stream_call(self, chunks):
+        stream = ProviderStream(chunks)
+        self.streams.append(stream)
+        return stream
+
+    async def _provider_call(self, prompt):
+        if prompt == "fail":
+            raise RuntimeError("provider down")
+        return Response()
+
+
+def _sample(name, **labels):
+    labels = {"provider": "test", "model": "metered-model", "method": "generate_response", **labels}
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.asyncio
+async def test_observed_call_records_latency_tokens_and_errors(monkeypatch):
+    monkeypatch.setattr(settings, "AI_USAGE_ENABLED", False)
+    adapter = MeteredAdapter()
+    before_ok = _sample("ai_requests_total", status="success")
+    before_error = _sample("ai_requests_total", status="error")
+    before_prompt = _sample("ai_tokens_total", kind="prompt")
+
+    await adapter.generate_response("hola")
+    with pytest.raises(RuntimeError):
+        await adapter.generate_response("fail")
+
+    assert _sample("ai_requests_total", status="success") == before_ok + 1
+    assert _sample("ai_requests_total", status="error") == before_error + 1
+    assert _sample("ai_tokens_total", kind="prompt") == before_prompt + 12
+    assert _sample("ai_request_duration_seconds_count") >= 2
+
+
+@pytest.mark.asyncio
+async def test_observed_stream_records_time_to_first_token(monkeypatch):
+    monkeypatch.setattr(settings, "AI_USAGE_ENABLED", False)
+    adapter = MeteredAdapter()
+    before_ttft = _sample("ai_time_to_first_token_seconds_count", method="chat")
+    before_ok = _sample("ai_requests_total", method="chat", status="success")
+
+    chunks = [c async for c in adapter.chat_stream([{"role": "user", "content": "hola"}])]
+
+    assert chunks == ["Ho", "la"]
+    assert _sample("ai_time_to_first_token_seconds_count", method="chat") == before_ttft + 1
+    assert _sample("ai_requests_total", method="chat", status="success") == before_ok + 1
+    assert _sample("ai_tokens_total", method="chat", kind="completion") > 0
+
+
+@pytest.mark.asyncio
+async def test_observed_stream_closes_provider_stream(monkeypatch):
+    monkeypatch.setattr(settings, "AI_USAGE_ENABLED", False)
+    adapter = MeteredAdapter()
+    before_cancelled = _sample("ai_requests_total", method="chat", status="cancelled")
+
+    # El cliente se desconecta después del primer token
+    stream = adapter.chat_stream([{"role": "user", "content": "hola"}])
+    assert await stream.__anext__() == "Ho"
+    await stream.aclose()
+
+    assert adapter.streams[0].closed
+    assert _sample("ai_requests_total", method="chat", status="cancelled") == before_cancelled + 1
+
+    [c async for c in adapter.chat_stream([{"role": "user", "content": "hola"}])]
+    assert adapter.streams[1].closed
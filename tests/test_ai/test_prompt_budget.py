@@ -0,0 +1,60 @@
+"""
+Tests del presupuesto de tokens de prompts
+"""
+from app.ai.prompt_budget import PromptBudget, message_tokens
+
+MODEL = "gpt-4-turbo-preview"
+
+SYSTEM = {"role": "system", "content": "Eres un asistente de ventas."}
+
+
+def _conversation(turns: int):
+    history = []
+    for i in range(turns):
+        role = "user" if i % 2 == 0 else "assistant"
+        history.append({"role": role, "content": f"mensaje número {i} " + "detalle " * 20})
+    return [SYSTEM, *history, {"role": "user", "content": "¿Tienen envío gratis?"}]
+
+
+def test_short_conversation_is_untouched():
+    messages = _conversation(4)
+    fitted = PromptBudget(max_tokens=10_000, max_turns=50).fit(messages, MODEL)
+
+    assert fitted.messages == messages
+    assert fitted.dropped == 0
+
+
+def test_long_conversation_keeps_system_and_latest_turns_within_budget():
+    messages = _conversation(60)
+    budget = PromptBudget(max_tokens=400, max_turns=50, summary_max_tokens=60)
+    fitted = budget.fit(messages, MODEL)
+
+    assert fitted.messages[0] == SYSTEM
+    assert fitted.messages[-1] == messages[-1]
+    assert fitted.dropped > 0
+    assert fitted.tokens <= 400
+    assert fitted.tokens < fitted.original_tokens
+
+    # Los turnos conservados son los más recientes, en orden
+    kept = [m for m in fitted.messages if m not in (SYSTEM,) and m["role"] != "system"]
+    assert kept == messages[len(messages) - len(kept):]
+
+
+def test_dropped_turns_are_summarized():
+    messages = _conversation(30)
+    fitted = PromptBudget(max_tokens=500, max_turns=50, summary_max_tokens=80).fit(messages, MODEL)
+
+    summary = fitted.messages[1]
+    assert fitted.summarized
+    assert summary["role"] == "system"
+    assert summary["content"].startswith(f"Resumen de {fitted.dropped} mensajes anteriores")
+    assert message_tokens(summary, MODEL) <= 80 + 3
+
+
+def test_turn_limit_applies_even_with_room():
+    fitted = PromptBudget(max_tokens=100_000, max_turns=10, summary_max_tokens=0).fit(
+        _conversation(40), MODEL
+    )
+
+    assert len(fitted.messages) == 1 + 10 + 1
+    assert fitted.dropped == 30
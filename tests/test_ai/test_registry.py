@@ -0,0 +1,28 @@
+"""
+Tests del registro compartido de adaptadores de IA
+"""
+import pytest
+from app.ai.registry import AIClientRegistry
+from app.core.config import settings
+
+
+@pytest.mark.asyncio
+async def test_registry_reuses_adapter_and_http_pool(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+    registry = AIClientRegistry()
+
+    first = registry.get("openai")
+    second = registry.get("OpenAI")
+
+    assert first is second
+    assert len(registry._http_clients) == 1
+
+    await registry.aclose()
+    assert registry._adapters == {}
+
+
+def test_registry_rejects_unknown_provider():
+    registry = AIClientRegistry()
+
+    with pytest.raises(ValueError):
+        registry.get("desconocido")
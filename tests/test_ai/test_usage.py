@@ -0,0 +1,120 @@
+"""
+Tests de la contabilidad de uso de IA
+"""
+import pytest
+from app.ai.base import AIAdapter
+from app.ai import usage
+from app.ai.usage import AIUsageLedger, ai_flow, model_cost, usage_ledger
+from app.core.config import settings
+
+
+class Usage:
+    prompt_tokens = 1000
+    completion_tokens = 500
+
+
+class Response:
+    usage = Usage()
+
+
+class RecordingAdapter(AIAdapter):
+    """Adaptador de prueba que guarda el modelo pedido al proveedor"""
+
+    provider_name = "test"
+
+    def __init__(self):
+        self.models = []
+
+    @property
+    def model_name(self) -> str:
+        return "expensive-model"
+
+    def _token_usage(self, response):
+        return response.usage.prompt_tokens, response.usage.completion_tokens
+
+    async def classify_lead(self, prompt, response_format=None):
+        raise NotImplementedError
+
+    async def detect_intent(self, prompt, valid_intents=None):
+        raise NotImplementedError
+
+    async def analyze_sentiment(self, prompt):
+        raise NotImplementedError
+
+    async def analyze_message(self, prompt, valid_intents=None):
+        raise NotImplementedError
+
+    async def chat(self, messages, temperature=0.7, max_tokens=500):
+        raise NotImplementedError
+
+    async def generate_response(self, prompt, **kwargs):
+        return await self._observed(
+            "generate_response", self._provider_call, model=self.model_name, prompt=prompt
+        )
+
+    async def _provider_call(self, model, prompt):
+        self.models.append(model)
+        return Response()
+
+
+def test_model_cost_uses_longest_price_prefix():
+    assert model_cost("gpt-4o-mini-2024-07-18", 1_000_000, 0) == pytest.approx(0.15)
+    assert model_cost("gpt-4o-2024-05-13", 1_000_000, 0) == pytest.approx(5.0)
+    assert model_cost("unknown-model", 1000, 1000) == 0.0
+
+
+def test_model_cost_prices_claude_4_models():
+    assert model_cost("claude-sonnet-4-20250514", 1_000_000, 1_000_000) == pytest.approx(18.0)
+    assert model_cost("claude-opus-4-20250514", 1_000_000, 0) == pytest.approx(15.0)
+    assert model_cost("claude-3-5-haiku-20241022", 0, 1_000_000) == pytest.approx(4.0)
+
+
+def test_unpriced_model_is_logged_once(monkeypatch):
+    warnings = []
+
+    class RecordingLogger:
+        def warning(self, event, **kwargs):
+            warnings.append((event, kwargs))
+
+    monkeypatch.setattr(usage, "logger", RecordingLogger())
+    monkeypatch.setattr(usage, "_unpriced_models", set())
+
+    model_cost("mystery-model", 10, 10)
+    model_cost("mystery-model", 10, 10)
+
+    assert warnings == [("ai_model_price_unknown", {"model": "mystery-model"})]
+
+
+@pytest.mark.asyncio
+async def test_record_tags_flow_and_entity():
+    ledger = AIUsageLedger(redis_url="")
+
+    with ai_flow("cart_recovery", "cart-1"):
+        ledger.record("openai", "gpt-3.5-turbo", "generate_response", 1000, 1000)
+    ledger.record("openai", "gpt-3.5-turbo", "chat", 10, 10)
+
+    first, second = ledger._pending
+    assert (first["flow"], first["entity_id"]) == ("cart_recovery", "cart-1")
+    assert first["cost_usd"] == pytest.approx(0.002)
+    assert second["flow"] == "untagged"
+
+    ledger._pending.clear()
+    await ledger.aclose()
+
+
+@pytest.mark.asyncio
+async def test_exhausted_budget_degrades_to_fallback_model(monkeypatch):
+    monkeypatch.setattr(settings, "AI_FLOW_BUDGETS_USD", {"chatbot": 0.0, "lead_classifier": 100.0})
+    monkeypatch.setattr(settings, "AI_BUDGET_FALLBACK_MODELS", {"test": "cheap-model"})
+    adapter = RecordingAdapter()
+
+    with ai_flow("lead_classifier"):
+        await adapter.generate_response("hola")
+    with ai_flow("chatbot"):
+        await adapter.generate_response("hola")
+
+    assert adapter.models == ["expensive-model", "cheap-model"]
+    assert usage_ledger._pending[-1]["degraded"] is True
+
+    usage_ledger._pending.clear()
+    await usage_ledger.aclose()
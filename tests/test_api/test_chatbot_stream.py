@@ -0,0 +1,168 @@
+"""
+Tests del chatbot en streaming (SSE y WebSocket) con un adaptador falso
+"""
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.ai.base import AIAdapter
+from app.api.deps import get_database
+from app.api.v1 import chatbot as chatbot_api
+from app.schemas.conversation import ChatContext
+from app.services.chatbot import AutonomousChatbot
+
+
+class StreamingAdapter(AIAdapter):
+    """Adaptador de prueba que entrega fragmentos fijos (o falla a mitad)"""
+
+    provider_name = "test"
+
+    def __init__(self, chunks, fail_after=None):
+        self.chunks = chunks
+        self.fail_after = fail_after
+        self.closed = False
+
+    @property
+    def model_name(self) -> str:
+        return "stream-model"
+
+    async def classify_lead(self, prompt, response_format=None):
+        raise NotImplementedError
+
+    async def detect_intent(self, prompt, valid_intents=None):
+        raise NotImplementedError
+
+    async def analyze_sentiment(self, prompt):
+        raise NotImplementedError
+
+    async def analyze_message(self, prompt, valid_intents=None):
+        raise NotImplementedError
+
+    async def chat(self, messages, temperature=0.7, max_tokens=500):
+        raise NotImplementedError
+
+    async def chat_stream(self, messages, temperature=0.7, max_tokens=500):
+        try:
+            for i, chunk in enumerate(self.chunks):
+                if i == self.fail_after:
+                    raise RuntimeError("provider down")
+                yield chunk
+        finally:
+            self.closed = True
+
+    async def generate_response(self, prompt, **kwargs):
+        raise NotImplementedError
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+async def _no_database():
+    yield None
+
+
+@pytest.fixture
+def client_for(monkeypatch):
+    def build(adapter: StreamingAdapter) -> TestClient:
+        monkeypatch.setattr(
+            chatbot_api, "AutonomousChatbot", lambda: AutonomousChatbot(ai_adapter=adapter)
+        )
+        monkeypatch.setattr(chatbot_api, "AsyncSessionLocal", FakeSession)
+        app = FastAPI()
+        app.include_router(chatbot_api.router)
+        app.dependency_overrides[get_database] = _no_database
+        return TestClient(app)
+
+    return build
+
+
+def _sse(body: str) -> list:
+    """(evento, datos) de cada frame SSE"""
+    events = []
+    for frame in body.strip().split("\n\n"):
+        event_line, data_line = frame.split("\n")
+        events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    return events
+
+
+def test_sse_streams_tokens_then_done(client_for):
+    client = client_for(StreamingAdapter(["Hola", ", ¿en qué", " te ayudo?"]))
+
+    response = client.post("/stream", params={"message": "Hola"}, json={"conversation_id": "c1"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _sse(response.text)
+    assert [name for name, _ in events] == ["token", "token", "token", "done"]
+    assert [data["content"] for _, data in events[:3]] == ["Hola", ", ¿en qué", " te ayudo?"]
+    done = events[-1][1]
+    assert done["message"]["content"] == "Hola, ¿en qué te ayudo?"
+    assert done["total_ms"] >= done["time_to_first_token_ms"] >= 0
+
+
+def test_sse_escalates_without_calling_the_model(client_for):
+    adapter = StreamingAdapter(["no debería usarse"])
+    client = client_for(adapter)
+
+    response = client.post("/stream", params={"message": "Quiero un reembolso"}, json={})
+
+    events = _sse(response.text)
+    assert [name for name, _ in events] == ["escalate"]
+    assert events[0][1]["message"]["action"] == "escalate_to_human"
+    assert not adapter.closed
+
+
+def test_sse_reports_provider_error_as_event(client_for):
+    client = client_for(StreamingAdapter(["Hola", " mundo"], fail_after=1))
+
+    response = client.post("/stream", params={"message": "Hola"}, json={})
+
+    events = _sse(response.text)
+    assert [name for name, _ in events] == ["token", "error"]
+    assert events[-1][1]["content"] == "provider down"
+
+
+def test_websocket_turns_stream_events(client_for):
+    client = client_for(StreamingAdapter(["Hola", "!"]))
+
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_json({"message": "Hola", "context": {"conversation_id": "c1"}})
+        events = [websocket.receive_json() for _ in range(3)]
+
+        websocket.send_json({"message": "Pásame con un supervisor"})
+        escalation = websocket.receive_json()
+
+        websocket.send_json({"context": {}})
+        invalid = websocket.receive_json()
+
+    assert [e["event"] for e in events] == ["token", "token", "done"]
+    assert events[-1]["message"]["content"] == "Hola!"
+    assert escalation["event"] == "escalate"
+    assert invalid["event"] == "error"
+
+
+def test_websocket_reports_provider_error_as_event(client_for):
+    client = client_for(StreamingAdapter(["Hola", " mundo"], fail_after=1))
+
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_json({"message": "Hola"})
+        events = [websocket.receive_json() for _ in range(2)]
+
+    assert [e["event"] for e in events] == ["token", "error"]
+
+
+@pytest.mark.asyncio
+async def test_disconnect_closes_provider_stream():
+    adapter = StreamingAdapter(["Hola", " mundo", "!"])
+    chatbot = AutonomousChatbot(ai_adapter=adapter)
+
+    frames = chatbot_api._sse_events(chatbot, "Hola", ChatContext(), None)
+    assert (await frames.__anext__()).startswith("event: token")
+    await frames.aclose()
+
+    assert adapter.closed
@@ -2,7 +2,11 @@
 Tests para webhooks
 """
 import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
 from httpx import AsyncClient
+from app.api.deps import get_database
+from app.api.v1 import webhooks
 
 
 @pytest.mark.asyncio
@@ -53,3 +57,45 @@ async def test_webhook_inbound(client: AsyncClient):
     data = response.json()
     assert data["status"] in ["received", "error"]
 
+
+
+class FakeSession:
+    async def commit(self):
+        pass
+
+
+async def _fake_database():
+    yield FakeSession()
+
+
+def test_partial_retry_stores_each_message_payload(monkeypatch):
+    """Entrega con dos mensajes y uno ya recibido: no se guarda el payload completo"""
+    stored = []
+
+    async def claim(channel, provider_ids):
+        return ["wamid.2"]
+
+    async def insert_raw_messages(channel, messages, payload, db):
+        stored.append(([m.provider_message_id for m in messages], payload))
+        return ["raw-2"]
+
+    async def enqueue_many(messages):
+        return ["1-0"]
+
+    monkeypatch.setattr(webhooks.webhook_idempotency, "claim", claim)
+    monkeypatch.setattr(webhooks, "_insert_raw_messages", insert_raw_messages)
+    monkeypatch.setattr(webhooks.message_queue, "enqueue_many", enqueue_many)
+    app = FastAPI()
+    app.include_router(webhooks.router)
+    app.dependency_overrides[get_database] = _fake_database
+
+    response = TestClient(app).post("/inbound", json={
+        "object": "whatsapp_business_account",
+        "entry": [{"changes": [{"value": {"messages": [
+            {"id": "wamid.1", "from": "5071", "type": "text", "text": {"body": "hola"}},
+            {"id": "wamid.2", "from": "5071", "type": "text", "text": {"body": "precio?"}},
+        ]}}]}]
+    })
+
+    assert response.json()["message_ids"] == ["raw-2"]
+    assert stored == [(["wamid.2"], None)]
@@ -0,0 +1,84 @@
+"""
+Tests de las actualizaciones agrupadas de jobs
+"""
+import pytest
+from sqlalchemy import Boolean, Column, Integer, String
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import declarative_base
+from app.db.bulk import BulkUpdate
+
+RowBase = declarative_base()
+
+
+class Row(RowBase):
+    __tablename__ = "rows"
+
+    id = Column(String, primary_key=True)
+    attempts = Column(Integer, default=0)
+    final = Column(Boolean, default=False)
+
+
+OPERATIONS = {
+    "attempt": {"attempts": Row.attempts + 1},
+    "final": {"attempts": Row.attempts + 1, "final": True},
+}
+
+
+class FakeSession:
+    """Sesión de prueba que registra sentencias y commits"""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.statements = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def execute(self, statement):
+        if self.fail:
+            raise RuntimeError("db down")
+        self.statements.append(statement)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+def test_statement_uses_any_array():
+    updater = BulkUpdate(FakeSession(), Row, OPERATIONS)
+    sql = str(updater.statement("final", ["a", "b"]).compile(dialect=postgresql.dialect()))
+
+    assert "UPDATE rows SET attempts=(rows.attempts +" in sql
+    assert "final=" in sql
+    assert "WHERE rows.id = ANY (" in sql
+
+
+@pytest.mark.asyncio
+async def test_flushes_one_statement_per_operation_per_group():
+    db = FakeSession()
+    updater = BulkUpdate(db, Row, OPERATIONS, flush_every=10)
+
+    for i in range(24):
+        await updater.add("final" if i % 4 == 0 else "attempt", f"row-{i}")
+    await updater.flush()
+
+    # 3 grupos (10, 10, 4) con ambas operaciones presentes en cada uno
+    assert db.commits == 3
+    assert len(db.statements) == 6
+    assert updater.flushed == 24
+    assert updater.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_rolls_back_and_raises():
+    db = FakeSession(fail=True)
+    updater = BulkUpdate(db, Row, OPERATIONS, flush_every=100)
+    await updater.add("attempt", "row-1")
+
+    with pytest.raises(RuntimeError):
+        await updater.flush()
+
+    assert db.rollbacks == 1
+    assert db.commits == 0
+    assert updater.flushed == 0
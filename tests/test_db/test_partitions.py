@@ -0,0 +1,30 @@
+"""
+Tests de nombres y retención de particiones mensuales
+"""
+from datetime import date
+from app.db.partitions import (
+    MESSAGES, RAW_MESSAGES, add_months, expired_partitions, partition_month, partition_name
+)
+
+
+def test_month_arithmetic_crosses_years():
+    assert add_months(date(2024, 11, 1), 3) == date(2025, 2, 1)
+    assert add_months(date(2024, 2, 1), -3) == date(2023, 11, 1)
+
+
+def test_partition_name_roundtrip():
+    name = partition_name(RAW_MESSAGES, date(2024, 3, 1))
+
+    assert name == "raw_messages_2024_03"
+    assert partition_month(RAW_MESSAGES, name) == date(2024, 3, 1)
+    # Una partición de raw_messages no es de messages
+    assert partition_month(MESSAGES, name) is None
+
+
+def test_only_months_fully_outside_retention_expire():
+    names = [partition_name(RAW_MESSAGES, date(2024, m, 1)) for m in range(1, 8)] + ["raw_messages_legacy"]
+
+    # 3 meses de retención a mediados de julio: se conservan abril, mayo, junio y julio
+    expired = expired_partitions(RAW_MESSAGES, names, 3, date(2024, 7, 15))
+
+    assert expired == ["raw_messages_2024_01", "raw_messages_2024_02", "raw_messages_2024_03"]
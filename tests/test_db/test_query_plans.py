@@ -0,0 +1,195 @@
+"""
+Regresión de planes de consulta de los jobs programados
+
+Aplica las migraciones sobre una base Postgres de prueba, la siembra con
+datos sesgados (pocas filas "calientes" entre SEED_ROWS) y ejecuta EXPLAIN
+sobre cada consulta de los jobs con la configuración por defecto del
+planificador. Falla si alguna se resuelve con Seq Scan o sin el índice de la
+migración 003 pensado para ella: con este volumen el índice tiene que ganar
+por costo, sin penalizar el Seq Scan.
+
+Las consultas se preparan con parámetros ($1, $2, ...) y se ejecutan varias
+veces antes del EXPLAIN, como asyncpg al reutilizar el statement; así se
+explica el plan que el planificador elige para las ejecuciones repetidas.
+
+Requiere TEST_DATABASE_SYNC_URL (postgresql://...); si no existe, se omite.
+"""
+import json
+import os
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.dialects import postgresql
+
+TEST_DATABASE_SYNC_URL = os.getenv("TEST_DATABASE_SYNC_URL")
+
+pytestmark = pytest.mark.skipif(
+    not TEST_DATABASE_SYNC_URL,
+    reason="TEST_DATABASE_SYNC_URL no configurada"
+)
+
+# Suficientes filas para que un Seq Scan cueste más que el índice
+SEED_ROWS = 200000
+
+# Ejecuciones con plan a medida antes de que Postgres evalúe el genérico
+PREPARED_WARMUP_EXECUTIONS = 5
+
+# Consulta -> índice (migración 003) que debe aparecer en su plan
+JOB_QUERY_INDEXES = {
+    "abandoned_carts": "ix_carts_status_last_activity_attempts",
+    "upcoming_invoices": "ix_invoices_status_due_date",
+    "recently_overdue_invoices": "ix_invoices_status_due_date",
+    "long_overdue_invoices": "ix_invoices_status_due_date",
+    "churn_risk_customers": "ix_conversations_last_message_at_sentiment",
+    "hot_leads": "ix_leads_created_at_score",
+    "unprocessed_messages": "ix_raw_messages_unprocessed",
+}
+
+SEED_SQL = [
+    """
+    INSERT INTO customers (id, name, created_at)
+    SELECT 'c' || g, 'Cliente ' || g, now() - (g || ' hours')::interval
+    FROM generate_series(1, :rows) g
+    """,
+    """
+    INSERT INTO leads (id, name, score, created_at)
+    SELECT 'l' || g, 'Lead ' || g, g % 100, now() - (g || ' hours')::interval
+    FROM generate_series(1, :rows) g
+    """,
+    """
+    INSERT INTO conversations (id, customer_id, channel, started_at, avg_sentiment_score, last_message_at)
+    SELECT 'v' || g, 'c' || g, 'whatsapp', now() - (g || ' days')::interval,
+           (g % 20) / 10.0 - 1.0, now() - (g || ' hours')::interval
+    FROM generate_series(1, :rows) g
+    """,
+    """
+    INSERT INTO carts (id, customer_id, items, total_amount, status, created_at, last_activity, recovery_attempt_count)
+    SELECT 'k' || g, 'c' || g, '[]', 100, CASE WHEN g % 50 = 0 THEN 'pending' ELSE 'completed' END,
+           now() - (g || ' hours')::interval, now() - (g || ' hours')::interval, g % 5
+    FROM generate_series(1, :rows) g
+    """,
+    """
+    INSERT INTO invoices (id, customer_id, number, amount, status, issued_at, due_date)
+    SELECT 'i' || g, 'c' || g, 'F-' || g, 100, CASE WHEN g % 50 = 0 THEN 'pending' ELSE 'paid' END,
+           now() - (g || ' days')::interval, now() + ((g % 60) - 30 || ' days')::interval
+    FROM generate_series(1, :rows) g
+    """,
+    """
+    INSERT INTO raw_messages (id, channel, sender_id, content, received_at, processed)
+    SELECT 'm' || g, 'WHATSAPP', 's' || g, 'hola', now() - ((g % 3600) || ' seconds')::interval, g % 100 <> 0
+    FROM generate_series(1, :rows) g
+    """,
+]
+
+
+def _job_queries():
+    """Consultas tal como las construyen los jobs"""
+    from app.models.message import RawMessage
+    from app.services.alerts import IntelligentAlerts
+    from app.services.cart_recovery import CartRecoveryService
+    from app.services.payment_reminder import PaymentReminderService
+
+    now = datetime.utcnow()
+    return {
+        "abandoned_carts": CartRecoveryService.abandoned_carts_query(now - timedelta(hours=1)),
+        "upcoming_invoices": PaymentReminderService.upcoming_invoices_query(now),
+        "recently_overdue_invoices": PaymentReminderService.recently_overdue_invoices_query(now),
+        "long_overdue_invoices": PaymentReminderService.long_overdue_invoices_query(now),
+        "churn_risk_customers": IntelligentAlerts.churn_risk_customers_query(now - timedelta(days=7)),
+        "hot_leads": IntelligentAlerts.hot_leads_query(now - timedelta(hours=1)),
+        "unprocessed_messages": select(RawMessage.id).where(RawMessage.processed == False),  # noqa: E712
+    }
+
+
+def _explain_prepared(conn, stmt) -> dict:
+    """Plan JSON de la consulta preparada (parámetros posicionales) ya reutilizada"""
+    dialect = postgresql.dialect(paramstyle="numeric_dollar")
+    compiled = stmt.compile(dialect=dialect)
+    params = compiled.construct_params()
+    args = [
+        compiled.binds[name].type.literal_processor(dialect)(params[name])
+        for name in compiled.positiontup
+    ]
+
+    conn.exec_driver_sql(f"PREPARE job_query AS {compiled}")
+    try:
+        execute = f"EXECUTE job_query({', '.join(args)})" if args else "EXECUTE job_query"
+        for _ in range(PREPARED_WARMUP_EXECUTIONS):
+            conn.exec_driver_sql(execute).fetchall()
+        plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {execute}").scalar()
+    finally:
+        conn.exec_driver_sql("DEALLOCATE job_query")
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def _partition_indexes(conn, index: str) -> set:
+    """El índice y, si es de una tabla particionada, los de cada partición"""
+    names = conn.execute(
+        text(
+            "SELECT c.relname FROM pg_partition_tree(CAST(:index AS regclass)) t "
+            "JOIN pg_class c ON c.oid = t.relid"
+        ),
+        {"index": index}
+    ).scalars().all()
+    return {index, *names}
+
+
+def _index_names(plan: dict) -> set:
+    """Índices usados (Index Scan, Index Only Scan, Bitmap Index Scan)"""
+    found = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        found |= _index_names(child)
+    return found
+
+
+def _seq_scans(plan: dict) -> list:
+    """Tablas recorridas con Seq Scan en un plan JSON de EXPLAIN"""
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+
+@pytest.fixture(scope="module")
+def seeded_engine():
+    from alembic import command
+    from alembic.config import Config
+    from app.core.config import settings
+
+    original_url = settings.DATABASE_SYNC_URL
+    settings.DATABASE_SYNC_URL = TEST_DATABASE_SYNC_URL
+    alembic_cfg = Config(os.path.join(os.path.dirname(__file__), "..", "..", "alembic.ini"))
+    try:
+        command.upgrade(alembic_cfg, "head")
+
+        engine = create_engine(TEST_DATABASE_SYNC_URL)
+        with engine.begin() as conn:
+            for statement in SEED_SQL:
+                conn.execute(text(statement), {"rows": SEED_ROWS})
+            conn.execute(text("ANALYZE"))
+
+        yield engine
+
+        engine.dispose()
+        command.downgrade(alembic_cfg, "base")
+    finally:
+        settings.DATABASE_SYNC_URL = original_url
+
+
+@pytest.mark.parametrize("name", list(JOB_QUERY_INDEXES))
+def test_job_query_uses_its_index(seeded_engine, name):
+    stmt = _job_queries()[name]
+    expected = JOB_QUERY_INDEXES[name]
+
+    with seeded_engine.connect() as conn:
+        plan = _explain_prepared(conn, stmt)
+        expected_names = _partition_indexes(conn, expected)
+
+    assert _seq_scans(plan) == [], f"{name} usa Seq Scan:\n{json.dumps(plan, indent=2)}"
+    used = _index_names(plan)
+    assert used & expected_names, f"{name} no usa {expected} (usa {sorted(used)})"
@@ -0,0 +1,181 @@
+"""
+Tests del pipeline de análisis: llamada combinada y etapas en paralelo
+"""
+import asyncio
+from types import SimpleNamespace
+import pytest
+from app.models.message import MessageChannel
+from app.schemas.analysis import MessageAnalysis, neutral_result
+from app.schemas.intent import IntentDetectionResult
+from app.schemas.lead import LeadScore
+from app.schemas.sentiment import SentimentResult
+from app.services import analysis_pipeline
+from app.services.analysis_pipeline import InboundAnalysisPipeline
+from app.services.intent_detector import IntentDetector
+from app.services.lead_classifier import LeadClassifier
+from app.services.sentiment_analyzer import SentimentAnalyzer
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeAnalyzer:
+    """Analizador combinado de prueba que devuelve un MessageAnalysis fijo"""
+
+    def __init__(self, analysis):
+        self.ai = object()
+        self.analysis = analysis
+
+    async def analyze(self, request, db):
+        return self.analysis
+
+
+class FakeRouter:
+    def __init__(self):
+        self.routed = []
+
+    async def route_message(self, intent, sentiment, lead_score, db):
+        self.routed.append((intent, sentiment, lead_score))
+        return SimpleNamespace(destination="sales", priority="normal")
+
+
+class Stages:
+    """Sustituye los servicios de cada flujo y mide cuántos corren a la vez"""
+
+    def __init__(self, monkeypatch, fail=()):
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self.fail = fail
+
+        monkeypatch.setattr(analysis_pipeline, "AsyncSessionLocal", FakeSession)
+        monkeypatch.setattr(LeadClassifier, "classify", self._stage("classification", LeadScore(
+            score=90, category="hot", reasoning="", recommended_action="call"
+        )))
+        monkeypatch.setattr(IntentDetector, "detect", self._stage("intent", IntentDetectionResult(
+            primary_intent="purchase_inquiry", confidence=0.9
+        )))
+        monkeypatch.setattr(SentimentAnalyzer, "analyze", self._stage("sentiment", SentimentResult(
+            sentiment="positive", score=0.6, confidence=0.9
+        )))
+
+    def _stage(self, name, result):
+        async def run(service, request, db):
+            self.calls.append(name)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            await asyncio.sleep(0.01)
+            self.active -= 1
+            if name in self.fail:
+                raise RuntimeError(f"{name} down")
+            return result
+        return run
+
+
+@pytest.fixture
+def raw_message():
+    return SimpleNamespace(
+        id="raw-1",
+        channel=MessageChannel.WHATSAPP,
+        content="Quiero comprar 10 unidades",
+        sender_id="+5215550000000"
+    )
+
+
+@pytest.fixture
+def lead(monkeypatch):
+    lead = SimpleNamespace(id="lead-1", name="Ana", phone="+5215550000000")
+
+    async def resolve_lead(self, raw_message, db):
+        return lead
+
+    monkeypatch.setattr(InboundAnalysisPipeline, "_resolve_lead", resolve_lead)
+    return lead
+
+
+def _failed_analysis(error):
+    return MessageAnalysis(
+        lead_score=neutral_result("classification", error),
+        intent=neutral_result("intent", error),
+        sentiment=neutral_result("sentiment", error),
+        error=error
+    )
+
+
+@pytest.mark.asyncio
+async def test_combined_call_skips_per_stage_calls(monkeypatch, raw_message, lead):
+    stages = Stages(monkeypatch)
+    analysis = MessageAnalysis(
+        lead_score=LeadScore(score=70, category="warm", reasoning="", recommended_action="follow_up"),
+        intent=IntentDetectionResult(primary_intent="support_request", confidence=0.8),
+        sentiment=SentimentResult(sentiment="neutral", score=0.0, confidence=0.8)
+    )
+    pipeline = InboundAnalysisPipeline(analyzer=FakeAnalyzer(analysis), router=FakeRouter())
+
+    result = await pipeline.run(raw_message, db=None)
+
+    assert stages.calls == []
+    assert result.failed_stages == {}
+    assert result.intent.primary_intent == "support_request"
+
+
+@pytest.mark.asyncio
+async def test_failed_combined_call_runs_stages_concurrently(monkeypatch, raw_message, lead):
+    stages = Stages(monkeypatch)
+    router = FakeRouter()
+    pipeline = InboundAnalysisPipeline(
+        analyzer=FakeAnalyzer(_failed_analysis("timeout")),
+        router=router
+    )
+
+    result = await pipeline.run(raw_message, db=None)
+
+    assert sorted(stages.calls) == ["classification", "intent", "sentiment"]
+    assert stages.max_active == 3
+    assert result.failed_stages == {}
+    assert result.lead_score.score == 90
+    assert result.lead_score.lead_id == "lead-1"
+    assert result.intent.primary_intent == "purchase_inquiry"
+    assert set(result.latencies_ms) >= {"analysis", "classification", "intent", "sentiment", "routing"}
+    assert router.routed[0][0] is result.intent
+
+
+@pytest.mark.asyncio
+async def test_only_failed_sections_are_rerun(monkeypatch, raw_message, lead):
+    stages = Stages(monkeypatch)
+    analysis = MessageAnalysis(
+        lead_score=LeadScore(score=70, category="warm", reasoning="", recommended_action="follow_up"),
+        intent=neutral_result("intent", "confidence fuera de rango"),
+        sentiment=SentimentResult(sentiment="negative", score=-0.4, confidence=0.8)
+    )
+    pipeline = InboundAnalysisPipeline(analyzer=FakeAnalyzer(analysis), router=FakeRouter())
+
+    result = await pipeline.run(raw_message, db=None)
+
+    assert stages.calls == ["intent"]
+    assert result.failed_stages == {}
+    assert result.lead_score.score == 70
+    assert result.intent.primary_intent == "purchase_inquiry"
+    assert result.sentiment.sentiment == "negative"
+    assert "intent" in result.latencies_ms
+
+
+@pytest.mark.asyncio
+async def test_failing_stage_falls_back_to_neutral_result(monkeypatch, raw_message, lead):
+    Stages(monkeypatch, fail=("sentiment",))
+    pipeline = InboundAnalysisPipeline(
+        analyzer=FakeAnalyzer(_failed_analysis("timeout")),
+        router=FakeRouter()
+    )
+
+    result = await pipeline.run(raw_message, db=None)
+
+    assert result.failed_stages == {"sentiment": "sentiment down"}
+    assert result.sentiment.sentiment == "neutral"
+    assert result.intent.primary_intent == "purchase_inquiry"
+    assert "sentiment" not in result.latencies_ms
@@ -0,0 +1,59 @@
+"""
+Tests de la secuencia de recuperación de carritos: sin mensaje no hay etapa
+"""
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from app.services.cart_recovery import CartRecoveryService
+
+STAGE_HOURS = {"gentle": 2, "incentive": 30, "urgency": 50, "final": 80}
+
+
+class TextAdapter:
+    """Adaptador de prueba que devuelve un texto fijo"""
+
+    def __init__(self, text):
+        self.text = text
+
+    async def generate_response(self, prompt, **kwargs):
+        return self.text
+
+
+def _cart(hours_abandoned):
+    return SimpleNamespace(
+        id="cart-1",
+        customer_id="c1",
+        items=[{"name": "Camisa"}],
+        total_amount=100,
+        last_activity=datetime.utcnow() - timedelta(hours=hours_abandoned)
+    )
+
+
+def _service(ai):
+    service = CartRecoveryService(ai_adapter=TextAdapter("x"))
+    service.ai = ai
+    return service
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("stage", list(STAGE_HOURS))
+async def test_stage_is_returned_when_message_is_generated(stage):
+    service = _service(TextAdapter("Hola, tu carrito te espera"))
+
+    assert await service._trigger_recovery_sequence(_cart(STAGE_HOURS[stage])) == stage
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("stage", list(STAGE_HOURS))
+async def test_no_stage_without_ai(stage):
+    service = _service(None)
+
+    assert await service._trigger_recovery_sequence(_cart(STAGE_HOURS[stage])) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("stage", list(STAGE_HOURS))
+async def test_no_stage_when_generation_is_empty(stage):
+    service = _service(TextAdapter(""))
+
+    assert await service._trigger_recovery_sequence(_cart(STAGE_HOURS[stage])) is None
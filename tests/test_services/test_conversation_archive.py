@@ -0,0 +1,214 @@
+"""
+Tests del archivo frío de conversaciones (Parquet + zstd)
+"""
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql import Delete
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+from app.models.archive import ArchivedConversation
+from app.models.conversation import Conversation, ConversationStatus
+from app.models.message import Message
+from app.models.sentiment import SentimentAnalysis
+from app.services.conversation_archive import ConversationArchive, arrow_schema, to_row, write_parquet
+
+CLOSED_AT = datetime.utcnow() - timedelta(days=200)
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return list(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class FakeSession:
+    """
+    Sesión de prueba con filas en memoria: responde los SELECT por entidad
+    (filtrando por la lista del IN) y aplica los DELETE del lote.
+    """
+
+    def __init__(self, *objects):
+        self.rows = {}
+        for obj in objects:
+            self.rows.setdefault(type(obj), []).append(obj)
+        self.statements = []
+        self.deleted = []
+        self.commits = 0
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        if isinstance(stmt, Delete):
+            model = next(m for m in self.rows if m.__tablename__ == stmt.table.name)
+            ids = self._in_list(stmt)
+            key = "id" if model is Conversation else "conversation_id"
+            self.deleted.append((model.__tablename__, sorted(ids)))
+            self.rows[model] = [r for r in self.rows[model] if getattr(r, key) not in ids]
+            return FakeResult([])
+
+        model = stmt.column_descriptions[0]["entity"]
+        rows = self.rows.get(model, [])
+        if model is Conversation:
+            # Página del keyset: las candidatas que siguen en la "base"
+            return FakeResult(rows[:stmt._limit])
+        ids = self._in_list(stmt)
+        return FakeResult([r for r in rows if r.conversation_id in ids])
+
+    async def get(self, model, key):
+        pk = "conversation_id" if model is ArchivedConversation else "id"
+        return next((r for r in self.rows.get(model, []) if getattr(r, pk) == key), None)
+
+    def add_all(self, objects):
+        for obj in objects:
+            self.rows.setdefault(type(obj), []).append(obj)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        pass
+
+    def expunge_all(self):
+        pass
+
+    @staticmethod
+    def _in_list(stmt) -> set:
+        """Ids del IN (o de la igualdad) sobre la conversación"""
+        params = stmt.compile(dialect=postgresql.dialect()).params
+        for value in params.values():
+            if isinstance(value, list):
+                return set(value)
+        return {v for v in params.values() if isinstance(v, str)}
+
+
+def _conversation_with_history(conversation_id: str, channel: str = "whatsapp"):
+    conversation = Conversation(
+        id=conversation_id,
+        customer_id="cust-1",
+        channel=channel,
+        status=ConversationStatus.CLOSED,
+        started_at=CLOSED_AT - timedelta(hours=1),
+        closed_at=CLOSED_AT
+    )
+    messages = [
+        Message(
+            id=f"{conversation_id}-m{i}",
+            conversation_id=conversation_id,
+            content=f"mensaje {i}",
+            sender="customer" if i % 2 == 0 else "bot",
+            direction="inbound" if i % 2 == 0 else "outbound",
+            sent_at=CLOSED_AT - timedelta(minutes=10 - i)
+        )
+        # Desordenados: la lectura del archivo los devuelve por sent_at
+        for i in (2, 0, 1)
+    ]
+    sentiment = SentimentAnalysis(
+        id=f"{conversation_id}-s",
+        conversation_id=conversation_id,
+        sentiment="neutral",
+        score=0.1,
+        emotions={"calm": 0.9},
+        analyzed_at=CLOSED_AT - timedelta(minutes=5)
+    )
+    return [conversation, *messages, sentiment]
+
+
+def test_rows_roundtrip_through_parquet_with_filter(tmp_path):
+    analyses = [
+        SentimentAnalysis(
+            id=f"s{i}",
+            conversation_id="c1" if i % 2 else "c2",
+            sentiment="negative",
+            score=-0.8,
+            emotions={"anger": 0.7},
+            analyzed_at=datetime(2024, 1, 1, 10, i)
+        )
+        for i in range(4)
+    ]
+    path = tmp_path / "month=2024-01" / "channel=whatsapp" / "lote.sentiment_analyses.parquet"
+
+    write_parquet(path, [to_row(a) for a in analyses], arrow_schema(SentimentAnalysis), level=3)
+    rows = pq.read_table(path, filters=[("conversation_id", "=", "c1")]).to_pylist()
+
+    assert [r["id"] for r in rows] == ["s1", "s3"]
+    assert rows[0]["emotions"] == '{"anger":0.7}'
+    assert rows[0]["analyzed_at"] == datetime(2024, 1, 1, 10, 1)
+    assert not list(path.parent.glob("*.tmp"))
+
+
+def test_archive_path_is_partitioned_by_month_and_channel(tmp_path):
+    archive = ConversationArchive(storage_path=str(tmp_path))
+
+    path = archive._path("month=2024-01/channel=instagram/abc", "messages")
+
+    assert path == tmp_path / "archive" / "month=2024-01" / "channel=instagram" / "abc.messages.parquet"
+
+
+@pytest.mark.asyncio
+async def test_archive_writes_indexes_and_deletes_in_batches(tmp_path):
+    db = FakeSession(*_conversation_with_history("c1"), *_conversation_with_history("c2", "instagram"))
+    archive = ConversationArchive(storage_path=str(tmp_path), batch_size=1)
+
+    totals = await archive.archive(db)
+
+    assert totals == {"conversations": 2, "messages": 6, "sentiment_analyses": 2}
+    # Un lote por conversación: hijos antes que la conversación y un commit por lote
+    assert db.deleted == [
+        ("sentiment_analyses", ["c1"]), ("messages", ["c1"]), ("conversations", ["c1"]),
+        ("sentiment_analyses", ["c2"]), ("messages", ["c2"]), ("conversations", ["c2"]),
+    ]
+    assert db.commits == 2
+    assert db.rows[Conversation] == [] and db.rows[Message] == []
+
+    entries = {e.conversation_id: e for e in db.rows[ArchivedConversation]}
+    assert entries["c1"].message_count == 3
+    month = CLOSED_AT.strftime("%Y-%m")
+    assert entries["c2"].path.startswith(f"month={month}/channel=instagram/")
+    assert (tmp_path / "archive" / f"{entries['c1'].path}.messages.parquet").exists()
+
+
+@pytest.mark.asyncio
+async def test_archive_skips_conversations_with_cases(tmp_path):
+    db = FakeSession()
+
+    await ConversationArchive(storage_path=str(tmp_path)).archive(db)
+
+    candidates = str(db.statements[0].compile(dialect=postgresql.dialect()))
+    assert "NOT (EXISTS (SELECT" in candidates
+    assert "FROM cases" in candidates
+    assert "conversations.closed_at <" in candidates
+
+
+@pytest.mark.asyncio
+async def test_get_conversation_reads_archive_after_archiving(tmp_path):
+    db = FakeSession(*_conversation_with_history("c1"), *_conversation_with_history("c2"))
+    archive = ConversationArchive(storage_path=str(tmp_path))
+    await archive.archive(db)
+
+    conversation = await archive.get_conversation("c1", db)
+
+    assert conversation["archived"] is True
+    assert conversation["id"] == "c1"
+    assert conversation["status"] == "closed"
+    assert [m["id"] for m in conversation["messages"]] == ["c1-m0", "c1-m1", "c1-m2"]
+    assert [s["id"] for s in conversation["sentiment_analyses"]] == ["c1-s"]
+    assert await archive.get_conversation("missing", db) is None
+
+
+@pytest.mark.asyncio
+async def test_get_conversation_prefers_postgres(tmp_path):
+    db = FakeSession(*_conversation_with_history("c1"))
+
+    conversation = await ConversationArchive(storage_path=str(tmp_path)).get_conversation("c1", db)
+
+    assert conversation["archived"] is False
+    assert len(conversation["messages"]) == 3
@@ -0,0 +1,100 @@
+"""
+Tests para el índice de candidatos de deduplicación
+"""
+from app.services.dedup_index import (
+    CandidateIndex,
+    normalize_email,
+    normalize_name,
+    normalize_phone,
+    phonetic_code,
+)
+
+
+def _pairs(index: CandidateIndex) -> dict:
+    return {(a, b): reasons for a, b, reasons in index.candidate_pairs()}
+
+
+def test_normalization():
+    """Email, teléfono y nombre se normalizan antes de indexar"""
+    assert normalize_email("  Juan@Mail.COM ") == "juan@mail.com"
+    assert normalize_phone("6123-4567") == normalize_phone("+507 6123 4567")
+    assert normalize_name("José  Pérez-López") == "jose perez lopez"
+    assert phonetic_code("gonzalez") == phonetic_code("gonsales")
+
+
+def test_exact_email_and_phone_pairs():
+    """Email o teléfono iguales generan par aunque el nombre difiera"""
+    index = CandidateIndex()
+    index.add("1", "Juan Pérez", email="juan@mail.com")
+    index.add("2", "J. P.", email="JUAN@mail.com ")
+    index.add("3", "Ana Gómez", phone="+50761234567")
+    index.add("4", "Ana G", phone="6123-4567")
+
+    pairs = _pairs(index)
+    assert "email" in pairs[("1", "2")]
+    assert "phone" in pairs[("3", "4")]
+
+
+def test_similar_names_share_a_block():
+    """Nombres con errores de tipeo caen en el mismo bloque"""
+    index = CandidateIndex()
+    index.add("1", "Carlos Rodríguez")
+    index.add("2", "Carlos Rodriguez")
+    index.add("3", "Pedro Martínez")
+
+    pairs = _pairs(index)
+    assert pairs[("1", "2")] == {"name"}
+    assert ("1", "3") not in pairs
+    assert ("2", "3") not in pairs
+
+
+def test_oversized_name_blocks_are_skipped():
+    """Un bloque difuso gigante (nombre muy común) no explota en pares"""
+    index = CandidateIndex(max_block_size=3)
+    for i in range(5):
+        index.add(str(i), "Maria Gonzalez")
+
+    assert list(index.candidate_pairs()) == []
+
+
+def test_exact_keys_are_never_capped():
+    """Email/teléfono exactos enlazan a todo el bloque aunque sea grande (en estrella)"""
+    index = CandidateIndex(max_block_size=3)
+    for i in range(5):
+        index.add(str(i), None, email="ana@empresa.com")
+
+    pairs = _pairs(index)
+    assert set(pairs) == {("0", "1"), ("0", "2"), ("0", "3"), ("0", "4")}
+    assert all("email" in reasons for reasons in pairs.values())
+
+
+def test_shared_placeholder_email_is_linear():
+    index = CandidateIndex()
+    for i in range(10000):
+        index.add(str(i), None, email="info@empresa.com")
+
+    pairs = list(index.candidate_pairs())
+
+    assert len(pairs) == 9999
+
+
+def test_exact_block_anchor_is_in_focus():
+    index = CandidateIndex()
+    for i in range(4):
+        index.add(str(i), None, phone="+50761234567")
+
+    pairs = {(a, b) for a, b, _ in index.candidate_pairs(focus={"2"})}
+
+    assert pairs == {("0", "2"), ("1", "2"), ("2", "3")}
+
+
+def test_candidate_pairs_focus_only_touches_changed_contacts():
+    index = CandidateIndex()
+    index.add("1", "Ana Gomez", email="ana@example.com")
+    index.add("2", "Ana Gómez", email="ANA@example.com")
+    index.add("3", "Luis Perez", phone="+50761234567")
+    index.add("4", "Luis Pérez", phone="6123-4567")
+
+    pairs = {(a, b) for a, b, _ in index.candidate_pairs(focus={"3"})}
+
+    assert pairs == {("3", "4")}
@@ -0,0 +1,112 @@
+"""
+Tests del atajo local de detección de intención
+"""
+import pytest
+from app.ai.usage import usage_ledger
+from app.core.config import settings
+from app.schemas.intent import IntentDetectionRequest, IntentDetectionResult
+from app.services.intent_detector import IntentDetector
+from app.services.intent_fast_path import IntentFastPath
+
+
+class ModelAdapter:
+    """Adaptador de prueba que registra las llamadas al modelo"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def detect_intent(self, prompt, valid_intents=None):
+        self.calls += 1
+        return IntentDetectionResult(
+            primary_intent="purchase_inquiry",
+            secondary_intents=[],
+            confidence=0.9,
+            entities={},
+            reasoning="modelo"
+        )
+
+
+def test_unambiguous_message_is_resolved_locally():
+    result = IntentFastPath().match("Quiero hablar con humano, pásame con un supervisor")
+
+    assert result.primary_intent == "support_request"
+    assert result.ai_model_used == "rules"
+
+
+def test_corroborated_intent_gets_high_confidence():
+    result = IntentFastPath().match("Quiero un reembolso, ya pedí la devolución")
+
+    assert result.primary_intent == "refund_request"
+    assert result.secondary_intents == []
+    assert result.confidence >= 0.9
+
+
+def test_mixed_intents_fall_below_threshold():
+    result = IntentFastPath().match("El producto llegó defectuoso y quiero un reembolso")
+
+    assert result.primary_intent in ("complaint", "refund_request")
+    assert result.confidence < 0.85
+
+
+def test_no_keywords_returns_none():
+    assert IntentFastPath().match("Hola, buen día") is None
+
+
+def test_single_keyword_stays_below_threshold():
+    result = IntentFastPath().match("Quiero un reembolso")
+
+    assert result.primary_intent == "refund_request"
+    assert result.confidence < settings.INTENT_FAST_PATH_MIN_CONFIDENCE
+
+
+def test_keywords_match_whole_words_only():
+    assert IntentFastPath().match("Qué preciosa la camisa azul") is None
+
+
+def test_order_placement_is_not_delivery_tracking():
+    assert IntentFastPath().match("Quiero hacer mi pedido de 5 unidades") is None
+
+
+def test_negated_keyword_is_ignored():
+    assert IntentFastPath().match("No quiero reembolso, solo cambiar la talla") is None
+
+
+def test_resolved_refund_goes_to_model():
+    fast_path = IntentFastPath()
+
+    assert fast_path.match("después de la devolución recibí el reembolso, gracias") is None
+    assert fast_path.match("Ya me devolvieron el dinero del reembolso, gracias") is None
+
+
+def test_legal_question_is_not_complaint():
+    assert IntentFastPath().match("¿Es legal enviar perfumes por avión?") is None
+
+
+def test_purchase_meeting_is_not_support_request():
+    message = "Quiero una cita con el manager de ventas para comprar 20 equipos"
+
+    assert IntentFastPath().match(message) is None
+
+
+@pytest.mark.asyncio
+async def test_budget_exhausted_still_sends_ambiguous_messages_to_model(monkeypatch):
+    monkeypatch.setattr(usage_ledger, "budget_exhausted", lambda flow=None: True)
+    adapter = ModelAdapter()
+    request = IntentDetectionRequest(message="El producto llegó defectuoso y quiero un reembolso")
+
+    result = await IntentDetector(ai_adapter=adapter).detect(request, db=None)
+
+    assert adapter.calls == 1
+    assert result.ai_model_used != "rules"
+
+
+@pytest.mark.asyncio
+async def test_budget_exhausted_accepts_single_keyword(monkeypatch):
+    monkeypatch.setattr(usage_ledger, "budget_exhausted", lambda flow=None: True)
+    adapter = ModelAdapter()
+    request = IntentDetectionRequest(message="Quiero un reembolso")
+
+    result = await IntentDetector(ai_adapter=adapter).detect(request, db=None)
+
+    assert adapter.calls == 0
+    assert result.primary_intent == "refund_request"
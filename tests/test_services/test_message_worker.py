@@ -0,0 +1,132 @@
+"""
+Tests del worker de mensajes: solo se confirma lo que se procesó
+"""
+from types import SimpleNamespace
+import pytest
+from prometheus_client import REGISTRY
+from app.jobs import message_worker
+from app.jobs.message_queue import QueuedMessage
+from app.jobs.message_worker import MessageWorker
+from app.services.analysis_pipeline import InboundAnalysisPipeline
+from app.services.message_processor import MessageProcessor
+
+
+class FakeQueue:
+    """Cola de prueba que registra las confirmaciones"""
+
+    def __init__(self):
+        self.acked = []
+
+    async def ack(self, entry_id):
+        self.acked.append(entry_id)
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar_one_or_none(self):
+        return self.value
+
+
+class FakeSession:
+    """Sesión de prueba: toda consulta devuelve el mismo mensaje raw"""
+
+    def __init__(self, raw_message):
+        self.raw_message = raw_message
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt):
+        return FakeResult(self.raw_message)
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+class FakeN8N:
+    def __init__(self):
+        self.notified = []
+
+    async def notify_message_received(self, message_id):
+        self.notified.append(message_id)
+
+
+@pytest.fixture
+def raw_message():
+    return SimpleNamespace(id="msg-1", processed=False, processing_error=None)
+
+
+@pytest.fixture
+def worker(monkeypatch, raw_message):
+    monkeypatch.setattr(message_worker, "AsyncSessionLocal", lambda: FakeSession(raw_message))
+    worker = MessageWorker(queue=FakeQueue(), consumer="test")
+    worker.n8n_client = FakeN8N()
+    return worker
+
+
+def _worker_messages(status: str) -> float:
+    return REGISTRY.get_sample_value("message_worker_messages_total", {"status": status}) or 0.0
+
+
+MESSAGE = QueuedMessage(entry_id="1-0", message_id="msg-1", channel="whatsapp")
+
+
+@pytest.mark.asyncio
+async def test_failed_processing_leaves_entry_pending(worker, monkeypatch):
+    async def failing_process(message_id, channel, db):
+        raise RuntimeError("AI provider down")
+
+    monkeypatch.setattr(MessageProcessor, "process", failing_process)
+    before = _worker_messages("failed")
+
+    await worker._handle(MESSAGE)
+
+    assert worker.queue.acked == []
+    assert worker.n8n_client.notified == []
+    assert _worker_messages("failed") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_successful_processing_acks_entry(worker, monkeypatch):
+    async def process(message_id, channel, db):
+        return True
+
+    monkeypatch.setattr(MessageProcessor, "process", process)
+
+    await worker._handle(MESSAGE)
+
+    assert worker.queue.acked == ["1-0"]
+    assert worker.n8n_client.notified == ["msg-1"]
+
+
+@pytest.mark.asyncio
+async def test_duplicate_delivery_is_acked_without_reprocessing(worker, monkeypatch, raw_message):
+    analyzed = []
+
+    async def run(self, message, db):
+        analyzed.append(message.id)
+        return SimpleNamespace(
+            lead_id="lead-1",
+            routing=SimpleNamespace(destination="sales"),
+            latencies_ms={}
+        )
+
+    monkeypatch.setattr(InboundAnalysisPipeline, "run", run)
+    skipped = _worker_messages("skipped")
+
+    await worker._handle(MESSAGE)
+    await worker._handle(MESSAGE)
+
+    assert raw_message.processed
+    assert analyzed == ["msg-1"]
+    assert worker.queue.acked == ["1-0", "1-0"]
+    assert worker.n8n_client.notified == ["msg-1"]
+    assert _worker_messages("skipped") == skipped + 1
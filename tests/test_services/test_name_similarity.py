@@ -0,0 +1,57 @@
+"""
+Tests para el motor vectorizado de similitud de nombres
+"""
+import pytest
+from fuzzywuzzy import fuzz
+from app.services.name_similarity import NameSimilarityEngine
+
+
+def test_scores_are_on_fuzz_scale():
+    """Scores en 0-100: idénticos = 100, distintos bajo el umbral"""
+    engine = NameSimilarityEngine()
+    scores = engine.score_pairs(
+        ["carlos rodriguez", "carlos rodriguez", "ana gomez", ""],
+        ["carlos rodriguez", "carlos rodrigues", "pedro martinez", "ana"],
+    )
+    assert scores[0] == pytest.approx(100.0, abs=0.01)
+    assert scores[1] > 85
+    assert scores[2] < 85
+    assert scores[3] == 0
+
+
+def test_threshold_matches_fuzz_ratio_decision():
+    """Con el corte de 85 decide igual que fuzz.ratio en casos típicos"""
+    left = ["maria fernanda lopez", "jose perez", "juan carlos diaz", "pedro gomez"]
+    right = ["maria fernanda lopes", "josefina perez", "juan carlos dias", "pablo gomez"]
+    expected = [fuzz.ratio(a, b) > 85 for a, b in zip(left, right)]
+
+    mask = NameSimilarityEngine(threshold=85).similar_mask(left, right)
+    assert mask.tolist() == expected
+
+
+def test_same_surname_different_first_name_stays_below_threshold():
+    """Mismo apellido y otro nombre de pila: ni el engine ni fuzz.ratio los unen"""
+    left = ["ana camacho", "ricardo ordóñez", "blanca villagómez"]
+    right = ["mariana camacho", "eric ordóñez", "clara villagómez"]
+
+    mask = NameSimilarityEngine(threshold=85).similar_mask(left, right)
+
+    assert mask.tolist() == [False, False, False]
+    assert [fuzz.ratio(a, b) > 85 for a, b in zip(left, right)] == [False, False, False]
+
+
+def test_word_order_is_ignored_unlike_fuzz_ratio():
+    """Nombres con palabras reordenadas: el coseno los une, fuzz.ratio no"""
+    left, right = ["jose perez", "ana maria"], ["perez jose", "maria ana"]
+
+    mask = NameSimilarityEngine(threshold=85).similar_mask(left, right)
+
+    assert mask.tolist() == [True, True]
+    assert [fuzz.ratio(a, b) > 85 for a, b in zip(left, right)] == [False, False]
+
+
+def test_filter_pairs_by_id():
+    """filter_pairs conserva solo pares de ids sobre el umbral"""
+    names = {"1": "carlos rodriguez", "2": "carlos rodrigues", "3": "pedro martinez"}
+    kept = NameSimilarityEngine().filter_pairs([("1", "2"), ("1", "3")], names)
+    assert kept == [("1", "2")]
@@ -0,0 +1,123 @@
+"""
+Tests del scheduler de jobs
+"""
+from datetime import datetime, timedelta, timezone
+import pytest
+from apscheduler.triggers.interval import IntervalTrigger
+from app.jobs import scheduler as scheduler_module
+from app.jobs.scheduler import JobScheduler, ScheduledJob, build_trigger, is_overdue
+
+NOW = datetime(2024, 5, 10, 12, 0, tzinfo=timezone.utc)
+
+
+class LockedRedis:
+    """Redis de prueba donde otra réplica ya tiene todos los locks"""
+
+    async def set(self, *args, **kwargs):
+        return None
+
+    async def eval(self, *args):
+        return 0
+
+
+class SharedRedis:
+    """Redis de prueba compartido por varias réplicas (SET NX, GET y scripts de lock)"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def set(self, key, value, nx=False, px=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def eval(self, script, numkeys, key, token, *args):
+        if self.data.get(key) != token:
+            return 0
+        if "del" in script:
+            del self.data[key]
+        return 1
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+async def _skip_record(*args):
+    """Sin job_runs en los tests"""
+
+
+def test_interval_job_overdue_after_missed_run():
+    trigger = build_trigger(None, interval_hours=1)
+
+    assert is_overdue(trigger, NOW - timedelta(hours=3), NOW)
+    assert not is_overdue(trigger, NOW - timedelta(minutes=30), NOW)
+
+
+def test_cron_job_overdue_only_after_missed_fire_time():
+    trigger = build_trigger("0 3 * * *", interval_hours=24)
+
+    assert is_overdue(trigger, NOW - timedelta(days=1, hours=10), NOW)
+    assert not is_overdue(trigger, NOW - timedelta(hours=8), NOW)
+
+
+def test_never_run_job_is_not_caught_up():
+    assert not is_overdue(build_trigger(None, interval_hours=1), None, NOW)
+
+
+@pytest.mark.asyncio
+async def test_job_skipped_when_another_replica_holds_lock():
+    calls = []
+
+    async def run(db):
+        calls.append(db)
+
+    scheduler = JobScheduler(
+        jobs={"test": ScheduledJob("test", run, build_trigger(None, interval_hours=1))}
+    )
+    scheduler._redis = LockedRedis()
+
+    assert await scheduler.run_job("test") is False
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_replicas_with_offset_intervals_run_each_period_once(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "AsyncSessionLocal", FakeSession)
+    monkeypatch.setattr(JobScheduler, "_record_run", _skip_record)
+    redis = SharedRedis()
+    runs = []
+
+    def replica(name, booted_at):
+        async def run(db):
+            runs.append((name, clock[0]))
+
+        trigger = IntervalTrigger(hours=1, start_date=booted_at, timezone="UTC")
+        scheduler = JobScheduler(jobs={"test": ScheduledJob("test", run, trigger)})
+        scheduler._redis = redis
+        return scheduler
+
+    # La réplica B arrancó 20 minutos después que A: sus disparos no coinciden
+    clock = [NOW]
+    monkeypatch.setattr(scheduler_module, "_now", lambda: clock[0])
+    a = replica("a", NOW - timedelta(hours=1))
+    b = replica("b", NOW - timedelta(minutes=40))
+
+    for offset, replica_scheduler in [
+        (timedelta(0), a),
+        (timedelta(minutes=20), b),
+        (timedelta(hours=1), a),
+        (timedelta(hours=1, minutes=20), b),
+    ]:
+        clock[0] = NOW + offset
+        await replica_scheduler.run_job("test")
+
+    assert runs == [("a", NOW), ("a", NOW + timedelta(hours=1))]
@@ -0,0 +1,120 @@
+"""
+Tests de extracción e idempotencia de webhooks de Meta
+"""
+import pytest
+from prometheus_client import REGISTRY
+from app.core import json
+from app.schemas.webhook import InboundWebhook
+from app.services.webhook_idempotency import WebhookIdempotency
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def set(self, *args, **kwargs):
+        self.commands.append((args, kwargs))
+
+    async def execute(self):
+        return [await self.redis.set(*args, **kwargs) for args, kwargs in self.commands]
+
+
+class FakeRedis:
+    """SET NX / DELETE en memoria"""
+
+    def __init__(self):
+        self.keys = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.keys:
+            return None
+        self.keys[key] = value
+        return True
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.keys.pop(key, None)
+
+
+def _suppressed(layer="redis"):
+    return REGISTRY.get_sample_value(
+        "webhook_duplicates_suppressed_total", {"channel": "whatsapp", "layer": layer}
+    ) or 0
+
+
+def test_whatsapp_payload_with_several_messages():
+    webhook = InboundWebhook(
+        object="whatsapp_business_account",
+        entry=[
+            {"changes": [{"value": {
+                "messages": [
+                    {"id": "wamid.1", "from": "5071", "type": "text", "text": {"body": "hola"}},
+                    {"id": "wamid.2", "from": "5072", "type": "image", "image": {"caption": "foto"}},
+                ],
+                "statuses": [{"id": "wamid.0", "status": "read"}]
+            }}]},
+            {"changes": [{"value": {"messages": [
+                {"id": "wamid.3", "from": "5073", "type": "interactive",
+                 "interactive": {"button_reply": {"title": "Sí"}}}
+            ]}}]},
+        ]
+    )
+
+    messages = webhook.extract_messages()
+
+    assert [m.provider_message_id for m in messages] == ["wamid.1", "wamid.2", "wamid.3"]
+    assert [m.content for m in messages] == ["hola", "foto", "Sí"]
+    assert messages[0].sender == "5071"
+
+
+def test_messenger_payload_skips_echoes_and_non_message_events():
+    webhook = InboundWebhook(
+        object="page",
+        entry=[{"messaging": [
+            {"sender": {"id": "psid1"}, "message": {"mid": "m_1", "text": "precio?"}},
+            {"sender": {"id": "page"}, "message": {"mid": "m_2", "text": "eco", "is_echo": True}},
+            {"sender": {"id": "psid1"}, "read": {"watermark": 1}},
+        ]}]
+    )
+
+    messages = webhook.extract_messages()
+
+    assert len(messages) == 1
+    assert (messages[0].sender, messages[0].content, messages[0].provider_message_id) == ("psid1", "precio?", "m_1")
+
+
+def test_from_json_parses_once_and_keeps_original_bytes():
+    body = b'{"object": "page", "entry": [{"messaging": [{"sender": {"id": "p"}, "message": {"mid": "m_9", "text": "hola"}}]}]}'
+
+    webhook = InboundWebhook.from_json(body)
+
+    assert webhook.get_channel() == "messenger"
+    assert webhook.extract_messages()[0].provider_message_id == "m_9"
+    assert json.dumps(json.RawJSON(body.decode())) == body.decode()
+    with pytest.raises(ValueError):
+        InboundWebhook.from_json(b'{"object": "page", "entry": {"id": 1}}')
+
+
+@pytest.mark.asyncio
+async def test_retried_ids_are_suppressed_until_released():
+    idempotency = WebhookIdempotency(redis_url="redis://unused", ttl_seconds=60)
+    idempotency._client = FakeRedis()
+    before = _suppressed()
+
+    assert await idempotency.claim("whatsapp", ["wamid.1", "wamid.2"]) == ["wamid.1", "wamid.2"]
+    assert await idempotency.claim("whatsapp", ["wamid.2", "wamid.3"]) == ["wamid.3"]
+    assert await idempotency.claim("instagram", ["wamid.1"]) == ["wamid.1"]
+    assert _suppressed() == before + 1
+
+    await idempotency.release("whatsapp", ["wamid.1"])
+    assert await idempotency.claim("whatsapp", ["wamid.1"]) == ["wamid.1"]
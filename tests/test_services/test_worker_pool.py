@@ -0,0 +1,74 @@
+"""
+Tests del pool de workers para jobs con IA
+"""
+import asyncio
+import pytest
+from app.ai.rate_limit import RateLimiter
+from app.jobs.tracking import JobRunStats, current_job_run
+from app.jobs.worker_pool import AsyncWorkerPool
+
+
+@pytest.mark.asyncio
+async def test_pool_bounds_concurrency_and_returns_every_item():
+    in_flight = 0
+    peak = 0
+
+    async def worker(item):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return item * 2
+
+    pool = AsyncWorkerPool(concurrency=4)
+    results = {item: result async for item, result in pool.map(range(20), worker)}
+
+    assert peak == 4
+    assert results == {i: i * 2 for i in range(20)}
+
+
+@pytest.mark.asyncio
+async def test_pool_returns_worker_errors_without_stopping():
+    async def worker(item):
+        if item == 2:
+            raise ValueError("boom")
+        return item
+
+    pool = AsyncWorkerPool(concurrency=2)
+    results = {item: result async for item, result in pool.map(range(5), worker)}
+
+    assert isinstance(results[2], ValueError)
+    assert [results[i] for i in (0, 1, 3, 4)] == [0, 1, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(requests_per_minute=6000)  # una cada 10 ms
+    loop = asyncio.get_running_loop()
+
+    started = loop.time()
+    for _ in range(5):
+        await limiter.acquire()
+
+    assert loop.time() - started >= 0.035
+
+
+
+@pytest.mark.asyncio
+async def test_pool_reports_errors_to_current_job_run():
+    async def worker(item):
+        if item % 2:
+            raise ValueError("boom")
+        return item
+
+    stats = JobRunStats()
+    token = current_job_run.set(stats)
+    try:
+        pool = AsyncWorkerPool(concurrency=3)
+        async for _ in pool.map(range(6), worker):
+            pass
+    finally:
+        current_job_run.reset(token)
+
+    assert stats.errors == 3